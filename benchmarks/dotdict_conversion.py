@@ -0,0 +1,93 @@
+"""
+Benchmark the conversion of a parsed XMI document into a DotDict.
+
+Compares the current single-pass DotDict against the previous implementation, which cleaned the whole tree
+first and then walked it again to wrap the sub-dictionaries.
+
+.. usage::
+    python benchmarks/dotdict_conversion.py notebooks/UML.xmi
+
+"""
+import sys
+from timeit import repeat
+
+import xmltodict
+
+from django_xmi.xmi.util import DotDict, KEY_PREFIXES_TO_REMOVE, STRING_REPLACEMENTS
+
+
+class LegacyDotDict(dict):
+    """The DotDict implementation before keys were normalized in a single pass."""
+
+    __getattr__ = dict.__getitem__
+    __setattr__ = dict.__setitem__
+    __delattr__ = dict.__delitem__
+
+    def __init__(self, input_=None, list_to_dict_key='name'):
+        clean_input = {} if input_ is None else self._clean(input_)
+
+        if hasattr(clean_input, 'keys'):
+            for key, value in clean_input.items():
+                if hasattr(value, 'keys'):
+                    value = LegacyDotDict(value)
+                elif isinstance(value, (list, tuple)) and all(list_to_dict_key in item for item in value):
+                    value = LegacyDotDict({item[list_to_dict_key]: item for item in value})
+
+                self[key] = value
+        elif isinstance(clean_input, (list, tuple)) and all(list_to_dict_key in item for item in clean_input):
+            for item in clean_input:
+                if list_to_dict_key in item:
+                    self[item[list_to_dict_key]] = LegacyDotDict(item)
+        super().__init__()
+
+    def _clean(self, input_):
+        if hasattr(input_, 'keys'):
+            new = {}
+            for key, value in input_.items():
+                new_key = key
+                new_value = self._clean(value)
+
+                for new_char, bad_chars in STRING_REPLACEMENTS.items():
+                    for bad_char in bad_chars:
+                        new_key = new_key.replace(bad_char, new_char)
+
+                for ns in KEY_PREFIXES_TO_REMOVE:
+                    new_key = new_key.replace('{}__'.format(ns), '')
+
+                new[new_key] = new_value
+        elif isinstance(input_, (list, tuple)):
+            new = [None] * len(input_)
+            for i, item in enumerate(input_):
+                new[i] = self._clean(item)
+        else:
+            return input_
+        return new
+
+
+def same_tree(legacy, current):
+    """Check that both trees have the same content, and dicts where the other has dicts or DotDicts."""
+    if isinstance(legacy, LegacyDotDict) != isinstance(current, DotDict):
+        return False
+    if hasattr(legacy, 'keys'):
+        return (list(legacy) == list(current) and
+                all(same_tree(value, current[key]) for key, value in legacy.items()))
+    if isinstance(legacy, list):
+        return len(legacy) == len(current) and all(same_tree(a, b) for a, b in zip(legacy, current))
+    return legacy == current
+
+
+def main(filename, number=3):
+    with open(filename, 'rb') as file:
+        raw = xmltodict.parse(file)
+
+    assert same_tree(LegacyDotDict(raw), DotDict(raw)), 'The conversions do not produce the same tree'
+
+    results = {}
+    for name, cls in (('before', LegacyDotDict), ('after', DotDict)):
+        results[name] = min(repeat(lambda: cls(raw), number=1, repeat=number))
+        print('{:>6}: {:.3f}s'.format(name, results[name]))
+    print('speedup: {:.1f}x'.format(results['before'] / results['after']))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else 'notebooks/UML.xmi')
@@ -0,0 +1,82 @@
+"""
+Benchmark the naming functions over a full UML + SysML generation.
+
+Times the stages that name things (`parse_profile`, `process_literals`, `process_attributes`,
+`process_operations_and_rules` and `ordered_elements`) with the memoized naming functions, and with the
+naming functions as they were before they were memoized (no caches, reserved terms in a tuple).
+
+.. usage::
+    python benchmarks/naming.py notebooks/UML.xmi notebooks/SysML.xmi
+
+"""
+import sys
+from time import perf_counter
+from warnings import simplefilter
+
+from django_xmi.xmi import parser as parser_module
+from django_xmi.xmi import util
+from django_xmi.xmi.parser import XmiParser
+
+
+NAMING_FUNCTIONS = ('camel_to_snake', 'snake_to_camel', 'make_name_safe')
+
+
+def generate(uml, sysml):
+    """Run the generation stages, returns the time they took and the number of elements."""
+    parser = XmiParser()
+    parser.parse(uml)
+    parser.parse(sysml)
+
+    start = perf_counter()
+    parser.parse_profile(parser.packages.SysML)
+    parser.parse_profile(parser.packages.UML, 'Package')
+    parser.process_literals()
+    parser.process_attributes()
+    parser.process_operations_and_rules()
+    parser.ordered_elements()
+    return perf_counter() - start, len(parser.elements)
+
+
+def unmemoized():
+    """Swap in the naming functions without their caches, returns a function that restores them."""
+    saved = {name: getattr(util, name) for name in NAMING_FUNCTIONS}
+    reserved_terms = util.RESERVED_TERMS
+    for name, function in saved.items():
+        setattr(util, name, function.__wrapped__)
+        setattr(parser_module, name, function.__wrapped__)
+    util.RESERVED_TERMS = tuple(reserved_terms)
+
+    def restore():
+        for name, function in saved.items():
+            setattr(util, name, function)
+            setattr(parser_module, name, function)
+        util.RESERVED_TERMS = reserved_terms
+    return restore
+
+
+def main(uml, sysml, repeat=5):
+    simplefilter('ignore')
+
+    restore = unmemoized()
+    try:
+        before = min(generate(uml, sysml)[0] for _ in range(repeat))
+    finally:
+        restore()
+
+    times = []
+    for _ in range(repeat):
+        for name in NAMING_FUNCTIONS:
+            getattr(util, name).cache_clear()
+        elapsed, count = generate(uml, sysml)
+        times.append(elapsed)
+    after = min(times)
+
+    print('{} elements'.format(count))
+    print('unmemoized: {:.3f}s'.format(before))
+    print('memoized:   {:.3f}s ({:.1f}x)'.format(after, before / after))
+    for name in NAMING_FUNCTIONS:
+        print('{}: {}'.format(name, getattr(util, name).cache_info()))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:3])
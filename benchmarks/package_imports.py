@@ -0,0 +1,109 @@
+"""
+Benchmark loading the generated models with one module per profile or one module per package.
+
+Generates the models of the XMI files with both layouts of `ModelWriter` into temporary Django apps, then
+times `django.setup()` and measures the peak resident memory in a fresh interpreter for each layout, with all
+the packages enabled and with only some of them enabled (the DJANGO_XMI_PACKAGES setting).
+
+.. usage::
+    python benchmarks/package_imports.py notebooks/UML.xmi notebooks/SysML.xmi --packages SysML.Requirements
+    python benchmarks/package_imports.py ... --python /path/to/env/with/django/bin/python
+
+"""
+import argparse
+import json
+import subprocess
+import sys
+from os import path
+from tempfile import TemporaryDirectory
+from warnings import simplefilter
+
+from django_xmi.xmi.parser import XmiParser
+from django_xmi.xmi.render import ModelRenderer
+from django_xmi.xmi.writer import ModelWriter, write_atomic
+
+
+APP = 'xmi_benchmark'
+
+MEASURE = """
+import json, resource, time
+import django
+from django.conf import settings
+settings.configure(INSTALLED_APPS=['{app}'], DJANGO_XMI_PACKAGES={packages!r},
+                   DATABASES={{'default': {{'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}}}})
+start = time.perf_counter()
+django.setup()
+elapsed = time.perf_counter() - start
+from django.apps import apps
+try:
+    # ru_maxrss survives exec, so it would include the memory of the benchmark that started this process
+    with open('/proc/self/status') as status:
+        max_rss = int([line for line in status if line.startswith('VmHWM:')][0].split()[1])
+except OSError:
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{'seconds': elapsed, 'models': len(list(apps.get_app_config('{app}').get_models())),
+                  'max_rss_kb': max_rss}}))
+"""
+
+
+def generate(locations):
+    parser = XmiParser()
+    for location in locations:
+        parser.parse(location)
+    parser.parse_profile(parser.packages.SysML)
+    parser.parse_profile(parser.packages.UML, 'Package')
+    parser.process_literals()
+    parser.process_attributes()
+    parser.process_operations_and_rules()
+    for name in [key for key in parser.elements if not key.isidentifier()]:
+        parser.elements.pop(name)
+    ModelRenderer(parser).render()
+    return parser
+
+
+def write_app(parser, directory, layout):
+    """Write the models into a Django app in the directory, returns the directory to add to the path."""
+    root = path.join(directory, layout)
+    write_atomic(path.join(root, APP, '__init__.py'), '')
+    models = path.join(root, APP, 'models')
+    modules = ModelWriter(parser, models, layout=layout).write().written
+    if layout == 'profile':
+        write_atomic(path.join(models, '__init__.py'), ''.join(
+            'from .{} import *\n'.format(path.splitext(path.basename(module))[0]) for module in modules))
+    return root
+
+
+def measure(python, root, packages, repeat):
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([python, '-c', MEASURE.format(app=APP, packages=packages)], cwd=root,
+                                check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return min(runs, key=lambda run: run['seconds'])
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    argparser.add_argument('locations', nargs='+', help='the XMI files (UML and SysML)')
+    argparser.add_argument('--packages', nargs='+', default=None, help='the packages to enable in the subset')
+    argparser.add_argument('--python', default=sys.executable, help='an interpreter with Django installed')
+    argparser.add_argument('--repeat', type=int, default=5)
+    args = argparser.parse_args()
+
+    simplefilter('ignore')
+    parser = generate(args.locations)
+    subset = args.packages or [sorted(set(ModelWriter.package(e) for e in parser.elements.values()))[0]]
+
+    with TemporaryDirectory() as directory:
+        print('| Layout  | Packages enabled | Models | django.setup() | Peak RSS |')
+        print('|---------|------------------|--------|----------------|----------|')
+        for layout, packages in (('profile', None), ('package', None), ('package', subset)):
+            root = write_app(parser, directory, layout)
+            result = measure(args.python, root, packages, args.repeat)
+            print('| {:7} | {:16} | {:6} | {:13.3f}s | {:5.1f} MB |'.format(
+                layout, ', '.join(packages) if packages else 'all', result['models'], result['seconds'],
+                result['max_rss_kb'] / 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""
+Benchmark the read and write latency of the multi-table and the single-table models.
+
+Generates the models of the XMI files with both strategies of `ModelRenderer` into temporary Django apps, then,
+in a fresh interpreter for each strategy, creates rows of the most specialized model, reads them back with all
+the fields of their superclasses, and gets them one at a time by primary key, on an in-memory SQLite database.
+
+.. usage::
+    python benchmarks/single_table.py notebooks/UML.xmi notebooks/SysML.xmi --model Class
+    python benchmarks/single_table.py ... --python /path/to/env/with/django/bin/python
+
+"""
+import argparse
+import json
+import subprocess
+import sys
+from os import path
+from tempfile import TemporaryDirectory
+from warnings import simplefilter
+
+from django_xmi.xmi.parser import XmiParser
+from django_xmi.xmi.render import ModelRenderer
+from django_xmi.xmi.writer import ModelWriter, write_atomic
+
+
+APP = 'xmi_benchmark'
+
+REPOSITORY = path.dirname(path.dirname(path.abspath(__file__)))
+
+MEASURE = """
+import json, random, sys, time
+sys.path.insert(0, {repository!r})
+import django
+from django.conf import settings
+settings.configure(INSTALLED_APPS=['{app}'], MIGRATION_MODULES={{'{app}': None}},
+                   DATABASES={{'default': {{'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}}}})
+django.setup()
+from django.apps import apps
+from django.core.management import call_command
+from django.db import OperationalError, connection, models, transaction
+from django.test.utils import CaptureQueriesContext
+call_command('migrate', run_syncdb=True, verbosity=0)
+model = apps.get_model('{app}', {model!r})
+
+def create(model):
+    # The booleans are not nullable, the one-to-one fields link a row to the rows of its superclasses
+    values = {{}}
+    for field in model._meta.concrete_fields:
+        if isinstance(field, models.BooleanField):
+            values[field.name] = False
+        elif isinstance(field, models.OneToOneField):
+            values[field.name] = create(field.related_model)
+    return model.objects.create(**values)
+
+def paths(model, prefix=''):
+    for field in model._meta.concrete_fields:
+        if isinstance(field, models.OneToOneField):
+            yield prefix + field.name
+            yield from paths(field.related_model, prefix + field.name + '__')
+
+json_attributes = {{}}
+
+def touch(instance):
+    # Read every field of the row and of the rows of its superclasses, and the attributes stored in JSON
+    for field in instance._meta.concrete_fields:
+        value = getattr(instance, field.attname)
+        if isinstance(field, models.OneToOneField):
+            touch(getattr(instance, field.name))
+    cls = type(instance)
+    if cls not in json_attributes:
+        json_attributes[cls] = [name for name in dir(cls)
+                                if type(getattr(cls, name, None)).__name__ == 'JSONAttribute']
+    for name in json_attributes[cls]:
+        getattr(instance, name)
+
+related = sorted(paths(model))
+queryset = model.objects.select_related(*related) if related else model.objects.all()
+with transaction.atomic():
+    start = time.perf_counter()
+    pks = [create(model).pk for _ in range({rows})]
+    write = (time.perf_counter() - start) / {rows}
+
+try:
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        for instance in queryset:
+            touch(instance)
+        read = (time.perf_counter() - start) / {rows}
+
+    random.seed(0)
+    start = time.perf_counter()
+    for pk in random.sample(pks, min({gets}, len(pks))):
+        touch(queryset.get(pk=pk))
+    get = (time.perf_counter() - start) / min({gets}, len(pks))
+    joins = queries.captured_queries[-1]['sql'].count(' JOIN ')
+except OperationalError:
+    # e.g., SQLite joins at most 64 (or 200) tables in a query
+    read = get = None
+    joins = len(related)
+
+print(json.dumps({{'write': write, 'read': read, 'get': get, 'tables': 1 + len(related), 'joins': joins}}))
+"""
+
+
+def generate(locations, strategy):
+    # The enumerations as choices, so the defaults of their fields are valid
+    parser = XmiParser(enumerations='choices')
+    for location in locations:
+        parser.parse(location)
+    parser.parse_profile(parser.packages.SysML)
+    parser.parse_profile(parser.packages.UML, 'Package')
+    parser.process_literals()
+    parser.process_attributes()
+    parser.process_operations_and_rules()
+    for name in [key for key in parser.elements if not key.isidentifier()]:
+        parser.elements.pop(name)
+    ModelRenderer(parser, strategy=strategy).render()
+    return parser
+
+
+def write_app(parser, directory, strategy):
+    """Write the models into a Django app in the directory, returns the directory to add to the path."""
+    root = path.join(directory, strategy)
+    write_atomic(path.join(root, APP, '__init__.py'), '')
+    models = path.join(root, APP, 'models')
+    modules = ModelWriter(parser, models).write().written
+    write_atomic(path.join(models, '__init__.py'), ''.join(
+        'from .{} import *\n'.format(path.splitext(path.basename(module))[0]) for module in modules))
+    return root
+
+
+def deepest(parser):
+    """The name of the model with the most superclasses."""
+    return parser.elements[max(parser.elements, key=lambda name: len(parser.ancestors(name)))].name
+
+
+def measure(python, root, model, rows, gets, repeat):
+    runs = []
+    for _ in range(repeat):
+        script = MEASURE.format(repository=REPOSITORY, app=APP, model=model, rows=rows, gets=gets)
+        output = subprocess.run([python, '-W', 'ignore', '-c', script], cwd=root, check=True,
+                                stdout=subprocess.PIPE, universal_newlines=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: None if None in values else min(values)
+            for key, values in ((key, [run[key] for run in runs]) for key in runs[0])}
+
+
+def microseconds(seconds):
+    return 'failed' if seconds is None else '{:.1f} us'.format(seconds * 1e6)
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    argparser.add_argument('locations', nargs='+', help='the XMI files (UML and SysML)')
+    argparser.add_argument('--model', default=None, help='the model to measure, defaults to the most specialized')
+    argparser.add_argument('--rows', type=int, default=2000, help='the number of rows to create and read')
+    argparser.add_argument('--gets', type=int, default=500, help='the number of rows to get by primary key')
+    argparser.add_argument('--python', default=sys.executable, help='an interpreter with Django installed')
+    argparser.add_argument('--repeat', type=int, default=3)
+    args = argparser.parse_args()
+
+    simplefilter('ignore')
+    with TemporaryDirectory() as directory:
+        results = []
+        for strategy in ('multi-table', 'single-table'):
+            parser = generate(args.locations, strategy)
+            model = args.model or deepest(parser)
+            root = write_app(parser, directory, strategy)
+            results.append((strategy, model, measure(args.python, root, model, args.rows, args.gets, args.repeat)))
+
+        print('| Strategy     | Model            | Tables | Joins | Write / row | Read / row | Get by pk |')
+        print('|--------------|------------------|--------|-------|-------------|------------|-----------|')
+        for strategy, model, result in results:
+            print('| {:12} | {:16} | {:6} | {:5} | {:>11} | {:>10} | {:>9} |'.format(
+                strategy, model, result['tables'], result['joins'], microseconds(result['write']),
+                microseconds(result['read']), microseconds(result['get'])))
+
+
+if __name__ == '__main__':
+    main()
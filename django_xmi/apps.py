@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class DjangoXMIConfig(AppConfig):
     name = 'django_xmi'
+
+    def ready(self):
+        from . import closure, qualified_names
+        closure.connect_signals()
+        qualified_names.connect_signals()
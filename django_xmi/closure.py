@@ -0,0 +1,158 @@
+from collections import defaultdict
+from itertools import islice
+
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, pre_save
+
+from .models.closure import ElementClosure, closure_enabled
+from .models.uml import Element
+
+
+BATCH_SIZE = 2000
+
+# The owner of an Element when it was loaded is unknown if the owner field was deferred
+_UNKNOWN = object()
+
+
+def closure_rows(owners):
+    """
+    Compute the rows of the ElementClosure table.
+
+    :param owners: a mapping of the primary key of each Element to the primary key of its owner (or None)
+    :return: a generator of (ancestor, descendant, depth) tuples, and the list of the Elements that could not be
+             reached from an Element without an owner (i.e., that are in or under an ownership cycle), it is
+             only complete once the generator is exhausted
+    """
+    children = defaultdict(list)
+    roots = []
+    for pk, owner in owners.items():
+        if owner is None or owner not in owners:
+            roots.append(pk)
+        else:
+            children[owner].append(pk)
+
+    unreachable = []
+
+    def rows():
+        visited = 0
+        stack = [(root, ()) for root in roots]
+        while stack:
+            pk, owners_path = stack.pop()
+            visited += 1
+            yield pk, pk, 0
+            for depth, ancestor in enumerate(reversed(owners_path), 1):
+                yield ancestor, pk, depth
+            owners_path += (pk,)
+            stack.extend((child, owners_path) for child in children[pk])
+        if visited < len(owners):
+            reached = set()
+            stack = list(roots)
+            while stack:
+                pk = stack.pop()
+                reached.add(pk)
+                stack.extend(children[pk])
+            unreachable.extend(pk for pk in owners if pk not in reached)
+
+    return rows(), unreachable
+
+
+def _owners():
+    return dict(Element.objects.values_list('pk', 'owner_id'))
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    """
+    Recompute the whole ElementClosure table from the owners of the Elements.
+
+    :param batch_size: the number of rows inserted per query
+    :return: the number of rows, and the primary keys of the Elements in or under ownership cycles (which are
+             left out of the table)
+    """
+    rows, unreachable = closure_rows(_owners())
+    count = 0
+    with transaction.atomic():
+        ElementClosure.objects.all().delete()
+        while True:
+            batch = [ElementClosure(ancestor_id=ancestor, descendant_id=descendant, depth=depth)
+                     for ancestor, descendant, depth in islice(rows, batch_size)]
+            if not batch:
+                break
+            ElementClosure.objects.bulk_create(batch, batch_size=batch_size)
+            count += len(batch)
+    return count, unreachable
+
+
+def verify():
+    """
+    Compare the ElementClosure table with the owners of the Elements.
+
+    :return: the (ancestor, descendant, depth) rows that are missing, the rows that should not be there, and the
+             primary keys of the Elements in or under ownership cycles
+    """
+    rows, unreachable = closure_rows(_owners())
+    expected = set(rows)
+    actual = set(ElementClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth'))
+    return expected - actual, actual - expected, unreachable
+
+
+def _remember_owner(sender, instance, **kwargs):
+    instance._closure_owner_id = instance.__dict__.get('owner_id', _UNKNOWN)
+
+
+def _check_owner(sender, instance, raw=False, **kwargs):
+    if raw or not closure_enabled() or instance.owner_id is None:
+        return
+    if instance.owner_id == instance.pk or (
+            instance.pk is not None and instance.owner_id != getattr(instance, '_closure_owner_id', _UNKNOWN) and
+            ElementClosure.objects.filter(ancestor_id=instance.pk, descendant_id=instance.owner_id).exists()):
+        raise ValueError("Element {} cannot be owned by Element {}, it would own itself".format(
+            instance.pk, instance.owner_id))
+
+
+def _update_closure(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    if raw or not closure_enabled():
+        return
+    if update_fields is not None and 'owner' not in update_fields and 'owner_id' not in update_fields:
+        return
+    if created:
+        _insert(instance)
+    elif instance.owner_id != getattr(instance, '_closure_owner_id', _UNKNOWN):
+        _move(instance)
+    instance._closure_owner_id = instance.owner_id
+
+
+def _insert(element):
+    """Add the rows of a new Element, which does not own any other Element yet."""
+    rows = [ElementClosure(ancestor_id=element.pk, descendant_id=element.pk, depth=0)]
+    if element.owner_id is not None:
+        rows += [ElementClosure(ancestor_id=ancestor, descendant_id=element.pk, depth=depth + 1)
+                 for ancestor, depth in ElementClosure.objects.filter(descendant_id=element.owner_id)
+                                                              .values_list('ancestor_id', 'depth')]
+    with transaction.atomic():
+        ElementClosure.objects.bulk_create(rows)
+
+
+def _move(element):
+    """Replace the rows linking the Elements owned by an Element (and itself) with its former owners."""
+    with transaction.atomic():
+        subtree = list(ElementClosure.objects.filter(ancestor_id=element.pk).values_list('descendant_id', 'depth'))
+        if not subtree:
+            # Not in the table yet, e.g., it was created while the closure was not maintained
+            subtree = [(element.pk, 0)]
+            ElementClosure.objects.create(ancestor_id=element.pk, descendant_id=element.pk, depth=0)
+        subtree_pks = ElementClosure.objects.filter(ancestor_id=element.pk).values('descendant_id')
+        ElementClosure.objects.filter(descendant_id__in=subtree_pks).exclude(ancestor_id__in=subtree_pks).delete()
+        if element.owner_id is None:
+            return
+        ancestors = list(ElementClosure.objects.filter(descendant_id=element.owner_id)
+                                               .values_list('ancestor_id', 'depth'))
+        ElementClosure.objects.bulk_create(
+            (ElementClosure(ancestor_id=ancestor, descendant_id=pk, depth=ancestor_depth + depth + 1)
+             for ancestor, ancestor_depth in ancestors for pk, depth in subtree), batch_size=BATCH_SIZE)
+
+
+def connect_signals():
+    """Maintain the ElementClosure table when Elements are saved, while the setting enables it."""
+    post_init.connect(_remember_owner, sender=Element, dispatch_uid='django_xmi_closure_owner')
+    pre_save.connect(_check_owner, sender=Element, dispatch_uid='django_xmi_closure_check')
+    post_save.connect(_update_closure, sender=Element, dispatch_uid='django_xmi_closure_update')
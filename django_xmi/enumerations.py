@@ -0,0 +1,99 @@
+from warnings import warn
+
+from django.db import migrations
+
+
+class EnumerationToChoices(object):
+    """
+    The RunPython functions of a data migration that replaces a foreign key to an enumeration (e.g.,
+    `NamedElement.visibility`, generated with `XmiParser(enumerations='models')`) with a field with choices (as
+    generated with `XmiParser(enumerations='choices')`).
+
+    The enumeration rows, like all the Elements, share their primary key with their NamedElement, so each foreign
+    key is mapped to the name of that NamedElement, and the name to the choice with that code (or, for integer
+    codes, with that label).  Use `enumeration_to_choices` for the whole sequence of operations.
+    """
+
+    def __init__(self, model_name, name, choice_name, choices, app_label='django_xmi',
+                 named_element='NamedElement'):
+        """
+        :param model_name: the name of the model with the foreign key, e.g., 'NamedElement'
+        :param name: the name of the foreign key, e.g., 'visibility'
+        :param choice_name: the name of the field with choices to fill in
+        :param choices: the choices of that field
+        :param app_label: the label of the app of the models
+        :param named_element: the name of the model with the names of the Elements
+        """
+        self.model_name = model_name
+        self.name = name
+        self.choice_name = choice_name
+        self.choices = list(choices)
+        self.app_label = app_label
+        self.named_element = named_element
+
+    def codes(self):
+        """:return: the codes of the choices, by the name of their literal"""
+        return {code if isinstance(code, str) else label: code for code, label in self.choices}
+
+    def forwards(self, apps, schema_editor):
+        model = apps.get_model(self.app_label, self.model_name)
+        named_element = apps.get_model(self.app_label, self.named_element)
+        attname = model._meta.get_field(self.name).attname
+
+        pks = set(model.objects.exclude(**{attname: None}).values_list(attname, flat=True).distinct())
+        names = dict(named_element.objects.filter(pk__in=pks).values_list('pk', 'name'))
+        codes = self.codes()
+        missing = []
+        for pk in pks:
+            code = codes.get(names.get(pk, None), None)
+            if code is None:
+                missing.append(names.get(pk, pk))
+                continue
+            model.objects.filter(**{attname: pk}).update(**{self.choice_name: code})
+        if missing:
+            warn("Could not find the choices of {}.{} for {}".format(
+                self.model_name, self.name, ', '.join(sorted(str(name) for name in missing))))
+
+    def backwards(self, apps, schema_editor):
+        model = apps.get_model(self.app_label, self.model_name)
+        named_element = apps.get_model(self.app_label, self.named_element)
+        field = model._meta.get_field(self.name)
+        enumeration = field.related_model
+
+        pks = enumeration.objects.values_list('pk', flat=True)
+        rows = {name: pk for pk, name in named_element.objects.filter(pk__in=pks).values_list('pk', 'name')}
+        for name, code in self.codes().items():
+            if name in rows:
+                model.objects.filter(**{self.choice_name: code}).update(**{field.attname: rows[name]})
+            elif model.objects.filter(**{self.choice_name: code}).exists():
+                warn("Could not find the '{}' row of {} for {}.{}".format(
+                    name, enumeration.__name__, self.model_name, self.name))
+
+
+def enumeration_to_choices(model_name, name, field, app_label='django_xmi', named_element='NamedElement'):
+    """
+    The operations of a migration that replaces a foreign key to an enumeration with a field with choices: add
+    the field under a temporary name, copy the literals into it, remove the foreign key and rename the field.
+    The migration can be reversed, as long as the rows of the enumeration are still there.
+
+    .. usage::
+        class Migration(migrations.Migration):
+            dependencies = [('django_xmi', '0001_initial')]
+            operations = enumeration_to_choices('NamedElement', 'visibility', models.CharField(
+                max_length=9, choices=VISIBILITY_KIND_CHOICES, blank=True, null=True))
+
+    :param model_name: the name of the model with the foreign key
+    :param name: the name of the foreign key, which the field with choices replaces
+    :param field: the field with choices, it must be nullable (or have a default)
+    :param app_label: the label of the app of the models
+    :param named_element: the name of the model with the names of the Elements
+    :return: the operations
+    """
+    temporary = name + '_choice'
+    copy = EnumerationToChoices(model_name, name, temporary, field.choices, app_label, named_element)
+    return [
+        migrations.AddField(model_name, temporary, field),
+        migrations.RunPython(copy.forwards, copy.backwards),
+        migrations.RemoveField(model_name, name),
+        migrations.RenameField(model_name, temporary, name),
+    ]
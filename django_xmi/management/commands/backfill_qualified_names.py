@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from ...qualified_names import BATCH_SIZE, backfill
+
+
+class Command(BaseCommand):
+    help = 'Recompute the qualified names of the NamedElements and store the ones that changed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='The number of NamedElements updated per transaction.')
+
+    def handle(self, *args, **options):
+        count, cycles = backfill(batch_size=options['batch_size'])
+        if cycles:
+            self.stderr.write('{} NamedElements are in cycles of Namespaces and have no qualified name, e.g., {}'
+                              .format(len(cycles), ', '.join(str(pk) for pk in cycles[:10])))
+        self.stdout.write('Updated {} qualified names'.format(count))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from ...closure import BATCH_SIZE, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute the ElementClosure table from the owners of the Elements.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='The number of rows inserted per query.')
+
+    def handle(self, *args, **options):
+        count, unreachable = rebuild(batch_size=options['batch_size'])
+        if unreachable:
+            self.stderr.write('Left out {} Elements in or under ownership cycles, e.g., {}'.format(
+                len(unreachable), ', '.join(str(pk) for pk in unreachable[:10])))
+        self.stdout.write('Wrote {} rows'.format(count))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...closure import verify
+
+
+class Command(BaseCommand):
+    help = 'Check that the ElementClosure table matches the owners of the Elements.'
+
+    def handle(self, *args, **options):
+        missing, extra, unreachable = verify()
+        for label, rows in (('Missing', missing), ('Unexpected', extra)):
+            if rows:
+                self.stderr.write('{} {} rows (ancestor, descendant, depth), e.g., {}'.format(
+                    label, len(rows), ', '.join(str(row) for row in sorted(rows)[:10])))
+        if unreachable:
+            self.stderr.write('{} Elements are in or under ownership cycles, e.g., {}'.format(
+                len(unreachable), ', '.join(str(pk) for pk in unreachable[:10])))
+        if missing or extra or unreachable:
+            raise CommandError('The ElementClosure table is not consistent, run rebuild_element_closure')
+        self.stdout.write('The ElementClosure table is consistent')
@@ -1,2 +1,3 @@
 from .uml import *
 from .sysml import *
+from .closure import ElementClosure
@@ -0,0 +1,141 @@
+from django.db import connection, models
+from .closure import ElementClosure, closure_enabled
+from .qualified_name import NamedElementQuerySet, qualified_name_separator
+
+
+class ElementBase(models.Model):
+    """
+    The hand-written part of the Element model.  The generated Element inherits from it, and the generator
+    leaves out the fields and methods it implements (see `EXTENSIONS` in django_xmi.xmi.render), so they are
+    not lost when the models are generated again.
+    """
+
+    class Meta:
+        abstract = True
+
+    def all_owned_elements(self):
+        """
+        The query allOwnedElements() gives all of the direct and indirect ownedElements of an Element.
+
+        The containment tree is followed through the `owner` of the Elements, in a single recursive query
+        (SQLite, PostgreSQL and MySQL 8), and the result is a lazy QuerySet.  The UNION stops at Elements that
+        were already visited, so the query terminates even if an Element (wrongly) owns itself.
+
+        When the DJANGO_XMI_ELEMENT_CLOSURE setting is True, the ElementClosure table is used instead.
+
+        .. ocl::
+            result = (ownedElement->union(ownedElement->collect(e | e.allOwnedElements()))->asSet())
+        """
+        if closure_enabled():
+            return ElementClosure.objects.descendants(self)
+        quote = connection.ops.quote_name
+        table = quote(self._meta.db_table)
+        pk = quote(self._meta.pk.column)
+        owner = quote(self._meta.get_field('owner').column)
+        # A RawSQL in a pk__in lookup gets wrapped in two pairs of parentheses, which makes it a scalar subquery
+        return type(self)._default_manager.extra(where=[
+            '{table}.{pk} IN (WITH RECURSIVE owned (id) AS ('
+            'SELECT {pk} FROM {table} WHERE {owner} = %s '
+            'UNION '
+            'SELECT e.{pk} FROM {table} e INNER JOIN owned ON e.{owner} = owned.id'
+            ') SELECT id FROM owned)'.format(table=table, pk=pk, owner=owner)], params=[self.pk])
+
+    def not_own_self(self):
+        """
+        An element may not directly or indirectly own itself.
+
+        .. ocl::
+            not allOwnedElements()->includes(self)
+
+        When the DJANGO_XMI_ELEMENT_CLOSURE setting is True, the ElementClosure table is used instead, and saving
+        an Element that would own itself raises a ValueError.
+        """
+        if closure_enabled():
+            # The owner is not one of the Elements this Element owns, the closure has no row for a cycle
+            return self.owner_id is None or not (self.owner_id == self.pk or ElementClosure.objects.filter(
+                ancestor_id=self.pk, descendant_id=self.owner_id).exists())
+        return not self.all_owned_elements().filter(pk=self.pk).exists()
+
+
+class NamedElementBase(models.Model):
+    """
+    The hand-written part of the NamedElement model: its materialized, indexed `qualified_name`, which is kept
+    up to date when NamedElements are saved (see django_xmi.qualified_names), and the lookups by qualified name.
+    """
+
+    qualified_name = models.TextField(blank=True, null=True, db_index=True,
+                                      help_text='A name that allows the NamedElement to be identified within a '
+                                      'hierarchy of nested Namespaces. It is constructed from the names of the '
+                                      'containing Namespaces starting at the root of the hierarchy and ending with '
+                                      'the name of the NamedElement itself.')
+
+    objects = NamedElementQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def get_qualified_name(self):
+        """
+        When a NamedElement has a name, and all of its containing Namespaces have a name, the qualifiedName is
+        constructed from the name of the NamedElement and the names of the containing Namespaces.
+
+        .. ocl::
+            result = (if self.name <> null and self.allNamespaces()->select( ns | ns.name=null )->isEmpty()
+            then
+                self.allNamespaces()->iterate( ns : Namespace; agg: String = self.name |
+                  ns.name.concat(self.separator()).concat(agg))
+            else
+               null
+            endif)
+
+        The stored `qualified_name` is kept up to date when NamedElements are saved, this follows the
+        namespaces instead (the enclosing Namespaces of a TemplateParameter are not supported).
+        """
+        if self.name is None:
+            return None
+        names = [self.name]
+        visited = {self.pk}
+        namespace = self.namespace_id
+        while namespace is not None:
+            if namespace in visited:
+                return None
+            visited.add(namespace)
+            name, namespace = type(self)._default_manager.values_list('name', 'namespace_id').get(pk=namespace)
+            if name is None:
+                return None
+            names.append(name)
+        return self.separator().join(reversed(names))
+
+    def has_no_qualified_name(self):
+        """
+        If there is no name, or one of the containing Namespaces has no name, there is no qualifiedName.
+
+        .. ocl::
+            name=null or allNamespaces()->select( ns | ns.name=null )->notEmpty() implies qualifiedName = null
+        """
+        return self.get_qualified_name() is not None or self.qualified_name is None
+
+    def has_qualified_name(self):
+        """
+        When there is a name, and all of the containing Namespaces have a name, the qualifiedName is constructed
+        from the name of the NamedElement and the names of the containing Namespaces.
+
+        .. ocl::
+            (name <> null and allNamespaces()->select(ns | ns.name = null)->isEmpty()) implies
+              qualifiedName = allNamespaces()->iterate( ns : Namespace; agg: String = name |
+                ns.name.concat(self.separator()).concat(agg))
+        """
+        qualified_name = self.get_qualified_name()
+        return qualified_name is None or self.qualified_name == qualified_name
+
+    def separator(self):
+        """
+        The query separator() gives the string that is used to separate names when constructing a qualifiedName.
+
+        .. ocl::
+            result = ('::')
+
+        The separator can be changed with the DJANGO_XMI_QUALIFIED_NAME_SEPARATOR setting, run the
+        `backfill_qualified_names` command afterwards.
+        """
+        return qualified_name_separator()
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.db import models
+
+
+def closure_enabled():
+    """Whether the ElementClosure table is maintained, i.e., the DJANGO_XMI_ELEMENT_CLOSURE setting is True."""
+    return getattr(settings, 'DJANGO_XMI_ELEMENT_CLOSURE', False)
+
+
+class ElementClosureManager(models.Manager):
+
+    def ancestors(self, element):
+        """
+        :param element: an Element or its primary key
+        :return: the Elements that directly or indirectly own the element
+        """
+        from .uml import Element
+        return Element.objects.filter(closure_descendants__descendant=element, closure_descendants__depth__gt=0)
+
+    def descendants(self, element):
+        """
+        :param element: an Element or its primary key
+        :return: the Elements the element directly or indirectly owns
+        """
+        from .uml import Element
+        return Element.objects.filter(closure_ancestors__ancestor=element, closure_ancestors__depth__gt=0)
+
+
+class ElementClosure(models.Model):
+    """
+    The transitive closure of the ownership (`Element.owner`) of the Elements: one row for every Element and
+    each of its direct or indirect owners, and one row (with a depth of 0) for every Element and itself.
+
+    The table is only kept up to date when the DJANGO_XMI_ELEMENT_CLOSURE setting is True.  Elements saved with
+    `QuerySet.update`, `bulk_create` or loaded from fixtures bypass the signals that maintain it, run the
+    `rebuild_element_closure` command afterwards (and `verify_element_closure` to check it).
+    """
+
+    ancestor = models.ForeignKey('Element', on_delete=models.CASCADE, related_name='closure_descendants')
+    descendant = models.ForeignKey('Element', on_delete=models.CASCADE, related_name='closure_ancestors')
+    depth = models.PositiveIntegerField(help_text='The number of ownerships from the ancestor to the descendant.')
+
+    objects = ElementClosureManager()
+
+    class Meta:
+        unique_together = (('ancestor', 'descendant'),)
+
+    def __str__(self):
+        return '{} -> {} ({})'.format(self.ancestor_id, self.descendant_id, self.depth)
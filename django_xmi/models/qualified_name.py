@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.db import connections, models
+
+
+def qualified_name_separator():
+    """The string between the names of a qualified name, the DJANGO_XMI_QUALIFIED_NAME_SEPARATOR setting."""
+    return getattr(settings, 'DJANGO_XMI_QUALIFIED_NAME_SEPARATOR', '::')
+
+
+def prefix_range(prefix):
+    """
+    :param prefix: a string
+    :return: the bounds (inclusive, exclusive) of the strings that start with the prefix, in binary order
+    """
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class NamedElementQuerySet(models.QuerySet):
+
+    def qualified(self, qualified_name):
+        """
+        :param qualified_name: e.g., 'Vehicle::Powertrain::Engine'
+        :return: the NamedElements with this qualified name
+        """
+        return self.filter(qualified_name=qualified_name)
+
+    def under(self, qualified_name, separator=None):
+        """
+        :param qualified_name: the qualified name of a Namespace, e.g., 'Vehicle::Powertrain'
+        :param separator: the separator of the qualified names, defaults to `qualified_name_separator()`
+        :return: the NamedElements directly or indirectly in the Namespaces with this qualified name
+        """
+        prefix = qualified_name + (separator or qualified_name_separator())
+        if connections[self.db].vendor == 'sqlite':
+            # SQLite only uses an index for a LIKE if it is case sensitive, a range uses it with the binary order
+            start, end = prefix_range(prefix)
+            return self.filter(qualified_name__gte=start, qualified_name__lt=end)
+        # On PostgreSQL, Django adds a pattern index to the column for the LIKE
+        return self.filter(qualified_name__startswith=prefix)
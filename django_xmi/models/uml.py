@@ -1,7 +1,8 @@
 from django.db import models
+from .base import ElementBase, NamedElementBase
 
 
-class Element(models.Model):
+class Element(ElementBase):
     """
     An Element is a constituent of a model. As such, it has the capability of owning other Elements.
     """
@@ -15,15 +16,6 @@ class Element(models.Model):
     owner = models.ForeignKey('self', related_name='%(app_label)s_%(class)s_owner', blank=True, null=True, 
                               help_text='The Element that owns this Element.')
 
-    def all_owned_elements(self):
-        """
-        The query allOwnedElements() gives all of the direct and indirect ownedElements of an Element.
-
-        .. ocl::
-            result = (ownedElement->union(ownedElement->collect(e | e.allOwnedElements()))->asSet())
-        """
-        pass
-
     def has_owner(self):
         """
         Elements that must be owned must have an owner.
@@ -43,15 +35,6 @@ class Element(models.Model):
         """
         pass
 
-    def not_own_self(self):
-        """
-        An element may not directly or indirectly own itself.
-
-        .. ocl::
-            not allOwnedElements()->includes(self)
-        """
-        pass
-
 class TemplateableElement(models.Model):
     """
     A TemplateableElement is an Element that can optionally be defined as a template and bound to other
@@ -91,7 +74,7 @@ class TemplateableElement(models.Model):
         """
         pass
 
-class NamedElement(models.Model):
+class NamedElement(NamedElementBase):
     """
     A NamedElement is an Element in a model that may have a name. The name may be given directly and/or via the
     use of a StringExpression.
@@ -109,11 +92,6 @@ class NamedElement(models.Model):
                                         'NamedElement.')
     namespace = models.ForeignKey('Namespace', related_name='%(app_label)s_%(class)s_namespace', blank=True, null=True, 
                                   help_text='Specifies the Namespace that owns the NamedElement.')
-    qualified_name = models.CharField(max_length=255, blank=True, null=True, 
-                                      help_text='A name that allows the NamedElement to be identified within a ' +
-                                      'hierarchy of nested Namespaces. It is constructed from the names of the ' +
-                                      'containing Namespaces starting at the root of the hierarchy and ending with ' +
-                                      'the name of the NamedElement itself.')
     visibility = models.ForeignKey('VisibilityKind', related_name='%(app_label)s_%(class)s_visibility', blank=True, null=True, 
                                    help_text='Determines whether and how the NamedElement is visible outside its ' +
                                    'owning Namespace.')
@@ -156,33 +134,13 @@ class NamedElement(models.Model):
         """
         pass
 
-    def client_dependency(self):
+    def get_client_dependency(self):
         """
         .. ocl::
             result = (Dependency.allInstances()->select(d | d.client->includes(self)))
         """
         pass
 
-    def has_no_qualified_name(self):
-        """
-        If there is no name, or one of the containing Namespaces has no name, there is no qualifiedName.
-
-        .. ocl::
-            name=null or allNamespaces()->select( ns | ns.name=null )->notEmpty() implies qualifiedName = null
-        """
-        pass
-
-    def has_qualified_name(self):
-        """
-        When there is a name, and all of the containing Namespaces have a name, the qualifiedName is constructed
-        from the name of the NamedElement and the names of the containing Namespaces.
-
-        .. ocl::
-            (name <> null and allNamespaces()->select(ns | ns.name = null)->isEmpty()) implies
-              qualifiedName = allNamespaces()->iterate( ns : Namespace; agg: String = name | ns.name.concat(self.separator()).concat(agg))
-        """
-        pass
-
     def is_distinguishable_from(self):
         """
         The query isDistinguishableFrom() determines whether two NamedElements may logically co-exist within a
@@ -196,30 +154,6 @@ class NamedElement(models.Model):
         """
         pass
 
-    def qualified_name(self):
-        """
-        When a NamedElement has a name, and all of its containing Namespaces have a name, the qualifiedName is
-        constructed from the name of the NamedElement and the names of the containing Namespaces.
-
-        .. ocl::
-            result = (if self.name <> null and self.allNamespaces()->select( ns | ns.name=null )->isEmpty()
-            then 
-                self.allNamespaces()->iterate( ns : Namespace; agg: String = self.name | ns.name.concat(self.separator()).concat(agg))
-            else
-               null
-            endif)
-        """
-        pass
-
-    def separator(self):
-        """
-        The query separator() gives the string that is used to separate names when constructing a qualifiedName.
-
-        .. ocl::
-            result = ('::')
-        """
-        pass
-
     def visibility_needs_ownership(self):
         """
         If a NamedElement is owned by something other than a Namespace, it does not have a visibility. One that
@@ -248,7 +182,7 @@ class Namespace(models.Model):
     member = models.ManyToManyField('NamedElement', related_name='%(app_label)s_%(class)s_member', blank=True, 
                                     help_text='A collection of NamedElements identifiable within the Namespace, ' +
                                     'either by being owned or by being introduced by importing or inheritance.')
-    named_element = models.OneToOneField('NamedElement', on_delete=models.CASCADE, primary_key=True)
+    named_element = models.OneToOneField('NamedElement', on_delete=models.CASCADE, primary_key=True, related_name='%(app_label)s_%(class)s_named_element')
     owned_member = models.ManyToManyField('NamedElement', related_name='%(app_label)s_%(class)s_owned_member', blank=True, 
                                           help_text='A collection of NamedElements owned by the Namespace.')
     owned_rule = models.ManyToManyField('Constraint', related_name='%(app_label)s_%(class)s_owned_rule', blank=True, 
@@ -316,7 +250,7 @@ class Namespace(models.Model):
         """
         pass
 
-    def imported_member(self):
+    def get_imported_member(self):
         """
         The importedMember property is derived as the PackageableElements that are members of this Namespace as
         a result of either PackageImports or ElementImports.
@@ -693,7 +627,7 @@ class Classifier(models.Model):
         """
         pass
 
-    def inherited_member(self):
+    def get_inherited_member(self):
         """
         The inheritedMember association is derived by inheriting the inheritable members of the parents.
 
@@ -946,7 +880,7 @@ class EncapsulatedClassifier(models.Model):
                                         help_text='The Ports owned by the EncapsulatedClassifier.')
     structured_classifier = models.OneToOneField('StructuredClassifier', on_delete=models.CASCADE, primary_key=True)
 
-    def owned_port(self):
+    def get_owned_port(self):
         """
         Derivation for EncapsulatedClassifier::/ownedPort : Port
 
@@ -1039,7 +973,7 @@ class Class(models.Model):
         """
         pass
 
-    def super_class(self):
+    def get_super_class(self):
         """
         Derivation for Class::/superClass : Class
 
@@ -1231,7 +1165,7 @@ class Package(models.Model):
         """
         pass
 
-    def nested_package(self):
+    def get_nested_package(self):
         """
         Derivation for Package::/nestedPackage
 
@@ -1240,7 +1174,7 @@ class Package(models.Model):
         """
         pass
 
-    def owned_stereotype(self):
+    def get_owned_stereotype(self):
         """
         Derivation for Package::/ownedStereotype
 
@@ -1249,7 +1183,7 @@ class Package(models.Model):
         """
         pass
 
-    def owned_type(self):
+    def get_owned_type(self):
         """
         Derivation for Package::/ownedType
 
@@ -1965,7 +1899,7 @@ class Operation(models.Model):
         """
         pass
 
-    def is_ordered(self):
+    def get_is_ordered(self):
         """
         If this operation has a return parameter, isOrdered equals the value of isOrdered for that parameter.
         Otherwise isOrdered is false.
@@ -1975,7 +1909,7 @@ class Operation(models.Model):
         """
         pass
 
-    def is_unique(self):
+    def get_is_unique(self):
         """
         If this operation has a return parameter, isUnique equals the value of isUnique for that parameter.
         Otherwise isUnique is true.
@@ -2608,7 +2542,7 @@ class DeploymentTarget(models.Model):
                                         help_text='The set of Deployments for a DeploymentTarget.')
     named_element = models.OneToOneField('NamedElement', on_delete=models.CASCADE, primary_key=True)
 
-    def deployed_element(self):
+    def get_deployed_element(self):
         """
         Derivation for DeploymentTarget::/deployedElement
 
@@ -2980,7 +2914,7 @@ class State(models.Model):
         """
         pass
 
-    def is_composite(self):
+    def get_is_composite(self):
         """
         A composite State is a State with at least one Region.
 
@@ -2999,7 +2933,7 @@ class State(models.Model):
         """
         pass
 
-    def is_orthogonal(self):
+    def get_is_orthogonal(self):
         """
         An orthogonal State is a composite state with at least 2 regions.
 
@@ -3026,7 +2960,7 @@ class State(models.Model):
         """
         pass
 
-    def is_simple(self):
+    def get_is_simple(self):
         """
         A simple State is a State without any regions.
 
@@ -3035,7 +2969,7 @@ class State(models.Model):
         """
         pass
 
-    def is_submachine_state(self):
+    def get_is_submachine_state(self):
         """
         Only submachine State references another StateMachine.
 
@@ -3044,7 +2978,7 @@ class State(models.Model):
         """
         pass
 
-    def redefinition_context(self):
+    def get_redefinition_context(self):
         """
         The redefinition context of a State is the nearest containing StateMachine.
 
@@ -4529,7 +4463,7 @@ class Association(models.Model):
         """
         pass
 
-    def end_type(self):
+    def get_end_type(self):
         """
         endType is derived from the types of the member ends.
 
@@ -5471,7 +5405,7 @@ class ActionInputPin(models.Model):
                                     help_text='The Action used to provide the values of the ActionInputPin.')
     input_pin = models.OneToOneField('InputPin', on_delete=models.CASCADE, primary_key=True)
 
-    def input_pin(self):
+    def validate_input_pin(self):
         """
         The fromAction of an ActionInputPin must only have ActionInputPins as InputPins.
 
@@ -5798,7 +5732,7 @@ class RedefinableTemplateSignature(models.Model):
     redefinable_element = models.OneToOneField('RedefinableElement', on_delete=models.CASCADE, primary_key=True)
     template_signature = models.OneToOneField('TemplateSignature')
 
-    def inherited_parameter(self):
+    def get_inherited_parameter(self):
         """
         Derivation for RedefinableTemplateSignature::/inheritedParameter
 
@@ -6259,7 +6193,7 @@ class Property(models.Model):
         """
         pass
 
-    def deployment_target(self):
+    def validate_deployment_target(self):
         """
         A Property can be a DeploymentTarget if it is a kind of Node and functions as a part in the internal
         structure of an encompassing Node.
@@ -6309,7 +6243,7 @@ class Property(models.Model):
         """
         pass
 
-    def is_composite(self):
+    def get_is_composite(self):
         """
         The value of isComposite is true only if aggregation is composite.
 
@@ -7250,7 +7184,7 @@ class Region(models.Model):
         """
         pass
 
-    def redefinition_context(self):
+    def get_redefinition_context(self):
         """
         The redefinition context of a Region is the nearest containing StateMachine.
 
@@ -7557,7 +7491,7 @@ class ConnectorEnd(models.Model):
                              'the containing Classifier is created, a link may (depending on the multiplicities) ' +
                              'be created to an instance of the Classifier that types this ConnectableElement.')
 
-    def defining_end(self):
+    def get_defining_end(self):
         """
         Derivation for ConnectorEnd::/definingEnd : Property
 
@@ -7765,7 +7699,7 @@ class Transition(models.Model):
         """
         pass
 
-    def redefinition_context(self):
+    def get_redefinition_context(self):
         """
         The redefinition context of a Transition is the nearest containing StateMachine.
 
@@ -8837,7 +8771,7 @@ class Extension(models.Model):
     owned_end = models.ForeignKey('ExtensionEnd', related_name='%(app_label)s_%(class)s_owned_end', null=True, 
                                   help_text='References the end of the extension that is typed by a Stereotype.')
 
-    def is_required(self):
+    def get_is_required(self):
         """
         The query isRequired() is true if the owned end has a multiplicity with the lower bound of 1.
 
@@ -9672,7 +9606,7 @@ class InstanceSpecification(models.Model):
         """
         pass
 
-    def deployment_target(self):
+    def validate_deployment_target(self):
         """
         An InstanceSpecification can act as a DeploymentTarget if it represents an instance of a Node and
         functions as a part in the internal structure of an encompassing Node.
@@ -10462,7 +10396,7 @@ class Message(models.Model):
         """
         pass
 
-    def message_kind(self):
+    def get_message_kind(self):
         """
         This query returns the MessageKind value for this Message.
 
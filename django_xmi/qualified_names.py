@@ -0,0 +1,170 @@
+from django.db import models, transaction
+from django.db.models.functions import Concat, Substr
+from django.db.models.signals import post_init, post_save, pre_save
+
+from .models.qualified_name import qualified_name_separator
+from .models.uml import NamedElement
+
+
+BATCH_SIZE = 500
+
+# The qualified name of a NamedElement when it was loaded is unknown if the field was deferred
+_UNKNOWN = object()
+
+
+def qualified_names(namespaces, separator):
+    """
+    Compute the qualified names of NamedElements.
+
+    :param namespaces: a mapping of the primary key of each NamedElement to its name and the primary key of its
+                       namespace (or None)
+    :param separator: the string between the names
+    :return: a dictionary of the primary keys to the qualified names, None for the NamedElements without a name,
+             in a Namespace without one, or in or under a cycle of Namespaces, and the list of the NamedElements
+             in such cycles
+    """
+    names = {}
+    cycles = []
+    for pk in namespaces:
+        path = []
+        on_path = set()
+        current = pk
+        while current is not None and current in namespaces and current not in names:
+            if current in on_path:
+                cycle = path[path.index(current):]
+                cycles.extend(cycle)
+                names.update((member, None) for member in cycle)
+                break
+            on_path.add(current)
+            path.append(current)
+            current = namespaces[current][1]
+
+        for member in reversed(path):
+            if member in names:
+                continue
+            name, namespace = namespaces[member]
+            if name is None:
+                names[member] = None
+            elif namespace is None or namespace not in namespaces:
+                names[member] = name
+            else:
+                parent = names[namespace]
+                names[member] = None if parent is None else parent + separator + name
+    return names, cycles
+
+
+def backfill(batch_size=BATCH_SIZE):
+    """
+    Recompute the qualified names of all the NamedElements, e.g., after loading fixtures or changing the
+    separator, and store the ones that changed.
+
+    :param batch_size: the number of NamedElements updated per transaction
+    :return: the number of NamedElements updated, and the primary keys of those in cycles of Namespaces
+    """
+    namespaces = {pk: (name, namespace) for pk, name, namespace in
+                  NamedElement.objects.values_list('pk', 'name', 'namespace_id')}
+    names, cycles = qualified_names(namespaces, qualified_name_separator())
+    current = dict(NamedElement.objects.values_list('pk', 'qualified_name'))
+    changed = [(pk, name) for pk, name in names.items() if current[pk] != name]
+    for start in range(0, len(changed), batch_size):
+        with transaction.atomic():
+            for pk, name in changed[start:start + batch_size]:
+                NamedElement.objects.filter(pk=pk).update(qualified_name=name)
+    return len(changed), cycles
+
+
+def _remember_qualified_name(sender, instance, **kwargs):
+    instance._old_qualified_name = instance.__dict__.get('qualified_name', _UNKNOWN)
+
+
+def _set_qualified_name(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not {'name', 'namespace', 'namespace_id'} & set(update_fields):
+        return
+    instance.qualified_name = _own_qualified_name(instance)
+
+
+def _own_qualified_name(element):
+    if element.name is None:
+        return None
+    if element.namespace_id is None:
+        return element.name
+    parent = NamedElement.objects.filter(pk=element.namespace_id).values_list('qualified_name', flat=True).first()
+    return None if parent is None else parent + qualified_name_separator() + element.name
+
+
+def _update_qualified_names(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    old = getattr(instance, '_old_qualified_name', _UNKNOWN)
+    new = instance.qualified_name
+    instance._old_qualified_name = new
+    if created or old == new:
+        return
+    with transaction.atomic():
+        if update_fields is not None and 'qualified_name' not in update_fields:
+            NamedElement.objects.filter(pk=instance.pk).update(qualified_name=new)
+        _cascade(instance.pk, old, new)
+
+
+def _cascade(pk, old, new):
+    """Update the qualified names of the NamedElements in a Namespace whose qualified name changed."""
+    separator = qualified_name_separator()
+    if new is not None and (old is None or old is _UNKNOWN):
+        # There is no prefix to replace
+        _recompute(pk, new, separator)
+        return
+    members = _members(pk)
+    for start in range(0, len(members), BATCH_SIZE):
+        chunk = NamedElement.objects.filter(pk__in=members[start:start + BATCH_SIZE])
+        if new is None:
+            chunk.update(qualified_name=None)
+        else:
+            # The members without a qualified name are in a Namespace without a name, they keep none
+            chunk.under(old, separator).update(qualified_name=Concat(
+                models.Value(new + separator), Substr('qualified_name', len(old + separator) + 1),
+                output_field=models.TextField()))
+
+
+def _members(pk):
+    """The primary keys of the NamedElements directly or indirectly in a Namespace."""
+    members = []
+    visited = {pk}
+    level = [pk]
+    while level:
+        found = []
+        for start in range(0, len(level), BATCH_SIZE):
+            found += NamedElement.objects.filter(namespace_id__in=level[start:start + BATCH_SIZE]) \
+                                         .values_list('pk', flat=True)
+        level = [member for member in found if member not in visited]
+        visited.update(level)
+        members += level
+    return members
+
+
+def _recompute(pk, qualified_name, separator):
+    """Recompute the qualified names under a Namespace, one level of Namespaces at a time."""
+    visited = {pk}
+    level = {pk: qualified_name}
+    while level:
+        found = {}
+        for namespace, name in level.items():
+            members = NamedElement.objects.filter(namespace_id=namespace)
+            if name is None:
+                members.update(qualified_name=None)
+            else:
+                members.filter(name__isnull=True).update(qualified_name=None)
+                members.filter(name__isnull=False).update(qualified_name=Concat(
+                    models.Value(name + separator), 'name', output_field=models.TextField()))
+            found.update((member, qualified) for member, qualified in members.values_list('pk', 'qualified_name')
+                         if member not in visited)
+        visited.update(found)
+        level = found
+
+
+def connect_signals():
+    """Keep the qualified names of the NamedElements up to date when they are saved."""
+    post_init.connect(_remember_qualified_name, sender=NamedElement, dispatch_uid='django_xmi_qualified_name_old')
+    pre_save.connect(_set_qualified_name, sender=NamedElement, dispatch_uid='django_xmi_qualified_name_set')
+    post_save.connect(_update_qualified_names, sender=NamedElement, dispatch_uid='django_xmi_qualified_name_update')
@@ -0,0 +1,133 @@
+import json
+from copy import copy, deepcopy
+
+from django.apps import apps
+from django.db import models
+
+
+class JSONTextField(models.TextField):
+    """A dictionary stored as JSON text, which works with every database backend."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('default', dict)
+        super().__init__(*args, **kwargs)
+
+    def from_db_value(self, value, expression, connection, *args):
+        return self.to_python(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, dict):
+            return value
+        return json.loads(value)
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        return json.dumps(value, sort_keys=True)
+
+    def value_to_string(self, obj):
+        return self.get_prep_value(self.value_from_object(obj))
+
+
+class JSONAttribute(object):
+    """
+    An attribute of a single-table model that is stored in its `attributes` JSON column, instead of a column of
+    its own, so the attributes of all the kinds of rows do not make the table wider.  It is None (or its default)
+    until it is set, and setting it to None removes it.  It can be set with the keyword arguments of the model
+    (e.g., `objects.create`), like a field.  The values must be serializable to JSON, and they cannot be filtered
+    on with the ORM.
+    """
+
+    def __init__(self, default=None, choices=None, help_text=''):
+        """
+        :param default: the value of the attribute when it is not set, or a callable that returns it, every
+                        instance gets its own copy of it
+        :param choices: the (value, label) pairs of the values of the attribute, for reference only
+        :param help_text: the description of the attribute
+        """
+        self.name = None
+        self.default = default
+        self.choices = choices
+        self.help_text = help_text
+
+    def contribute_to_class(self, cls, name):
+        self.name = name
+        setattr(cls, name, self)
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        if self.name in instance.attributes:
+            return instance.attributes[self.name]
+        # A copy, so changing the default of an instance does not change it for the others
+        return self.default() if callable(self.default) else deepcopy(self.default)
+
+    def __set__(self, instance, value):
+        if value is None:
+            instance.attributes.pop(self.name, None)
+        else:
+            instance.attributes[self.name] = value
+
+
+class SingleTableManager(models.Manager):
+    """Only return the rows of the kind of the model and of the kinds that specialize it."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.model._meta.proxy:
+            return queryset
+        return queryset.filter(kind__in=kinds(self.model))
+
+
+def kinds(model):
+    """
+    :param model: a single-table model
+    :return: the names of the model and of the proxy models that specialize it, i.e., the kinds of its rows
+    """
+    if '_kinds' not in model.__dict__:
+        model._kinds = sorted(other.__name__ for other in apps.get_app_config(model._meta.app_label).get_models()
+                              if issubclass(other, model))
+    return model._kinds
+
+
+class SingleTableModel(models.Model):
+    """
+    The base of the models generated with the single-table strategy (see `ModelRenderer`): each element without
+    a superclass gets one table, with the relations of all the elements that specialize it as columns, and the
+    other elements are proxy models of it.  The `kind` column holds the name of the model each row was created
+    with, and the managers of the proxy models only return the rows of their kinds.
+    """
+
+    kind = models.CharField(max_length=255, db_index=True, editable=False)
+    attributes = JSONTextField(blank=True)
+
+    objects = SingleTableManager()
+
+    class Meta:
+        abstract = True
+
+    def __init__(self, *args, **kwargs):
+        # Model.__init__ only accepts the fields, the JSONAttributes are set once the attributes column is
+        values = {name: kwargs.pop(name) for name in list(kwargs)
+                  if isinstance(getattr(type(self), name, None), JSONAttribute)}
+        super().__init__(*args, **kwargs)
+        for name, value in values.items():
+            setattr(self, name, value)
+
+    def save(self, *args, **kwargs):
+        if not self.kind:
+            self.kind = type(self).__name__
+        super().save(*args, **kwargs)
+
+    def downcast(self):
+        """
+        :return: the row as an instance of the model of its kind, e.g., a Class for an Element of kind 'Class'
+        """
+        model = apps.get_model(self._meta.app_label, self.kind)
+        if type(self) is model:
+            return self
+        instance = copy(self)
+        instance.__class__ = model
+        # The JSONAttributes of the two instances must not change together
+        instance.attributes = deepcopy(self.attributes)
+        return instance
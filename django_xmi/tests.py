@@ -1,3 +1,1281 @@
-from django.test import TestCase
+import ast
+import bz2
+import copy
+import gzip
+import json
+import lzma
+import os
+import pickle
+import random
+from io import BytesIO, StringIO
+from os import path
+from tempfile import TemporaryDirectory
+from unittest import mock
+from urllib.error import HTTPError, URLError
+from warnings import catch_warnings, simplefilter
+from zipfile import ZIP_DEFLATED, ZipFile
 
-# Create your tests here.
+import xmltodict
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, migrations, models
+from django.db.migrations.state import ProjectState
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from .closure import verify
+from .enumerations import enumeration_to_choices
+from .qualified_names import qualified_names
+from .single_table import JSONAttribute, SingleTableModel
+from .models import Element, ElementClosure, NamedElement, Namespace, sysml, uml
+from .xmi.accessors import AccessorRegistry
+from .xmi.cache import ParseCache
+from .xmi.fetch import Fetcher, MirrorFetcher
+from .xmi.graph import Closure, CycleError, find_cycles, topological_order
+from .xmi.parser import XmiParser
+from .xmi.pipeline import XmiPipeline
+from .xmi.records import Element as ElementRecord
+from .xmi.render import ModelRenderer
+from .xmi.util import DotDict, LazyDotDict
+from .xmi.writer import ModelWriter, write_atomic
+
+
+# A few elements of UML and SysML, with the features of the specifications the generation has to deal with:
+# multiple generalizations, enumerations, operations and rules named like fields, and stereotypes of a profile
+UML_XMI = """<?xml version="1.0" encoding="UTF-8"?>
+<xmi:XMI xmlns:xmi="http://www.omg.org/spec/XMI/20131001" xmlns:uml="http://www.omg.org/spec/UML/20131001">
+<uml:Package xmi:type="uml:Package" xmi:id="_0" name="UML">
+<packagedElement xmi:type="uml:Package" xmi:id="CommonStructure" name="CommonStructure">
+<packagedElement xmi:type="uml:Class" xmi:id="Element" name="Element" isAbstract="true">
+<ownedComment xmi:type="uml:Comment" xmi:id="Element-c">
+<body>An Element is a constituent of a model.</body></ownedComment>
+<ownedAttribute xmi:type="uml:Property" xmi:id="Element-owner" name="owner">
+<type xmi:idref="Element"/><lowerValue xmi:type="uml:LiteralInteger" xmi:id="Element-owner-l"/>
+</ownedAttribute>
+<ownedOperation xmi:type="uml:Operation" xmi:id="Element-allOwnedElements" name="allOwnedElements">
+<ownedComment xmi:type="uml:Comment" xmi:id="Element-allOwnedElements-c">
+<body>All the owned Elements.</body></ownedComment>
+</ownedOperation>
+<ownedRule xmi:type="uml:Constraint" xmi:id="Element-not_own_self" name="not_own_self">
+<specification xmi:type="uml:OpaqueExpression" xmi:id="Element-not_own_self-s"><language>OCL</language>
+<body>not allOwnedElements()-&gt;includes(self)</body></specification>
+</ownedRule>
+</packagedElement>
+<packagedElement xmi:type="uml:Class" xmi:id="NamedElement" name="NamedElement" isAbstract="true">
+<generalization xmi:type="uml:Generalization" xmi:id="NamedElement-g" general="Element"/>
+<ownedAttribute xmi:type="uml:Property" xmi:id="NamedElement-name" name="name">
+<type href="PrimitiveTypes.xmi#String"/><lowerValue xmi:type="uml:LiteralInteger" xmi:id="NamedElement-name-l"/>
+</ownedAttribute>
+<ownedAttribute xmi:type="uml:Property" xmi:id="NamedElement-namespace" name="namespace">
+<type xmi:idref="Namespace"/><lowerValue xmi:type="uml:LiteralInteger" xmi:id="NamedElement-namespace-l"/>
+</ownedAttribute>
+<ownedAttribute xmi:type="uml:Property" xmi:id="NamedElement-qualifiedName" name="qualifiedName">
+<type href="PrimitiveTypes.xmi#String"/>
+<lowerValue xmi:type="uml:LiteralInteger" xmi:id="NamedElement-qualifiedName-l"/>
+</ownedAttribute>
+<ownedAttribute xmi:type="uml:Property" xmi:id="NamedElement-visibility" name="visibility">
+<type xmi:idref="VisibilityKind"/><lowerValue xmi:type="uml:LiteralInteger" xmi:id="NamedElement-visibility-l"/>
+</ownedAttribute>
+<ownedOperation xmi:type="uml:Operation" xmi:id="NamedElement-qualifiedName.1" name="qualifiedName"/>
+<ownedOperation xmi:type="uml:Operation" xmi:id="NamedElement-separator" name="separator"/>
+</packagedElement>
+<packagedElement xmi:type="uml:Class" xmi:id="Namespace" name="Namespace" isAbstract="true">
+<generalization xmi:type="uml:Generalization" xmi:id="Namespace-g" general="NamedElement"/>
+<ownedAttribute xmi:type="uml:Property" xmi:id="Namespace-ownedMember" name="ownedMember">
+<type xmi:idref="NamedElement"/><lowerValue xmi:type="uml:LiteralInteger" xmi:id="Namespace-ownedMember-l"/>
+<upperValue xmi:type="uml:LiteralUnlimitedNatural" xmi:id="Namespace-ownedMember-u" value="*"/>
+</ownedAttribute>
+</packagedElement>
+<packagedElement xmi:type="uml:Enumeration" xmi:id="VisibilityKind" name="VisibilityKind">
+<ownedLiteral xmi:type="uml:EnumerationLiteral" xmi:id="VisibilityKind-public" name="public"/>
+<ownedLiteral xmi:type="uml:EnumerationLiteral" xmi:id="VisibilityKind-private" name="private"/>
+</packagedElement>
+</packagedElement>
+<packagedElement xmi:type="uml:Package" xmi:id="Classification" name="Classification">
+<packagedElement xmi:type="uml:Class" xmi:id="Type" name="Type" isAbstract="true">
+<generalization xmi:type="uml:Generalization" xmi:id="Type-g" general="NamedElement"/>
+</packagedElement>
+<packagedElement xmi:type="uml:Class" xmi:id="DeploymentTarget" name="DeploymentTarget" isAbstract="true">
+<generalization xmi:type="uml:Generalization" xmi:id="DeploymentTarget-g" general="NamedElement"/>
+</packagedElement>
+<packagedElement xmi:type="uml:Class" xmi:id="Classifier" name="Classifier" isAbstract="true">
+<generalization xmi:type="uml:Generalization" xmi:id="Classifier-g1" general="Namespace"/>
+<generalization xmi:type="uml:Generalization" xmi:id="Classifier-g2" general="Type"/>
+<ownedAttribute xmi:type="uml:Property" xmi:id="Classifier-isAbstract" name="isAbstract">
+<type href="PrimitiveTypes.xmi#Boolean"/>
+</ownedAttribute>
+</packagedElement>
+<packagedElement xmi:type="uml:Class" xmi:id="Enumeration" name="Enumeration">
+<generalization xmi:type="uml:Generalization" xmi:id="Enumeration-g" general="Type"/>
+</packagedElement>
+<packagedElement xmi:type="uml:Class" xmi:id="Stereotype" name="Stereotype">
+<generalization xmi:type="uml:Generalization" xmi:id="Stereotype-g" general="Classifier"/>
+</packagedElement>
+<packagedElement xmi:type="uml:Class" xmi:id="Property" name="Property">
+<generalization xmi:type="uml:Generalization" xmi:id="Property-g1" general="Type"/>
+<generalization xmi:type="uml:Generalization" xmi:id="Property-g2" general="DeploymentTarget"/>
+<ownedAttribute xmi:type="uml:Property" xmi:id="Property-classifier" name="classifier">
+<type xmi:idref="Classifier"/><lowerValue xmi:type="uml:LiteralInteger" xmi:id="Property-classifier-l"/>
+</ownedAttribute>
+<ownedRule xmi:type="uml:Constraint" xmi:id="Property-deployment_target" name="deployment_target">
+<specification xmi:type="uml:OpaqueExpression" xmi:id="Property-deployment_target-s"><language>OCL</language>
+<body>deployment-&gt;notEmpty()</body></specification>
+</ownedRule>
+</packagedElement>
+</packagedElement>
+</uml:Package>
+</xmi:XMI>
+"""
+
+SYSML_XMI = """<?xml version="1.0" encoding="UTF-8"?>
+<xmi:XMI xmlns:xmi="http://www.omg.org/spec/XMI/20131001" xmlns:uml="http://www.omg.org/spec/UML/20131001">
+<uml:Profile xmi:type="uml:Profile" xmi:id="SysML" name="SysML">
+<packageImport xmi:type="uml:PackageImport" xmi:id="SysML-import"><importedPackage href="UML.xmi#_0"/></packageImport>
+<packagedElement xmi:type="uml:Package" xmi:id="SysML.Blocks" name="Blocks">
+<packagedElement xmi:type="uml:Stereotype" xmi:id="SysML.Blocks_Block" name="Block">
+<ownedAttribute xmi:type="uml:Property" xmi:id="Block-base_Class" name="base_Class" association="x">
+<type href="UML.xmi#Classifier"/></ownedAttribute>
+<ownedAttribute xmi:type="uml:Property" xmi:id="Block-isEncapsulated" name="isEncapsulated">
+<type href="PrimitiveTypes.xmi#Boolean"/></ownedAttribute>
+</packagedElement>
+<packagedElement xmi:type="uml:Stereotype" xmi:id="SysML.Blocks_ValueType" name="ValueType">
+<ownedAttribute xmi:type="uml:Property" xmi:id="ValueType-base_DataType" name="base_DataType" association="x">
+<type href="UML.xmi#Type"/></ownedAttribute>
+</packagedElement>
+</packagedElement>
+<packagedElement xmi:type="uml:Package" xmi:id="SysML.Requirements" name="Requirements">
+<packagedElement xmi:type="uml:Stereotype" xmi:id="SysML.Requirements_Requirement" name="Requirement">
+<ownedAttribute xmi:type="uml:Property" xmi:id="Requirement-text" name="text">
+<type href="PrimitiveTypes.xmi#String"/></ownedAttribute>
+<ownedAttribute xmi:type="uml:Property" xmi:id="Requirement-base_Class" name="base_Class" association="x">
+<type href="UML.xmi#Classifier"/></ownedAttribute>
+</packagedElement>
+<packagedElement xmi:type="uml:Stereotype" xmi:id="SysML.Requirements_DeriveReqt" name="DeriveReqt">
+<generalization xmi:type="uml:Generalization" xmi:id="DeriveReqt-g" general="SysML.Requirements_Requirement"/>
+<ownedAttribute xmi:type="uml:Property" xmi:id="DeriveReqt-derived" name="derived">
+<type xmi:idref="SysML.Requirements_Requirement"/></ownedAttribute>
+</packagedElement>
+</packagedElement>
+</uml:Profile>
+</xmi:XMI>
+"""
+
+
+class Vehicle(SingleTableModel):
+    """A single-table model, like the models of the elements without superclasses."""
+
+    name = models.CharField(max_length=255, blank=True, null=True)
+
+
+class Car(Vehicle):
+    """A proxy model of a single-table model, with an attribute stored in its JSON column."""
+
+    doors = JSONAttribute(default=4, help_text='The number of doors.')
+    features = JSONAttribute(default=['radio'], help_text='The features of the car.')
+    options = JSONAttribute(default=dict, help_text='The options of the car, by name.')
+
+    class Meta:
+        proxy = True
+
+
+def write_fixtures(directory):
+    """Write the XMI files in a directory, returns their locations."""
+    locations = []
+    for filename, content in (('UML.xmi', UML_XMI), ('SysML.xmi', SYSML_XMI)):
+        locations.append(path.join(directory, filename))
+        with open(locations[-1], 'w', encoding='utf-8') as file:
+            file.write(content)
+    return locations
+
+
+class Unseekable(BytesIO):
+    """A file that can only be read from start to end, like the response to a request."""
+
+    def seekable(self):
+        return False
+
+    def seek(self, *args):
+        raise OSError('not seekable')
+
+
+def write_package(directory, filename, name, *imports):
+    """Write an XMI file with an empty package importing the packages of other XMI files, returns its location."""
+    location = path.join(directory, filename)
+    with open(location, 'w', encoding='utf-8') as file:
+        file.write('<xmi:XMI xmlns:xmi="http://www.omg.org/spec/XMI/20131001" '
+                   'xmlns:uml="http://www.omg.org/spec/UML/20131001">'
+                   '<uml:Package xmi:type="uml:Package" xmi:id="{0}" name="{0}">'.format(name))
+        for i, href in enumerate(imports):
+            file.write('<packageImport xmi:type="uml:PackageImport" xmi:id="{}-import{}">'
+                       '<importedPackage href="{}"/></packageImport>'.format(name, i, href))
+        file.write('</uml:Package></xmi:XMI>')
+    return location
+
+
+def process(locations, **options):
+    """Parse the XMI files and process their elements, like the notebook does, returns the parser."""
+    parser = XmiParser(**options)
+    for location in locations:
+        parser.parse(location)
+    parser.parse_profile(parser.packages.SysML)
+    parser.parse_profile(parser.packages.UML, 'Package')
+    parser.process_literals()
+    parser.process_attributes()
+    parser.process_operations_and_rules()
+    return parser
+
+
+def render(workers=1, **options):
+    """Parse, process and render the fixtures, returns the parser."""
+    with TemporaryDirectory() as directory:
+        parser = process(write_fixtures(directory))
+    with catch_warnings():
+        simplefilter('ignore')
+        ModelRenderer(parser, workers=workers, **options).render()
+    return parser
+
+
+def model_source(parser, name):
+    return '\n'.join(parser.elements[name].__django_model__)
+
+
+def walk(element):
+    """The primary keys of the Elements an Element owns, directly or not, one query per Element."""
+    owned = set()
+    for child in Element.objects.filter(owner=element):
+        owned.add(child.pk)
+        owned.update(walk(child))
+    return owned
+
+
+def shadowed_fields(source):
+    """Find the methods of the models in some source that have the name of a field of their model."""
+    shadowed = []
+    for node in ast.parse(source).body:
+        if isinstance(node, ast.ClassDef):
+            fields = {target.id for statement in node.body if isinstance(statement, ast.Assign)
+                      for target in statement.targets if isinstance(target, ast.Name)}
+            shadowed.extend('{}.{}'.format(node.name, statement.name) for statement in node.body
+                            if isinstance(statement, ast.FunctionDef) and statement.name in fields)
+    return shadowed
+
+
+class DotDictTest(SimpleTestCase):
+
+    def test_missing_attribute(self):
+        d = DotDict({'name': 'Element'})
+        self.assertEqual(d.name, 'Element')
+        self.assertRaises(AttributeError, getattr, d, 'owner')
+        self.assertIsNone(getattr(d, 'owner', None))
+        self.assertEqual(d['name'], 'Element')
+        self.assertRaises(KeyError, d.__getitem__, 'owner')
+
+    def test_pickle(self):
+        for cls in (DotDict, LazyDotDict):
+            d = cls({'Package': {'name': 'UML', 'packagedElement': [{'name': 'Element'}, {'name': 'Comment'}]}})
+            for loaded in (pickle.loads(pickle.dumps(d, protocol)) for protocol in range(pickle.HIGHEST_PROTOCOL + 1)):
+                self.assertIs(type(loaded), cls)
+                self.assertEqual(loaded, d)
+                self.assertEqual(loaded.Package.packagedElement.Comment.name, 'Comment')
+            self.assertEqual(copy.deepcopy(d), d)
+
+    def test_pickle_lazy(self):
+        d = LazyDotDict({'Package': {'name': 'UML', 'packagedElement': [{'name': 'Element'}, {'name': 'Comment'}]}})
+        d.Package.get('name')
+        for loaded in (pickle.loads(pickle.dumps(d, pickle.HIGHEST_PROTOCOL)), copy.deepcopy(d)):
+            # What was not read before is still not converted
+            self.assertEqual(loaded._pending, set())
+            self.assertEqual(dict.__getitem__(loaded, 'Package')._pending, {'packagedElement'})
+            self.assertEqual(loaded.Package.packagedElement.Comment.name, 'Comment')
+        self.assertEqual(d.Package._pending, {'packagedElement'})
+        self.assertIs(copy.copy(d).Package, d.Package)
+
+
+class GraphTest(SimpleTestCase):
+
+    # The generalizations of a few UML elements, with a superclass that is not one of the nodes
+    parents = {'element': [], 'named_element': ['element'], 'namespace': ['named_element'],
+               'type': ['named_element'], 'classifier': ['namespace', 'type'], 'comment': ['element'],
+               'stereotype': ['classifier', 'Class']}
+
+    def test_topological_order(self):
+        self.assertEqual(topological_order([('a', 'b'), ('a', 'c'), ('b', 'd'), ('c', 'd'), ('a', 'b')]),
+                         ['a', 'b', 'c', 'd'])
+        self.assertEqual(topological_order([('d', 'c'), ('c', 'a'), ('b', 'a')]), ['d', 'b', 'c', 'a'])
+        self.assertEqual(topological_order([]), [])
+
+    def test_cycles(self):
+        with self.assertRaises(CycleError) as context:
+            topological_order([('a', 'b'), ('b', 'c'), ('c', 'a'), ('c', 'd')])
+        self.assertEqual(context.exception.cycles, [['a', 'b', 'c']])
+        self.assertEqual(str(context.exception), 'Found 1 cycle(s): a -> b -> c -> a')
+        self.assertEqual(find_cycles({'x': ['x'], 'a': ['b'], 'b': ['a', 'c'], 'c': ['d'], 'd': ['c'], 'e': []}),
+                         [['x'], ['c', 'd'], ['a', 'b']])
+        self.assertEqual(find_cycles({'a': ['b', 'c'], 'b': ['c'], 'c': []}), [])
+        self.assertRaises(CycleError, Closure, {'a': ['b'], 'b': ['a']})
+
+    def test_closure(self):
+        closure = Closure(self.parents)
+        self.assertEqual(len(closure), 7)
+        self.assertNotIn('Class', closure)
+        self.assertEqual(closure.ancestors('element'), [])
+        self.assertEqual(closure.ancestors('classifier')[:2], ['element', 'named_element'])
+        self.assertEqual(set(closure.ancestors('stereotype')), {'element', 'named_element', 'namespace', 'type',
+                                                                'classifier'})
+        self.assertEqual(set(closure.descendants('named_element')), {'namespace', 'type', 'classifier',
+                                                                     'stereotype'})
+        self.assertEqual(closure.descendants('comment'), [])
+        self.assertTrue(closure.is_a('stereotype', 'element'))
+        self.assertTrue(closure.is_a('comment', 'comment'))
+        self.assertFalse(closure.is_a('comment', 'named_element'))
+        self.assertFalse(closure.is_a('stereotype', 'Class'))
+
+    def test_closure_against_walk(self):
+        generator = random.Random(3)
+        parents = {node: generator.sample(range(node), min(node, generator.randint(0, 3))) for node in range(300)}
+        closure = Closure(parents)
+
+        def walk(node, edges):
+            reached, stack = set(), list(edges[node])
+            while stack:
+                other = stack.pop()
+                if other not in reached:
+                    reached.add(other)
+                    stack.extend(edges[other])
+            return reached
+
+        children = {node: [other for other in parents if node in parents[other]] for node in parents}
+        for node in parents:
+            ancestors = closure.ancestors(node)
+            self.assertEqual(set(ancestors), walk(node, parents))
+            self.assertEqual(set(closure.descendants(node)), walk(node, children))
+            # Parents before children
+            for i, ancestor in enumerate(ancestors):
+                self.assertFalse(set(parents[ancestor]) & set(ancestors[i + 1:]))
+
+
+class ParseCacheTest(SimpleTestCase):
+
+    def test_round_trip(self):
+        with TemporaryDirectory() as directory:
+            uml, _ = write_fixtures(directory)
+            cache = ParseCache(path.join(directory, 'cache'))
+            parsed = XmiParser(cache=cache).parse(uml)
+            self.assertEqual(len(cache._entries()), 1)
+
+            with mock.patch('django_xmi.xmi.parser.xmltodict.parse', side_effect=AssertionError('not cached')):
+                parser = XmiParser(cache=cache)
+                loaded = parser.parse(uml)
+            self.assertEqual(loaded, parsed)
+            self.assertIsInstance(loaded, DotDict)
+            self.assertEqual(parser.packages.UML.Package.packagedElement.CommonStructure.name, 'CommonStructure')
+            self.assertIs(parser.resolve('UML.xmi#Element'), loaded.Package.packagedElement.CommonStructure
+                          .packagedElement.Element)
+
+    def test_fetched_once(self):
+        with TemporaryDirectory() as directory:
+            uml, _ = write_fixtures(directory)
+            with open(uml, 'rb') as file:
+                content = gzip.compress(file.read())
+            fetcher = mock.Mock(spec=Fetcher)
+            fetcher.open.side_effect = lambda url: Unseekable(content)
+            url = 'https://www.omg.org/spec/UML/20161101/UML.xmi.gz'
+            cache = ParseCache(path.join(directory, 'cache'))
+            with mock.patch('django_xmi.xmi.parser.xmltodict.parse', wraps=xmltodict.parse) as parse:
+                parsed = XmiParser(cache=cache, fetcher=fetcher).parse(url)
+            self.assertEqual(fetcher.open.call_count, 1)
+            # The decompressed content is streamed to the parser, not read into memory
+            self.assertTrue(hasattr(parse.call_args[0][0], 'read'))
+            self.assertEqual(XmiParser(cache=cache, fetcher=fetcher).parse(url), parsed)
+            self.assertEqual(fetcher.open.call_count, 2)
+            self.assertEqual(len(cache._entries()), 1)
+
+    def test_lazy(self):
+        with TemporaryDirectory() as directory:
+            uml, _ = write_fixtures(directory)
+            cache = ParseCache(path.join(directory, 'cache'))
+            XmiParser(cache=cache, lazy=True).parse(uml)
+            loaded = XmiParser(cache=cache, lazy=True).parse(uml)
+            self.assertEqual(dict.__getitem__(loaded, 'Package')._pending, {'packagedElement'})
+            # Lazy and eager trees are cached separately
+            self.assertIs(type(XmiParser(cache=cache).parse(uml)), DotDict)
+            self.assertEqual(len(cache._entries()), 2)
+
+    def test_failed_store(self):
+        with TemporaryDirectory() as directory:
+            cache = ParseCache(directory)
+            self.assertRaises(Exception, cache.store, 'key', DotDict({'function': lambda: None}))
+            self.assertEqual(cache._entries(), [])
+            self.assertEqual([name for name in os.listdir(directory) if name.endswith('.tmp')], [])
+
+
+class ParseManyTest(SimpleTestCase):
+
+    def test_serial_and_parallel(self):
+        with TemporaryDirectory() as directory:
+            locations = write_fixtures(directory)
+            serial, parallel = XmiParser(), XmiParser()
+            serial.parse_many(locations, workers=1)
+            parallel.parse_many(locations, workers=2)
+        self.assertEqual(parallel.packages, serial.packages)
+        self.assertEqual(parallel.locations, serial.locations)
+        self.assertEqual(parallel.ids.keys(), serial.ids.keys())
+        self.assertEqual(parallel.documents, serial.documents)
+        for location, xmi in parallel.locations.items():
+            self.assertIs(parallel.packages[xmi.get('Profile', xmi.get('Package')).name], xmi)
+        self.assertIs(parallel.resolve('UML.xmi#Element'),
+                      parallel.packages.UML.Package.packagedElement.CommonStructure.packagedElement.Element)
+
+
+class CompressionTest(SimpleTestCase):
+
+    def test_compressed(self):
+        with TemporaryDirectory() as directory:
+            uml, _ = write_fixtures(directory)
+            with open(uml, 'rb') as file:
+                content = file.read()
+            expected = XmiParser().parse(uml)
+            for suffix, compress in (('.gz', gzip.compress), ('.xz', lzma.compress), ('.bz2', bz2.compress)):
+                location = uml + suffix
+                with open(location, 'wb') as file:
+                    file.write(compress(content))
+                parser = XmiParser()
+                self.assertEqual(parser.parse(location), expected, suffix)
+                self.assertIs(parser.resolve('UML.xmi#Element'),
+                              parser.packages.UML.Package.packagedElement.CommonStructure.packagedElement.Element)
+                # The format is detected from the content when the name does not tell
+                os.replace(location, uml + '.model')
+                self.assertEqual(XmiParser().parse(uml + '.model'), expected, suffix)
+
+    def test_archive(self):
+        with TemporaryDirectory() as directory:
+            uml, sysml = write_fixtures(directory)
+            archive = path.join(directory, 'project.mdzip')
+            with ZipFile(archive, 'w', ZIP_DEFLATED) as file:
+                file.write(uml, 'model/UML.xmi')
+                file.write(sysml, 'model/SysML.xmi')
+                file.writestr('model/notes.txt', 'not XMI')
+            with open(sysml, 'rb') as file, ZipFile(path.join(directory, 'single.zip'), 'w') as single:
+                single.writestr('SysML.xmi', file.read())
+
+            cache = ParseCache(path.join(directory, 'cache'))
+            for parser in (XmiParser(), XmiParser(cache=cache), XmiParser(cache=cache)):
+                self.assertEqual(parser.parse(archive + '!model/UML.xmi'), XmiParser().parse(uml))
+                self.assertEqual(parser.parse(archive + '!/model/SysML.xmi'), XmiParser().parse(sysml))
+                self.assertEqual(list(parser.packages), ['UML', 'SysML'])
+            # The members of an archive are cached apart
+            self.assertEqual(len(cache._entries()), 2)
+
+            parser = XmiParser()
+            self.assertEqual(list(parser.parse_archive(archive)), ['model/UML.xmi', 'model/SysML.xmi'])
+            self.assertEqual(list(parser.packages), ['UML', 'SysML'])
+            self.assertEqual(XmiParser().parse(path.join(directory, 'single.zip')), XmiParser().parse(sysml))
+            self.assertRaises(ValueError, XmiParser().parse, archive)
+            self.assertRaises(ValueError, XmiParser().parse, archive + '!model/OCL.xmi')
+
+
+class AccessorRegistryTest(SimpleTestCase):
+
+    def test_registry(self):
+        accessors = AccessorRegistry()
+        accessors.register('NamedElement.namespace', 'NamedElement', 'namespace')
+        accessors.register('Element.owner', 'Element', 'owner')
+        self.assertIn('NamedElement.namespace', accessors)
+        self.assertNotIn('Namespace.named_element', accessors)
+        self.assertEqual((len(accessors), list(accessors)), (2, ['NamedElement.namespace', 'Element.owner']))
+
+        clash = accessors.clash('Namespace.named_element', 'Namespace', 'named_element', 'NamedElement.namespace')
+        self.assertEqual(clash.owner, ('NamedElement', 'namespace'))
+        accessors.clash('Comment.annotated_element', 'Comment', 'annotated_element', 'AnnotatedElement.comment')
+        self.assertEqual(accessors.report(), [
+            'Ignoring: Namespace.named_element (clashes with NamedElement.namespace)',
+            'Ignoring: Comment.annotated_element (clashes with AnnotatedElement.comment)'])
+        self.assertEqual(accessors.report(accessors.clashes[1:]),
+                         ['Ignoring: Comment.annotated_element (clashes with AnnotatedElement.comment)'])
+
+    def test_process_attributes(self):
+        # The reverse accessor of Namespace.named_element would be NamedElement.namespace
+        content = UML_XMI.replace(
+            '<ownedAttribute xmi:type="uml:Property" xmi:id="Namespace-ownedMember"',
+            '<ownedAttribute xmi:type="uml:Property" xmi:id="Namespace-namedElement" name="namedElement">'
+            '<type xmi:idref="NamedElement"/></ownedAttribute>\n'
+            '<ownedAttribute xmi:type="uml:Property" xmi:id="Namespace-ownedMember"')
+        with TemporaryDirectory() as directory:
+            location = path.join(directory, 'UML.xmi')
+            with open(location, 'w', encoding='utf-8') as file:
+                file.write(content)
+            parser = XmiParser()
+            parser.parse(location)
+        parser.parse_profile(parser.packages.UML, 'Package')
+        parser.process_literals()
+        with catch_warnings(record=True) as warnings:
+            simplefilter('always')
+            parser.process_attributes()
+        self.assertIn('Found 1 accessor clashes:\n\tIgnoring: Namespace.named_element (clashes with '
+                      'NamedElement.namespace)', [str(warning.message) for warning in warnings])
+        self.assertIn('Namespace.owned_member', parser.accessors)
+        self.assertNotIn('Namespace.named_element', parser.accessors)
+        self.assertEqual(parser.accessors.owners['NamedElement.namespace'], ('NamedElement', 'namespace'))
+        self.assertNotIn('__print__', parser.elements.namespace.attributes.namedElement)
+
+
+class StreamProfileTest(SimpleTestCase):
+
+    def test_same_as_parse_profile(self):
+        with TemporaryDirectory() as directory:
+            uml, sysml = write_fixtures(directory)
+            parsed = process([uml, sysml])
+            streamed = XmiParser()
+            self.assertEqual(streamed.stream_profile(sysml).name, 'SysML')
+            self.assertEqual(streamed.stream_profile(uml).name, 'UML')
+            streamed.process_literals()
+            streamed.process_attributes()
+            streamed.process_operations_and_rules()
+        self.assertEqual(list(streamed.elements), list(parsed.elements))
+        self.assertEqual(streamed.elements, parsed.elements)
+        self.assertIs(streamed.resolve('UML.xmi#Classifier'), streamed.elements.classifier)
+        self.assertIs(streamed.resolve('SysML.xmi#SysML.Requirements_Requirement'), streamed.elements.requirement)
+        with catch_warnings():
+            simplefilter('ignore')
+            ModelRenderer(parsed, workers=1).render()
+            ModelRenderer(streamed, workers=1).render()
+        for name, element in parsed.elements.items():
+            self.assertEqual(model_source(streamed, name), model_source(parsed, name))
+
+
+class RecordsTest(SimpleTestCase):
+
+    def test_same_as_dicts(self):
+        with TemporaryDirectory() as directory:
+            locations = write_fixtures(directory)
+            dicts = process(locations)
+            records = process(locations, records=True)
+        self.assertEqual(list(records.elements), list(dicts.elements))
+        for name, record in records.elements.items():
+            self.assertIs(type(record), ElementRecord)
+            # All the keys of the elements have a slot
+            self.assertEqual(record._extra, {})
+            self.assertEqual(dict(record), dict(dicts.elements[name]))
+            for key, child_cls in ElementRecord.children.items():
+                for child_name, child in record.get(key, {}).items():
+                    self.assertIs(type(child), child_cls)
+                    self.assertEqual(dict(child), dict(dicts.elements[name][key][child_name]))
+
+        attribute = records.elements.named_element.attributes.name
+        self.assertEqual((attribute.name, attribute.__field__), ('name', 'CharField'))
+        self.assertEqual(records.elements.visibility_kind.literals.private.name, 'private')
+        self.assertIs(records.resolve('UML.xmi#Classifier'), records.elements.classifier)
+
+        with catch_warnings():
+            simplefilter('ignore')
+            ModelRenderer(dicts, workers=1).render()
+            ModelRenderer(records, workers=1).render()
+        for name in dicts.elements:
+            self.assertEqual(model_source(records, name), model_source(dicts, name))
+
+
+class PruneTest(SimpleTestCase):
+
+    def setUp(self):
+        with TemporaryDirectory() as directory:
+            self.parser = process(write_fixtures(directory))
+
+    def assert_closed(self):
+        for element in self.parser.elements.values():
+            for name in self.parser.references(element):
+                self.assertIn(name, self.parser.elements)
+
+    def test_references(self):
+        elements = self.parser.elements
+        # Through the generalizations, and the types of the attributes
+        self.assertEqual(self.parser.references(elements.property), ['type', 'deployment_target', 'classifier'])
+        self.assertEqual(self.parser.references(elements.named_element), ['element', 'namespace'])
+        self.assertEqual(self.parser.references(elements.derive_reqt), ['requirement'])
+        self.assertEqual(self.parser.references(elements.element), [])
+
+    def test_prune_to_element(self):
+        removed = self.parser.prune(['Property'])
+        self.assertEqual(sorted(self.parser.elements), ['classifier', 'deployment_target', 'element', 'named_element',
+                                                        'namespace', 'property', 'type'])
+        self.assertEqual(sorted(removed), ['block', 'derive_reqt', 'enumeration', 'requirement', 'stereotype',
+                                           'value_type', 'visibility_kind'])
+        self.assert_closed()
+
+    def test_prune_to_package(self):
+        self.parser.prune(['SysML.Requirements'])
+        self.assertEqual(sorted(self.parser.elements), ['classifier', 'derive_reqt', 'element', 'named_element',
+                                                        'namespace', 'requirement', 'stereotype', 'type'])
+        self.assert_closed()
+        with catch_warnings(record=True) as warnings:
+            simplefilter('always')
+            self.assertEqual(self.parser.prune(['Requirement', 'SysML.Activities']), ['derive_reqt'])
+        self.assertEqual([str(warning.message) for warning in warnings],
+                         ["Could not find an element or a package named 'SysML.Activities' to keep"])
+
+
+class ImportTest(SimpleTestCase):
+
+    def test_relative_imports(self):
+        with TemporaryDirectory() as directory:
+            write_package(directory, 'A.xmi', 'A', 'B.xmi#B', 'sub/C.xmi#C')
+            write_package(directory, 'B.xmi', 'B')
+            os.mkdir(path.join(directory, 'sub'))
+            write_package(path.join(directory, 'sub'), 'C.xmi', 'C', '../B.xmi#B')
+            packages = XmiParser().resolve_imports(path.join(directory, 'A.xmi'))
+        self.assertEqual(list(packages), ['B', 'C', 'A'])
+
+    def test_duplicate_imports(self):
+        with TemporaryDirectory() as directory:
+            write_package(directory, 'A.xmi', 'A', 'B.xmi#B', 'C.xmi#C', 'B.xmi#other')
+            write_package(directory, 'B.xmi', 'B', 'D.xmi#D')
+            write_package(directory, 'C.xmi', 'C', './D.xmi#D')
+            write_package(directory, 'D.xmi', 'D')
+            parser = XmiParser()
+            with mock.patch.object(parser, '_load', wraps=parser._load) as load:
+                packages = parser.resolve_imports(path.join(directory, 'A.xmi'))
+        self.assertEqual(list(packages), ['D', 'B', 'C', 'A'])
+        self.assertEqual(sorted(path.basename(call[0][0]) for call in load.call_args_list),
+                         ['A.xmi', 'B.xmi', 'C.xmi', 'D.xmi'])
+
+    def test_cyclic_imports(self):
+        with TemporaryDirectory() as directory:
+            write_package(directory, 'A.xmi', 'A', 'B.xmi#B')
+            write_package(directory, 'B.xmi', 'B', 'C.xmi#C')
+            write_package(directory, 'C.xmi', 'C', 'A.xmi#A')
+            with catch_warnings(record=True) as warnings:
+                simplefilter('always')
+                packages = XmiParser().resolve_imports(path.join(directory, 'A.xmi'))
+        self.assertEqual(list(packages), ['C', 'B', 'A'])
+        self.assertEqual(len(warnings), 1)
+        self.assertIn('import cycle', str(warnings[0].message))
+
+    def test_import_package(self):
+        with TemporaryDirectory() as directory:
+            location = write_package(directory, 'A.xmi', 'A', 'B.xmi#B')
+            write_package(directory, 'B.xmi', 'B')
+            parser = XmiParser()
+            self.assertEqual(list(parser.import_package(parser.parse(location))), ['B', 'A'])
+
+            # Without a location, relative imports are resolved against the working directory
+            xmi = XmiParser().parse(location)
+            cwd = os.getcwd()
+            os.chdir(directory)
+            try:
+                packages = XmiParser().import_package(xmi)
+            finally:
+                os.chdir(cwd)
+        self.assertEqual(list(packages), ['B', 'A'])
+
+
+class Response(BytesIO):
+    """The response to a request, for stubbing urlopen."""
+
+    def __init__(self, content, headers=None):
+        super().__init__(content)
+        self.headers = headers or {}
+
+
+class MirrorFetcherTest(SimpleTestCase):
+
+    url = 'https://www.omg.org/spec/UML/20161101/UML.xmi'
+
+    def test_offline(self):
+        with TemporaryDirectory() as directory:
+            fetcher = MirrorFetcher(directory, offline=True)
+            filename = fetcher.mirror_path(self.url)
+            self.assertEqual(filename, path.join(directory, 'www.omg.org', 'spec', 'UML', '20161101', 'UML.xmi'))
+            os.makedirs(path.dirname(filename))
+            with open(filename, 'wb') as file:
+                file.write(b'<xmi:XMI/>')
+            with mock.patch('django_xmi.xmi.fetch.urllib.request.urlopen', side_effect=AssertionError('online')):
+                with fetcher.open(self.url) as file:
+                    self.assertEqual(file.read(), b'<xmi:XMI/>')
+                self.assertRaises(FileNotFoundError, fetcher.open, self.url.replace('UML', 'SysML'))
+
+    def test_revalidate(self):
+        with TemporaryDirectory() as directory:
+            fetcher = MirrorFetcher(directory)
+            headers = {'ETag': '"1"', 'Last-Modified': 'Tue, 01 Nov 2016 00:00:00 GMT'}
+            with mock.patch('django_xmi.xmi.fetch.urllib.request.urlopen',
+                            return_value=Response(b'<xmi:XMI/>', headers)) as urlopen:
+                filename = fetcher.fetch(self.url)
+            self.assertEqual(urlopen.call_args[0][0].headers, {})
+            with open(filename + MirrorFetcher.meta_suffix, 'rb') as file:
+                meta = file.read()
+            mtime = os.stat(filename).st_mtime_ns
+
+            not_modified = HTTPError(self.url, 304, 'Not Modified', {}, None)
+            with mock.patch('django_xmi.xmi.fetch.urllib.request.urlopen', side_effect=not_modified) as urlopen:
+                self.assertEqual(fetcher.fetch(self.url), filename)
+                self.assertTrue(fetcher.validator(self.url).startswith('"1" Tue, 01 Nov 2016 00:00:00 GMT'))
+            request = urlopen.call_args[0][0]
+            self.assertEqual(request.get_header('If-none-match'), '"1"')
+            self.assertEqual(request.get_header('If-modified-since'), 'Tue, 01 Nov 2016 00:00:00 GMT')
+            # The mirrored copy and its metadata are reused as they are
+            with open(filename, 'rb') as file:
+                self.assertEqual(file.read(), b'<xmi:XMI/>')
+            with open(filename + MirrorFetcher.meta_suffix, 'rb') as file:
+                self.assertEqual(file.read(), meta)
+            self.assertEqual(os.stat(filename).st_mtime_ns, mtime)
+
+            # If the server cannot be reached, the mirrored copy is used
+            with mock.patch('django_xmi.xmi.fetch.urllib.request.urlopen', side_effect=URLError('offline')):
+                with catch_warnings(record=True) as warnings:
+                    simplefilter('always')
+                    self.assertEqual(fetcher.fetch(self.url), filename)
+            self.assertEqual(len(warnings), 1)
+
+    def test_failed_download(self):
+        with TemporaryDirectory() as directory:
+            fetcher = MirrorFetcher(directory)
+            with mock.patch('django_xmi.xmi.fetch.urllib.request.urlopen',
+                            return_value=Response(b'<xmi:XMI/>', {'ETag': '"1"'})):
+                filename = fetcher.fetch(self.url)
+
+            response = Response(b'<xmi:XMI>', {'ETag': '"2"'})
+            response.read = mock.Mock(side_effect=ConnectionResetError('reset'))
+            with mock.patch('django_xmi.xmi.fetch.urllib.request.urlopen', return_value=response):
+                self.assertRaises(ConnectionResetError, fetcher.fetch, self.url)
+            with open(filename, 'rb') as file:
+                self.assertEqual(file.read(), b'<xmi:XMI/>')
+            # The metadata of the previous copy is gone, the copy is revalidated by its modification time
+            self.assertEqual(os.listdir(path.dirname(filename)), ['UML.xmi'])
+
+            with mock.patch('django_xmi.xmi.fetch.urllib.request.urlopen',
+                            return_value=Response(b'<xmi:XMI></xmi:XMI>', {'ETag': '"3"'})):
+                with mock.patch('django_xmi.xmi.fetch.json.dumps', side_effect=ValueError('failed')):
+                    self.assertRaises(ValueError, fetcher.fetch, self.url)
+            self.assertEqual(os.listdir(path.dirname(filename)), ['UML.xmi'])
+
+
+class PipelineTest(SimpleTestCase):
+
+    def run_pipeline(self, directory, cache):
+        pipeline = XmiPipeline(write_fixtures(directory), path.join(directory, 'models'), cache=cache,
+                               trace_memory=False, workers=1)
+        with catch_warnings(record=True) as warnings:
+            simplefilter('always')
+            report = pipeline.run()
+        return report, [str(warning.message) for warning in warnings]
+
+    def test_cached_stages(self):
+        with TemporaryDirectory() as directory:
+            cache = ParseCache(path.join(directory, 'cache'))
+            report, _ = self.run_pipeline(directory, cache)
+            self.assertFalse(any(stage.cached for stage in report))
+            report, _ = self.run_pipeline(directory, cache)
+            self.assertEqual([stage.name for stage in report if not stage.cached], ['write'])
+
+    def test_failed_store(self):
+        with TemporaryDirectory() as directory:
+            cache = ParseCache(path.join(directory, 'cache'))
+            with mock.patch.object(cache, 'store', side_effect=OSError('No space left on device')):
+                report, warnings = self.run_pipeline(directory, cache)
+            self.assertEqual(report[-1].name, 'write')
+            self.assertTrue(path.exists(path.join(directory, 'models', 'uml.py')))
+            self.assertIn("Could not cache the outputs of stage 'parse': No space left on device", warnings)
+
+
+    def run_remote_pipeline(self, directory, fetcher):
+        pipeline = XmiPipeline(['https://www.omg.org/spec/UML/20161101/UML.xmi',
+                                'https://www.omg.org/spec/SysML/20181001/SysML.xmi'],
+                               path.join(directory, 'models'), cache=ParseCache(path.join(directory, 'cache')),
+                               trace_memory=False, workers=1, parser=XmiParser(fetcher=fetcher))
+        with catch_warnings():
+            simplefilter('ignore')
+            return [stage.name for stage in pipeline.run() if not stage.cached]
+
+    def remote_fetcher(self, directory, validator):
+        contents = {}
+        for location in write_fixtures(directory):
+            with open(location, 'rb') as file:
+                contents[path.basename(location)] = file.read()
+        fetcher = mock.Mock(spec=Fetcher)
+        fetcher.open.side_effect = lambda url: Unseekable(contents[url.rsplit('/', 1)[-1]])
+        fetcher.validator.return_value = validator
+        return fetcher
+
+    def test_remote_validated(self):
+        with TemporaryDirectory() as directory:
+            fetcher = self.remote_fetcher(directory, '"etag-1"')
+            self.assertEqual(self.run_remote_pipeline(directory, fetcher)[0], 'parse')
+            self.assertEqual(fetcher.open.call_count, 2)
+            # The files have not changed, they are not downloaded
+            self.assertEqual(self.run_remote_pipeline(directory, fetcher), ['write'])
+            self.assertEqual(fetcher.open.call_count, 2)
+            fetcher.validator.return_value = '"etag-2"'
+            self.assertEqual(self.run_remote_pipeline(directory, fetcher)[0], 'parse')
+            self.assertEqual(fetcher.open.call_count, 4)
+
+    def test_remote_without_validator(self):
+        with TemporaryDirectory() as directory:
+            fetcher = self.remote_fetcher(directory, None)
+            # The files are downloaded once per run, to compute their version and to parse them
+            self.assertEqual(self.run_remote_pipeline(directory, fetcher)[0], 'parse')
+            self.assertEqual(fetcher.open.call_count, 2)
+            self.assertEqual(self.run_remote_pipeline(directory, fetcher), ['write'])
+            self.assertEqual(fetcher.open.call_count, 4)
+
+
+class RenderTest(SimpleTestCase):
+
+    def test_reverse_accessor_clash(self):
+        # The reverse accessor of Namespace.named_element would be NamedElement.namespace, which is a field
+        source = model_source(render(), 'namespace')
+        self.assertIn("named_element = models.OneToOneField('NamedElement', on_delete=models.CASCADE, "
+                      "primary_key=True, related_name='%(app_label)s_%(class)s_named_element')", source)
+        self.assertIn("named_element = models.OneToOneField('NamedElement', on_delete=models.CASCADE, "
+                      "primary_key=True)\n", model_source(render(), 'type') + '\n')
+
+    def test_serial_and_parallel(self):
+        for options in ({}, {'inherit': True}, {'strategy': 'single-table'}):
+            serial = ModelWriter(render(1, **options), 'models').modules()
+            parallel = ModelWriter(render(2, **options), 'models').modules()
+            self.assertEqual(list(parallel), list(serial))
+            for filename, content in serial.items():
+                self.assertEqual(parallel[filename].encode(), content.encode(), filename)
+
+    def test_method_named_like_superclass(self):
+        # The rule Property::deployment_target has the name of the one-to-one field to DeploymentTarget
+        source = model_source(render(), 'property')
+        self.assertIn("    deployment_target = models.OneToOneField('DeploymentTarget')", source)
+        self.assertIn('    def validate_deployment_target(self):', source)
+
+    def test_extension(self):
+        # Element inherits all_owned_elements from the hand-written ElementBase, so it is not generated
+        parser = render()
+        source = model_source(parser, 'element')
+        self.assertIn('class Element(ElementBase):', source)
+        self.assertNotIn('def all_owned_elements', source)
+        # NamedElement inherits its indexed qualified_name, its manager and the methods that read them
+        source = model_source(parser, 'named_element')
+        self.assertIn('class NamedElement(NamedElementBase):', source)
+        self.assertNotIn('qualified_name', source)
+        self.assertNotIn('def separator', source)
+        self.assertIn('class Namespace(models.Model):', model_source(parser, 'namespace'))
+        modules = ModelWriter(parser, 'models').modules()
+        self.assertTrue(modules[path.join('models', 'uml.py')].startswith(
+            'from django.db import models\nfrom .base import ElementBase, NamedElementBase\n'))
+        self.assertNotIn('ElementBase', modules[path.join('models', 'sysml.py')])
+
+    def test_no_shadowed_fields(self):
+        parser = render()
+        self.assertEqual(shadowed_fields('\n'.join(model_source(parser, name) for name in parser.elements)), [])
+        for module in (uml, sysml):
+            with open(module.__file__, encoding='utf-8') as file:
+                self.assertEqual(shadowed_fields(file.read()), [], module.__name__)
+
+
+class WriterTest(SimpleTestCase):
+
+    init = 'from .uml import *\nfrom .sysml import *\nfrom .closure import ElementClosure\n'
+
+    def write(self, parser, directory, layout):
+        with catch_warnings():
+            simplefilter('ignore')
+            return ModelWriter(parser, directory, incremental=True, layout=layout).write()
+
+    def read(self, *names):
+        with open(path.join(*names), encoding='utf-8') as file:
+            return file.read()
+
+    def test_hand_written_init(self):
+        parser = render()
+        with TemporaryDirectory() as directory:
+            with open(path.join(directory, '__init__.py'), 'w', encoding='utf-8') as file:
+                file.write(self.init)
+
+            self.write(parser, directory, 'package')
+            init = self.read(directory, '__init__.py')
+            self.assertIn("'UML.CommonStructure': 'uml.common_structure',", init)
+            self.assertTrue(init.endswith('\nfrom .closure import ElementClosure\n'))
+            self.assertNotIn('from .uml import *', init)
+            report = self.write(parser, directory, 'package')
+            self.assertIn(path.join(directory, '__init__.py'), report.unchanged)
+
+            self.write(parser, directory, 'profile')
+            self.assertEqual(self.read(directory, '__init__.py'), self.init)
+            self.assertTrue(path.exists(path.join(directory, 'uml.py')))
+            self.assertEqual(os.listdir(path.join(directory, 'uml')), [])
+
+    def test_report(self):
+        parser = render()
+        with TemporaryDirectory() as directory:
+            report = self.write(parser, directory, 'profile')
+            modules = [path.join(directory, 'uml.py'), path.join(directory, 'sysml.py')]
+            self.assertEqual((report.written, report.unchanged), (modules, []))
+            self.assertIn(('UML.CommonStructure', 'Element'), report.added)
+            self.assertIn(('SysML.Blocks', 'Block'), report.added)
+            self.assertEqual((report.changed, report.removed), ([], []))
+
+            # Unchanged modules are not rewritten
+            for filename in modules:
+                os.utime(filename, ns=(10 ** 18, 10 ** 18))
+            report = self.write(parser, directory, 'profile')
+            self.assertEqual((report.written, report.unchanged), ([], modules))
+            self.assertEqual(report.added + report.changed + report.removed, [])
+            self.assertEqual([os.stat(filename).st_mtime_ns for filename in modules], [10 ** 18] * 2)
+
+            # A model of another profile with the name of an existing model
+            block = copy.deepcopy(parser.elements.block)
+            block.__profile__, block.__package__ = 'UML', 'UML.Blocks'
+            parser.elements.uml_block = block
+            report = self.write(parser, directory, 'profile')
+            self.assertEqual((report.written, report.unchanged), (modules[:1], modules[1:]))
+            self.assertEqual((report.added, report.changed, report.removed), ([('UML.Blocks', 'Block')], [], []))
+
+            block.__django_model__ = block.__django_model__ + ['    # changed']
+            report = self.write(parser, directory, 'profile')
+            self.assertEqual((report.added, report.changed, report.removed), ([], [('UML.Blocks', 'Block')], []))
+
+            del parser.elements.uml_block
+            parser.elements.block.__django_model__ = parser.elements.block.__django_model__ + ['    # changed']
+            report = self.write(parser, directory, 'profile')
+            self.assertEqual((report.written, report.unchanged), (modules, []))
+            self.assertEqual((report.added, report.changed, report.removed),
+                             ([], [('SysML.Blocks', 'Block')], [('UML.Blocks', 'Block')]))
+
+    def test_manifest_version_1(self):
+        parser = render()
+        with TemporaryDirectory() as directory:
+            writer = ModelWriter(parser, directory, incremental=True)
+            self.write(parser, directory, 'profile')
+            modules = writer.read_manifest()
+            for entry in modules.values():
+                entry['models'] = {model: model_fingerprint for models in entry['models'].values()
+                                   for model, model_fingerprint in models.items()}
+            with open(writer.manifest_path, 'w', encoding='utf-8') as file:
+                json.dump({'version': 1, 'modules': modules}, file)
+
+            parser.elements.block.__django_model__ = parser.elements.block.__django_model__ + ['    # changed']
+            report = self.write(parser, directory, 'profile')
+            self.assertEqual(report.written, [path.join(directory, 'sysml.py')])
+            self.assertEqual((report.added, report.changed, report.removed), ([], [('SysML.Blocks', 'Block')], []))
+
+    def test_failed_write_atomic(self):
+        with TemporaryDirectory() as directory:
+            filename = path.join(directory, 'uml.py')
+            write_atomic(filename, 'class Element(models.Model):\n')
+            # Content that cannot be encoded, and a file that cannot be replaced
+            self.assertRaises(UnicodeEncodeError, write_atomic, filename, 'name = "\udc80"\n')
+            with mock.patch('django_xmi.xmi.writer.os.replace', side_effect=PermissionError('denied')):
+                self.assertRaises(PermissionError, write_atomic, filename, 'class Comment(models.Model):\n')
+            self.assertEqual(os.listdir(directory), ['uml.py'])
+            self.assertEqual(self.read(filename), 'class Element(models.Model):\n')
+
+
+class QualifiedNameTest(TestCase):
+
+    def create(self, name, namespace=None):
+        element = NamedElement(element=Element.objects.create(), name=name, namespace=namespace)
+        element.save()
+        return element, Namespace.objects.create(named_element=element)
+
+    def test_constructor(self):
+        vehicle, vehicle_namespace = self.create('Vehicle')
+        engine, _ = self.create('Engine', vehicle_namespace)
+        self.assertEqual(engine.namespace_id, vehicle.pk)
+        self.assertEqual(engine.qualified_name, 'Vehicle::Engine')
+        self.assertEqual(NamedElement.objects.get(pk=engine.pk).qualified_name, 'Vehicle::Engine')
+        self.assertEqual(vehicle.django_xmi_namespace_named_element, vehicle_namespace)
+        field = NamedElement._meta.get_field('qualified_name')
+        self.assertEqual((field.get_internal_type(), field.db_index), ('TextField', True))
+
+    def assertQualifiedNames(self):
+        namespaces = {pk: (name, namespace) for pk, name, namespace in
+                      NamedElement.objects.values_list('pk', 'name', 'namespace_id')}
+        self.assertEqual(dict(NamedElement.objects.values_list('pk', 'qualified_name')),
+                         qualified_names(namespaces, '::')[0])
+        for element in NamedElement.objects.all():
+            self.assertEqual(element.get_qualified_name(), element.qualified_name)
+            self.assertTrue(element.has_qualified_name())
+            self.assertTrue(element.has_no_qualified_name())
+
+    def test_rename_and_move(self):
+        vehicle, vehicle_namespace = self.create('Vehicle')
+        powertrain, powertrain_namespace = self.create('Powertrain', vehicle_namespace)
+        engine, engine_namespace = self.create('Engine', powertrain_namespace)
+        self.create('Piston', engine_namespace)
+        unnamed, unnamed_namespace = self.create(None, vehicle_namespace)
+        self.create('Inner', unnamed_namespace)
+        self.assertQualifiedNames()
+        self.assertEqual(sorted(NamedElement.objects.under('Vehicle::Powertrain').values_list('name', flat=True)),
+                         ['Engine', 'Piston'])
+        self.assertEqual(NamedElement.objects.qualified('Vehicle::Powertrain::Engine::Piston').count(), 1)
+
+        powertrain.name = 'Drivetrain'
+        powertrain.save()
+        self.assertQualifiedNames()
+        engine.namespace = unnamed_namespace
+        engine.save()
+        self.assertQualifiedNames()
+        self.assertIsNone(NamedElement.objects.get(name='Piston').qualified_name)
+        unnamed.name = 'Named'
+        unnamed.save(update_fields=['name'])
+        self.assertQualifiedNames()
+        self.assertEqual(NamedElement.objects.get(name='Piston').qualified_name, 'Vehicle::Named::Engine::Piston')
+
+    @override_settings(DJANGO_XMI_QUALIFIED_NAME_SEPARATOR='.')
+    def test_backfill(self):
+        self.create('Engine', self.create('Vehicle')[1])
+        NamedElement.objects.update(qualified_name=None)
+        call_command('backfill_qualified_names', batch_size=1, stdout=StringIO())
+        self.assertEqual(NamedElement.objects.get(name='Engine').qualified_name, 'Vehicle.Engine')
+        self.assertEqual(NamedElement.objects.get(name='Engine').separator(), '.')
+
+
+class AllOwnedElementsTest(TestCase):
+
+    def setUp(self):
+        # A random tree, each Element is owned by one of the 20 Elements created before it
+        generator = random.Random(1)
+        elements = [Element(pk=1)]
+        for pk in range(2, 301):
+            elements.append(Element(pk=pk, owner_id=generator.randint(max(1, pk - 20), pk - 1)))
+        Element.objects.bulk_create(elements)
+
+    def test_walk(self):
+        for pk in (1, 2, 37, 150, 300):
+            element = Element.objects.get(pk=pk)
+            self.assertEqual(set(element.all_owned_elements().values_list('pk', flat=True)), walk(element))
+        self.assertEqual(Element.objects.get(pk=300).all_owned_elements().count(), 0)
+
+    def test_single_query(self):
+        element = Element.objects.get(pk=1)
+        with self.assertNumQueries(1):
+            self.assertEqual(element.all_owned_elements().count(), 299)
+
+    def test_cycle(self):
+        Element.objects.filter(pk=1).update(owner_id=5)
+        element = Element.objects.get(pk=5)
+        self.assertTrue(element.all_owned_elements().filter(pk=5).exists())
+        self.assertEqual(element.all_owned_elements().count(), 300)
+        self.assertFalse(element.not_own_self())
+        self.assertTrue(Element.objects.get(pk=300).not_own_self())
+
+
+@override_settings(DJANGO_XMI_ELEMENT_CLOSURE=True)
+class ElementClosureTest(TestCase):
+
+    def setUp(self):
+        self.random = random.Random(2)
+        self.elements = [Element.objects.create()]
+        for _ in range(100):
+            self.elements.append(Element.objects.create(owner=self.random.choice(self.elements)))
+
+    def assertConsistent(self):
+        self.assertEqual(verify(), (set(), set(), []))
+
+    def assertOwned(self, element):
+        self.assertEqual(set(element.all_owned_elements().values_list('pk', flat=True)), walk(element))
+
+    def test_create(self):
+        self.assertConsistent()
+        for element in self.elements[:10]:
+            self.assertOwned(element)
+            self.assertTrue(element.not_own_self())
+
+    def test_move(self):
+        for _ in range(50):
+            element = Element.objects.get(pk=self.random.choice(self.elements[1:]).pk)
+            owner = self.random.choice(self.elements)
+            if owner.pk == element.pk or owner.pk in walk(element):
+                continue
+            element.owner = owner
+            element.save()
+        self.assertConsistent()
+        for element in self.elements[:10]:
+            self.assertOwned(element)
+
+    def test_cycle(self):
+        first = Element.objects.create()
+        second = Element.objects.create(owner=first)
+        third = Element.objects.create(owner=second)
+        for owner in (first, third):
+            first.owner = owner
+            self.assertRaises(ValueError, first.save)
+        self.assertEqual(Element.objects.get(pk=first.pk).owner_id, None)
+        self.assertConsistent()
+
+    def test_update_fields(self):
+        first, second = Element.objects.create(), Element.objects.create()
+        for field in ('owner', 'owner_id'):
+            second.owner = None if second.owner_id else first
+            second.save(update_fields=[field])
+            self.assertEqual(list(ElementClosure.objects.ancestors(second)), [first] if second.owner_id else [])
+        self.assertConsistent()
+
+    def test_update(self):
+        # QuerySet.update bypasses the signals, which the commands detect and repair
+        first = Element.objects.create()
+        second = Element.objects.create(owner=first)
+        Element.objects.filter(pk=first.pk).update(owner=second)
+        self.assertFalse(Element.objects.get(pk=first.pk).not_own_self())
+        Element.objects.filter(pk=first.pk).update(owner=None)
+        Element.objects.filter(pk=self.elements[5].pk).update(owner=self.elements[0])
+        with self.assertRaises(CommandError):
+            call_command('verify_element_closure', stdout=StringIO(), stderr=StringIO())
+        call_command('rebuild_element_closure', batch_size=100, stdout=StringIO())
+        call_command('verify_element_closure', stdout=StringIO())
+        self.assertConsistent()
+        self.assertOwned(self.elements[0])
+
+
+class SingleTableTest(TestCase):
+
+    def test_constructor(self):
+        car = Car(name='Roadster', doors=2)
+        self.assertEqual((car.name, car.doors, car.attributes), ('Roadster', 2, {'doors': 2}))
+        car.save()
+        car = Car.objects.get(pk=car.pk)
+        self.assertEqual((car.kind, car.name, car.doors), ('Car', 'Roadster', 2))
+        self.assertEqual(Car(name='Sedan').doors, 4)
+        self.assertEqual(Car(name='Sedan', doors=None).attributes, {})
+        self.assertRaises(TypeError, Car, wheels=4)
+
+    def test_create(self):
+        car = Car.objects.create(name='Hatchback', doors=3)
+        vehicle = Vehicle.objects.create(name='Bicycle')
+        self.assertEqual(Car.objects.get(pk=car.pk).doors, 3)
+        self.assertEqual(list(Car.objects.all()), [car])
+        self.assertEqual(sorted(Vehicle.objects.values_list('kind', flat=True)), ['Car', 'Vehicle'])
+        downcast = Vehicle.objects.get(pk=car.pk).downcast()
+        self.assertIsInstance(downcast, Car)
+        self.assertEqual(downcast.doors, 3)
+        self.assertIs(Vehicle.objects.get(pk=vehicle.pk).downcast().__class__, Vehicle)
+
+    def test_mutable_defaults(self):
+        car, other = Car(name='Roadster'), Car(name='Sedan')
+        car.features.append('gps')
+        car.options['color'] = 'red'
+        self.assertEqual((other.features, other.options), (['radio'], {}))
+        self.assertEqual((Car.features.default, car.attributes), (['radio'], {}))
+        car.features = car.features + ['gps']
+        self.assertEqual(car.attributes, {'features': ['radio', 'gps']})
+
+    def test_downcast_copies_attributes(self):
+        car = Car.objects.create(name='Roadster', features=['radio', 'gps'])
+        vehicle = Vehicle.objects.get(pk=car.pk)
+        downcast = vehicle.downcast()
+        downcast.doors = 2
+        downcast.features.append('sunroof')
+        self.assertEqual(vehicle.attributes, {'features': ['radio', 'gps']})
+        self.assertEqual((downcast.doors, downcast.features), (2, ['radio', 'gps', 'sunroof']))
+
+
+class EnumerationModeTest(SimpleTestCase):
+
+    def process(self, enumerations):
+        # NamedElement.visibility is private by default
+        content = UML_XMI.replace(
+            '<type xmi:idref="VisibilityKind"/>',
+            '<type xmi:idref="VisibilityKind"/><defaultValue xmi:type="uml:InstanceValue" '
+            'xmi:id="NamedElement-visibility-d" instance="VisibilityKind-private"/>')
+        with TemporaryDirectory() as directory:
+            location = path.join(directory, 'UML.xmi')
+            with open(location, 'w', encoding='utf-8') as file:
+                file.write(content)
+            parser = XmiParser(enumerations=enumerations)
+            parser.parse(location)
+        parser.parse_profile(parser.packages.UML, 'Package')
+        parser.process_literals()
+        parser.process_attributes()
+        parser.process_operations_and_rules()
+        with catch_warnings():
+            simplefilter('ignore')
+            ModelRenderer(parser, workers=1).render()
+        return parser
+
+    def test_models(self):
+        parser = self.process('models')
+        self.assertIn('visibility_kind', parser.elements)
+        self.assertIn('    visibility = models.IntegerField(choices=VISIBILITY_KIND_CHOICES, ',
+                      model_source(parser, 'named_element'))
+
+    def test_choices(self):
+        parser = self.process('choices')
+        source = model_source(parser, 'named_element')
+        self.assertIn("    VISIBILITY_KIND_CHOICES = ((0, 'public'),\n        (1, 'private'))", source)
+        self.assertIn('    visibility = models.SmallIntegerField(choices=VISIBILITY_KIND_CHOICES, blank=True, '
+                      'null=True, default=1, ', source)
+        self.assertEqual(parser.literals.VisibilityKind.codes, {'public': '0', 'private': '1'})
+        # The enumeration is only used as choices, so it has no model anymore
+        self.assertNotIn('visibility_kind', parser.elements)
+        self.assertNotIn('visibility_kind', parser.ordered_elements())
+        self.assertIn('enumeration', parser.elements)
+        self.assertNotIn('class VisibilityKind(', ''.join(ModelWriter(parser, 'models').modules().values()))
+
+    def test_unknown_mode(self):
+        self.assertRaises(ValueError, XmiParser, enumerations='fields')
+
+
+class EnumerationToChoicesTest(TransactionTestCase):
+
+    app_label = 'enumeration_test'
+
+    def setUp(self):
+        # Like the generated models, the rows of an enumeration share their primary key with their NamedElement
+        self.states = self.migrate(ProjectState(), [
+            migrations.CreateModel('NamedElement', [
+                ('id', models.AutoField(primary_key=True)),
+                ('name', models.CharField(max_length=255, null=True))]),
+            migrations.CreateModel('VisibilityKind', [
+                ('named_element', models.OneToOneField('NamedElement', models.CASCADE, primary_key=True))]),
+            migrations.CreateModel('Property', [
+                ('id', models.AutoField(primary_key=True)),
+                ('visibility', models.ForeignKey('VisibilityKind', models.CASCADE, null=True))]),
+        ])
+        named_element, visibility_kind, property_ = (self.states[-1].apps.get_model(self.app_label, model)
+                                                     for model in ('NamedElement', 'VisibilityKind', 'Property'))
+        literals = {name: visibility_kind.objects.create(named_element=named_element.objects.create(name=name))
+                    for name in ('public', 'private', 'package')}
+        self.properties = [property_.objects.create(visibility=literals[name]).pk
+                           for name in ('private', 'public', 'private')]
+        self.properties.append(property_.objects.create().pk)
+
+    def tearDown(self):
+        with connection.schema_editor() as editor:
+            for model in ('Property', 'VisibilityKind', 'NamedElement'):
+                editor.delete_model(self.states[-1].apps.get_model(self.app_label, model))
+
+    def migrate(self, state, operations, backwards=False):
+        """Apply some operations to the database, returns the states before and after each of them."""
+        states = [state]
+        for operation in operations:
+            states.append(states[-1].clone())
+            operation.state_forwards(self.app_label, states[-1])
+        steps = list(zip(operations, states, states[1:]))
+        for operation, before, after in (reversed(steps) if backwards else steps):
+            with connection.schema_editor() as editor:
+                if backwards:
+                    operation.database_backwards(self.app_label, editor, after, before)
+                else:
+                    operation.database_forwards(self.app_label, editor, before, after)
+        return states
+
+    def values(self, state, field='visibility'):
+        model = state.apps.get_model(self.app_label, 'Property')
+        return [getattr(model.objects.get(pk=pk), field) for pk in self.properties]
+
+    def field_type(self, state):
+        return state.apps.get_model(self.app_label, 'Property')._meta.get_field('visibility').get_internal_type()
+
+    def test_names(self):
+        operations = enumeration_to_choices('Property', 'visibility', models.CharField(
+            max_length=7, choices=(('public', 'public'), ('private', 'private'), ('package', 'package')),
+            null=True), app_label=self.app_label)
+        states = self.migrate(self.states[-1], operations)
+        self.assertEqual(self.values(states[-1]), ['private', 'public', 'private', None])
+        self.assertEqual(self.field_type(states[-1]), 'CharField')
+
+        self.migrate(self.states[-1], operations, backwards=True)
+        pks = dict(self.states[-1].apps.get_model(self.app_label, 'VisibilityKind').objects
+                   .values_list('named_element__name', 'pk'))
+        self.assertEqual(self.values(self.states[-1], 'visibility_id'),
+                         [pks['private'], pks['public'], pks['private'], None])
+
+    def test_codes(self):
+        operations = enumeration_to_choices('Property', 'visibility', models.SmallIntegerField(
+            choices=((0, 'public'), (1, 'private'), (2, 'package')), null=True), app_label=self.app_label)
+        states = self.migrate(self.states[-1], operations)
+        self.assertEqual(self.values(states[-1]), [1, 0, 1, None])
+        self.assertEqual(self.field_type(states[-1]), 'SmallIntegerField')
@@ -0,0 +1,67 @@
+from collections import namedtuple
+
+
+Clash = namedtuple('Clash', ['accessor', 'element', 'attribute', 'reverse_accessor', 'owner'])
+
+
+class AccessorRegistry(object):
+    """
+    The accessors (i.e., '<Element>.<attribute>') of the fields generated for the models.
+
+    Membership checks are hash lookups, and the element and attribute that own each accessor are recorded,
+    so clashes with the reverse accessors Django creates can be checked quickly and reported all at once.
+
+    """
+
+    def __init__(self):
+        self.owners = {}
+        self.clashes = []
+
+    def __contains__(self, accessor):
+        return accessor in self.owners
+
+    def __iter__(self):
+        return iter(self.owners)
+
+    def __len__(self):
+        return len(self.owners)
+
+    def register(self, accessor, element, attribute):
+        """
+        Record the accessor of a field.
+
+        :param accessor: the accessor, i.e., '<Element>.<attribute>'
+        :param element: the name of the element the field belongs to
+        :param attribute: the name of the attribute the field is generated from
+
+        """
+        self.owners[accessor] = (element, attribute)
+
+    def clash(self, accessor, element, attribute, reverse_accessor):
+        """
+        Record a field that was not generated because its reverse accessor clashes with a registered accessor.
+
+        :param accessor: the accessor of the field that was not generated
+        :param element: the name of the element the field belongs to
+        :param attribute: the name of the attribute the field is generated from
+        :param reverse_accessor: the registered accessor it clashes with
+        :return: the recorded Clash
+
+        """
+        clash = Clash(accessor, element, attribute, reverse_accessor, self.owners.get(reverse_accessor, None))
+        self.clashes.append(clash)
+        return clash
+
+    def report(self, clashes=None):
+        """
+        Describe the clashes.
+
+        :param clashes: the clashes to describe, defaults to all the recorded clashes
+        :return: one line per clash
+
+        """
+        lines = []
+        for clash in self.clashes if clashes is None else clashes:
+            owner = '{}.{}'.format(*clash.owner) if clash.owner else clash.reverse_accessor
+            lines.append('Ignoring: {} (clashes with {})'.format(clash.accessor, owner))
+        return lines
@@ -0,0 +1,147 @@
+import hashlib
+import os
+import pickle
+from os import path
+from tempfile import NamedTemporaryFile
+from .. import __version__
+
+
+# Increment whenever the structure of the parsed trees changes, so stale cache entries are not reused
+CACHE_VERSION = 2
+DEFAULT_CACHE_DIR = path.join(path.expanduser('~'), '.cache', 'django_xmi')
+DEFAULT_MAX_SIZE = 512 * 2 ** 20
+CHUNK_SIZE = 2 ** 20
+
+
+class ParseCache(object):
+    """
+    A size-bounded, on-disk cache of parsed XMI trees.
+
+    Entries are keyed by the hash of the XMI content and the version of the parser, so a file that has not
+    changed is only parsed once.  When the cache grows beyond `max_size` bytes, the least recently used
+    entries are evicted.
+
+    .. usage::
+        cache = ParseCache('/tmp/xmi-cache')
+        parser = XmiParser(cache=cache)
+        parser.parse('UML.xmi')  # parsed and stored
+        parser.parse('UML.xmi')  # loaded from the cache
+        parser.invalidate('UML.xmi') or cache.clear()
+
+    """
+
+    suffix = '.pickle'
+
+    def __init__(self, directory=None, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory or DEFAULT_CACHE_DIR
+        self.max_size = max_size
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(file, lazy=False, member=None):
+        """
+        Compute the cache key for some XMI content.
+
+        :param file: a binary file object with the XMI content, as it is stored (e.g., compressed)
+        :param lazy: whether the tree is a LazyDotDict, lazy and eager trees are cached separately
+        :param member: the member of the archive the tree is parsed from, if the content is an archive
+        :return: the hash of the content, qualified with the versions of the parser
+
+        """
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+        if member is not None:
+            digest.update(b'!' + member.encode())
+        return '{}-{}-{}{}'.format(digest.hexdigest(), __version__, CACHE_VERSION, '-lazy' if lazy else '')
+
+    def _path(self, key):
+        return path.join(self.directory, key + self.suffix)
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.suffix) and entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    @property
+    def size(self):
+        """The total size, in bytes, of the entries in the cache."""
+        return sum(size for _, size, _ in self._entries())
+
+    def load(self, key):
+        """
+        Load a tree from the cache.
+
+        :param key: the key of the entry, as returned by `make_key`
+        :return: the cached tree, or None if there is no (readable) entry for this key
+
+        """
+        filename = self._path(key)
+        try:
+            with open(filename, 'rb') as file:
+                tree = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            self.invalidate(key)
+            return None
+        # Mark the entry as recently used
+        try:
+            os.utime(filename)
+        except FileNotFoundError:
+            pass
+        return tree
+
+    def store(self, key, tree):
+        """
+        Store a tree in the cache and evict old entries if the cache has grown too big.
+
+        :param key: the key of the entry, as returned by `make_key`
+        :param tree: the parsed tree to store
+
+        """
+        with NamedTemporaryFile('wb', dir=self.directory, suffix='.tmp', delete=False) as file:
+            try:
+                pickle.dump(tree, file, protocol=pickle.HIGHEST_PROTOCOL)
+            except BaseException:
+                file.close()
+                os.remove(file.name)
+                raise
+        os.replace(file.name, self._path(key))
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits in `max_size`."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, filename in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(filename)
+            except FileNotFoundError:
+                # Already evicted by another parser sharing the cache
+                pass
+            total -= size
+
+    def invalidate(self, key):
+        """
+        Remove an entry from the cache.
+
+        :param key: the key of the entry, as returned by `make_key`
+        :return: whether there was an entry to remove
+
+        """
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def clear(self):
+        """Remove all the entries from the cache."""
+        for _, _, filename in self._entries():
+            os.remove(filename)
@@ -0,0 +1,163 @@
+import bz2
+import gzip
+import io
+import lzma
+import shutil
+from fnmatch import fnmatch
+from tempfile import TemporaryFile
+from zipfile import ZipFile
+
+
+# The magic bytes, the file name suffixes, and the stream class of each supported compression format
+COMPRESSIONS = ((b'\x1f\x8b', ('.gz', '.gzip'), gzip.GzipFile),
+                (b'\xfd7zXZ\x00', ('.xz', '.lzma'), lzma.LZMAFile),
+                (b'BZh', ('.bz2',), bz2.BZ2File))
+
+# The file name suffixes of zip archives, e.g., MagicDraw's .mdzip projects
+ARCHIVE_SUFFIXES = ('.zip', '.mdzip')
+ARCHIVE_SEPARATOR = '!'
+MEMBER_PATTERNS = ('*.xmi', '*.uml')
+
+
+class DecompressedFile(io.BufferedIOBase):
+    """A decompressing stream that also closes the file it reads the compressed content from."""
+
+    def __init__(self, stream, source):
+        super().__init__()
+        self._stream = stream
+        self._source = source
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        return self._stream.read(size)
+
+    def read1(self, size=-1):
+        return self._stream.read1(size)
+
+    def peek(self, size=0):
+        return self._stream.peek(size)
+
+    def close(self):
+        if not self.closed:
+            try:
+                self._stream.close()
+            finally:
+                self._source.close()
+                super().close()
+
+
+def decompress(file, name=''):
+    """
+    Wrap a file so it is decompressed as it is read, if it is compressed.
+
+    The format is detected from the first bytes of the file when it can be peeked at, and from the
+    suffix of its name otherwise.
+
+    :param file: a binary file object
+    :param name: the name of the file
+    :return: a decompressing file object, or the file itself if it is not compressed
+
+    """
+    head = file.peek(6)[:6] if hasattr(file, 'peek') else None
+    name = name.lower()
+    for magic, suffixes, stream_cls in COMPRESSIONS:
+        if (head.startswith(magic) if head is not None else name.endswith(suffixes)):
+            return DecompressedFile(stream_cls(fileobj=file) if stream_cls is gzip.GzipFile else stream_cls(file),
+                                    file)
+    return file
+
+
+def strip_suffix(name):
+    """
+    Remove the compression suffix from a file name, e.g., 'UML.xmi.gz' becomes 'UML.xmi'.
+
+    :param name: a file name
+    :return: the name of the decompressed file
+
+    """
+    lower = name.lower()
+    for _, suffixes, _ in COMPRESSIONS:
+        for suffix in suffixes:
+            if lower.endswith(suffix):
+                return name[:-len(suffix)]
+    return name
+
+
+def split_member(loc):
+    """
+    Split the location of an archive member, e.g., 'project.mdzip!model/UML.xmi'.
+
+    :param loc: a location
+    :return: a tuple with the location of the archive and the name of the member, the name is None if the
+             location is not an archive member
+
+    """
+    archive, separator, member = loc.partition(ARCHIVE_SEPARATOR)
+    if separator and archive.lower().endswith(ARCHIVE_SUFFIXES):
+        return archive, member.lstrip('/')
+    return loc, None
+
+
+def ensure_seekable(file):
+    """
+    Make sure a file can be read from random positions, as zip archives require.
+
+    :param file: a binary file object
+    :return: the file itself if it is seekable, otherwise a temporary copy of its (compressed) content
+
+    """
+    if file.seekable():
+        return file
+    # A copy on disk rather than in memory, the content of remote archives can be large
+    copy = TemporaryFile()
+    with file:
+        shutil.copyfileobj(file, copy)
+    copy.seek(0)
+    return copy
+
+
+def open_member(file, member):
+    """
+    Open a member of a zip archive for reading, the member is decompressed as it is read.
+
+    :param file: a binary file object with the archive
+    :param member: the name of the member
+    :return: a binary file object with the content of the member, closing it also closes the archive
+
+    """
+    file = ensure_seekable(file)
+    archive = ZipFile(file)
+    try:
+        stream = archive.open(member)
+    except KeyError:
+        archive.close()
+        file.close()
+        raise ValueError("There is no '{}' in the archive".format(member)) from None
+    return decompress(DecompressedFile(stream, _Closing(archive, file)), member)
+
+
+def list_members(file, patterns=MEMBER_PATTERNS):
+    """
+    List the XMI files in a zip archive.
+
+    :param file: a binary file object with the archive
+    :param patterns: the glob patterns the names of the members must match (case insensitive)
+    :return: the names of the matching members, in the order they are stored in the archive
+
+    """
+    with ZipFile(ensure_seekable(file)) as archive:
+        return [info.filename for info in archive.infolist()
+                if not info.is_dir() and any(fnmatch(info.filename.lower(), p) for p in patterns)]
+
+
+class _Closing(object):
+    """Close several objects at once."""
+
+    def __init__(self, *objects):
+        self.objects = objects
+
+    def close(self):
+        for obj in self.objects:
+            obj.close()
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import shutil
+import urllib.request
+from email.utils import formatdate
+from os import path
+from tempfile import NamedTemporaryFile
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlsplit
+from warnings import warn
+
+
+class Fetcher(object):
+    """Fetch remote XMI files straight from the network."""
+
+    def open(self, url):
+        """
+        Open a remote file for reading.
+
+        :param url: the URL of the file
+        :return: a binary file object with the content of the file
+
+        """
+        return urllib.request.urlopen(url)
+
+    def validator(self, url):
+        """
+        Identify the version of a remote file without downloading it, from its ETag and Last-Modified headers.
+
+        :param url: the URL of the file
+        :return: a string that changes when the file changes, or None if the server does not tell
+
+        """
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, method='HEAD')) as response:
+                etag, last_modified = response.headers.get('ETag', None), response.headers.get('Last-Modified', None)
+        except OSError:
+            return None
+        if not etag and not last_modified:
+            return None
+        return '{} {}'.format(etag or '', last_modified or '')
+
+
+class MirrorFetcher(Fetcher):
+    """
+    Fetch remote XMI files through a local mirror directory.
+
+    Files are downloaded once into the mirror (e.g., 'https://www.omg.org/spec/UML/20161101/UML.xmi' is stored
+    as '<directory>/www.omg.org/spec/UML/20161101/UML.xmi') along with their ETag and Last-Modified headers.
+    Later fetches send a conditional request and only download the file again if it has changed on the
+    server.  If the server cannot be reached, the mirrored copy is used.
+
+    In offline mode the network is never used: files are only served from the mirror, and a file that is
+    not in the mirror raises a FileNotFoundError.  The mirror can be seeded with `fetch` on a machine that
+    has network access, or by copying the files into the directory layout above.
+
+    .. usage::
+        fetcher = MirrorFetcher('xmi-mirror', offline='CI' in os.environ)
+        parser = XmiParser(fetcher=fetcher)
+        parser.parse('https://www.omg.org/spec/UML/20161101/UML.xmi')
+
+    """
+
+    meta_suffix = '.meta.json'
+
+    def __init__(self, directory, offline=False, revalidate=True):
+        """
+        :param directory: the directory holding the mirrored files
+        :param offline: only serve files from the mirror, never use the network
+        :param revalidate: check with the server whether mirrored files have changed, if False mirrored files
+                           are always used as they are
+
+        """
+        self.directory = directory
+        self.offline = offline
+        self.revalidate = revalidate
+
+    def mirror_path(self, url):
+        """
+        Get the location of the mirrored copy of a remote file.
+
+        :param url: the URL of the file
+        :return: the path of the file in the mirror directory
+
+        """
+        parts = urlsplit(url)
+        segments = [s for s in parts.path.split('/') if s not in ('', '.', '..')] or ['index']
+        if parts.path.endswith('/'):
+            segments.append('index')
+        if parts.query:
+            segments[-1] += '-' + hashlib.sha1(parts.query.encode()).hexdigest()[:12]
+        return path.join(self.directory, parts.netloc.lower().replace(':', '_'), *segments)
+
+    def open(self, url):
+        return open(self.fetch(url), 'rb')
+
+    def validator(self, url):
+        """
+        Identify the version of a remote file from its mirrored copy.
+
+        The mirrored copy is brought up to date first (see `fetch`), which only downloads the file if it has
+        changed on the server.
+
+        :param url: the URL of the file
+        :return: a string made from the ETag, the Last-Modified header, the size and the modification time of
+                 the mirrored copy
+
+        """
+        filename = self.fetch(url)
+        meta = self._read_meta(filename)
+        stat = os.stat(filename)
+        return '{} {} {} {}'.format(meta.get('etag', None) or '', meta.get('last_modified', None) or '',
+                                    stat.st_size, stat.st_mtime_ns)
+
+    def fetch(self, url):
+        """
+        Make sure the mirror holds an up-to-date copy of a remote file.
+
+        :param url: the URL of the file
+        :return: the path of the file in the mirror directory
+
+        """
+        filename = self.mirror_path(url)
+        mirrored = path.exists(filename)
+
+        if self.offline:
+            if not mirrored:
+                raise FileNotFoundError("'{}' is not in the mirror at '{}', and fetching is in offline mode"
+                                        .format(url, self.directory))
+            return filename
+
+        headers = {}
+        if mirrored:
+            if not self.revalidate:
+                return filename
+            meta = self._read_meta(filename)
+            if meta.get('etag', None):
+                headers['If-None-Match'] = meta['etag']
+            headers['If-Modified-Since'] = meta.get('last_modified', None) or formatdate(
+                path.getmtime(filename), usegmt=True)
+
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as response:
+                # The metadata of the previous copy is removed first, so it never describes another copy
+                self._remove_meta(filename)
+                self._write(filename, response)
+                self._write_meta(filename, {'url': url,
+                                            'etag': response.headers.get('ETag', None),
+                                            'last_modified': response.headers.get('Last-Modified', None)})
+        except HTTPError as error:
+            if error.code == 304 and mirrored:
+                return filename
+            raise
+        except URLError as error:
+            if not mirrored:
+                raise
+            warn("Could not revalidate '{}' ({}), using the mirrored copy".format(url, error.reason))
+        return filename
+
+    @staticmethod
+    def _write(filename, response):
+        os.makedirs(path.dirname(filename), exist_ok=True)
+        _replace(filename, lambda file: shutil.copyfileobj(response, file))
+
+    def _read_meta(self, filename):
+        try:
+            with open(filename + self.meta_suffix, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _remove_meta(self, filename):
+        try:
+            os.remove(filename + self.meta_suffix)
+        except FileNotFoundError:
+            pass
+
+    def _write_meta(self, filename, meta):
+        _replace(filename + self.meta_suffix, lambda file: file.write(json.dumps(meta, indent=2).encode('utf-8')))
+
+
+def _replace(filename, write):
+    """
+    Write a binary file through a temporary file, so it is either entirely written or left as it was.
+
+    :param filename: the path of the file
+    :param write: a function that writes the content to the (temporary) file object it is given
+
+    """
+    with NamedTemporaryFile('wb', dir=path.dirname(filename), suffix='.tmp', delete=False) as file:
+        try:
+            write(file)
+        except BaseException:
+            file.close()
+            os.remove(file.name)
+            raise
+    try:
+        os.replace(file.name, filename)
+    except BaseException:
+        os.remove(file.name)
+        raise
@@ -0,0 +1,195 @@
+def find_cycles(edges):
+    """
+    Find the cycles of a directed graph.
+
+    Uses Tarjan's strongly connected components algorithm, every component with more than one node (or
+    a node with an edge to itself) contains at least one cycle.
+
+    :param edges: a mapping of each node to an iterable of the nodes it has an edge to
+    :return: a list of the cycles, each one a list of the nodes in the strongly connected component
+
+    """
+    index = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    cycles = []
+    counter = 0
+
+    for start in edges:
+        if start in index:
+            continue
+        index[start] = lowlink[start] = counter
+        counter += 1
+        stack.append(start)
+        on_stack.add(start)
+        work = [(start, iter(edges.get(start, ())))]
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in index:
+                    index[child] = lowlink[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(edges.get(child, ()))))
+                    break
+                elif child in on_stack:
+                    lowlink[node] = min(lowlink[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in edges.get(node, ()):
+                        component.reverse()
+                        cycles.append(component)
+    return cycles
+
+
+class CycleError(ValueError):
+    """A graph that had to be acyclic contains cycles."""
+
+    def __init__(self, cycles):
+        self.cycles = cycles
+        super().__init__('Found {} cycle(s): {}'.format(
+            len(cycles), '; '.join(' -> '.join(str(node) for node in cycle + cycle[:1]) for cycle in cycles)))
+
+
+def topological_order(edges):
+    """
+    Sort the nodes of a directed acyclic graph so every node comes before the nodes it has an edge to.
+
+    Kahn's algorithm over integer node indices, generation by generation.  Nodes are considered in the order
+    they first appear in `edges` (as a source or a target), which gives the same order as networkx's
+    `topological_sort` on a DiGraph built by adding the edges in the same order.
+
+    :param edges: an iterable of (source, target) pairs
+    :return: a list of the nodes
+    :raises CycleError: if the graph has cycles, with all of them
+
+    """
+    index = {}
+    nodes = []
+    children = []
+    seen = set()
+    for source, target in edges:
+        for node in (source, target):
+            if node not in index:
+                index[node] = len(nodes)
+                nodes.append(node)
+                children.append([])
+        edge = (index[source], index[target])
+        if edge not in seen:
+            seen.add(edge)
+            children[edge[0]].append(edge[1])
+
+    in_degree = [0] * len(nodes)
+    for targets in children:
+        for target in targets:
+            in_degree[target] += 1
+
+    order = []
+    generation = [i for i, degree in enumerate(in_degree) if degree == 0]
+    while generation:
+        order.extend(generation)
+        next_generation = []
+        for node in generation:
+            for child in children[node]:
+                in_degree[child] -= 1
+                if in_degree[child] == 0:
+                    next_generation.append(child)
+        generation = next_generation
+
+    if len(order) < len(nodes):
+        remaining = {nodes[i]: [nodes[j] for j in children[i]] for i, degree in enumerate(in_degree) if degree}
+        raise CycleError(find_cycles(remaining))
+    return [nodes[i] for i in order]
+
+
+class Closure(object):
+    """
+    The transitive closure of a directed acyclic graph, e.g., of the generalizations between classes.
+
+    The nodes are numbered so parents come before their children, and the ancestors and descendants of
+    each node are stored as integer bitsets, so `is_a` is a single bit test and the ancestors or descendants
+    of a node are listed in that order.
+
+    """
+
+    def __init__(self, parents):
+        """
+        :param parents: a mapping of each node to an iterable of its parents, parents that are not nodes of
+                        the mapping are ignored
+        :raises CycleError: if the graph has cycles
+
+        """
+        parents = {node: [parent for parent in node_parents if parent in parents]
+                   for node, node_parents in parents.items()}
+        order = topological_order((node, parent) for node, node_parents in parents.items()
+                                  for parent in node_parents)
+        order.reverse()
+        connected = set(order)
+        self.nodes = [node for node in parents if node not in connected] + order
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+
+        self._ancestors = [0] * len(self.nodes)
+        for i, node in enumerate(self.nodes):
+            bits = 0
+            for parent in parents[node]:
+                j = self.index[parent]
+                bits |= (1 << j) | self._ancestors[j]
+            self._ancestors[i] = bits
+
+        self._descendants = [0] * len(self.nodes)
+        for i in reversed(range(len(self.nodes))):
+            for parent in parents[self.nodes[i]]:
+                self._descendants[self.index[parent]] |= (1 << i) | self._descendants[i]
+
+    def __contains__(self, node):
+        return node in self.index
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def _members(self, bits):
+        members = []
+        while bits:
+            lowest = bits & -bits
+            members.append(self.nodes[lowest.bit_length() - 1])
+            bits ^= lowest
+        return members
+
+    def ancestors(self, node):
+        """
+        :param node: a node of the graph
+        :return: all the (transitive) parents of the node, parents before children
+        """
+        return self._members(self._ancestors[self.index[node]])
+
+    def descendants(self, node):
+        """
+        :param node: a node of the graph
+        :return: all the (transitive) children of the node, parents before children
+        """
+        return self._members(self._descendants[self.index[node]])
+
+    def is_a(self, node, other):
+        """
+        :param node: a node of the graph
+        :param other: another node
+        :return: whether `other` is the node itself or one of its ancestors
+        """
+        if node == other:
+            return True
+        if other not in self.index:
+            return False
+        return bool(self._ancestors[self.index[node]] >> self.index[other] & 1)
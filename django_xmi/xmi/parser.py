@@ -1,12 +1,21 @@
-from networkx import DiGraph, topological_sort
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from copy import deepcopy
-from os import path
+from os import cpu_count, getcwd, path
 from re import compile as re_compile, split as re_split
 from textwrap import wrap
+from urllib.parse import urldefrag, urljoin, urlsplit, urlunsplit
 from warnings import warn
-import urllib.request
+import posixpath
 import xmltodict
-from .util import DotDict, snake_to_camel, camel_to_snake, make_name_safe
+from .accessors import AccessorRegistry
+from .cache import ParseCache
+from .compression import (ARCHIVE_SEPARATOR, ARCHIVE_SUFFIXES, MEMBER_PATTERNS, decompress, ensure_seekable,
+                          list_members, open_member, split_member, strip_suffix)
+from .fetch import Fetcher
+from .graph import Closure, find_cycles, topological_order
+from .reader import iter_packages
+from .records import Element
+from .util import DotDict, LazyDotDict, snake_to_camel, camel_to_snake, make_name_safe, normalize_key
 
 
 # Map types to Fields
@@ -17,6 +26,10 @@ FIELD_MAPPINGS = {'boolean': {'name': 'BooleanField', 'args': []},
                   # TODO: figure out better field for `unlimited natural`
                   'unlimited_natural': {'name': 'IntegerField', 'args': []}}
 
+# Generate the enumerations as models that the attributes typed by them can point to, or only as the choices of
+# the fields of those attributes (small integers, or the names of the literals if they are all commented)
+ENUMERATION_MODES = ('models', 'choices')
+
 url_re = re_compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\(\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
 ignore_re = re_compile('^[aeAE]_')
 ascii_fix_re = re_compile(r'[^\x00-\x7F]+')
@@ -25,33 +38,110 @@ ascii_fix_re = re_compile(r'[^\x00-\x7F]+')
 class XmiParser(object):
     """Methods for parsing and storying XMI objects."""
 
-    def __init__(self):
+    def __init__(self, cache=None, records=False, lazy=False, fetcher=None, enumerations='models'):
+        """
+        :param cache: an optional ParseCache to store the parsed XMI files in
+        :param records: store the elements as compact, slotted records instead of DotDicts
+        :param lazy: only convert the parts of the parsed XMI files that are read (see LazyDotDict)
+        :param fetcher: the Fetcher used to read remote XMI files, e.g., a MirrorFetcher for offline use
+        :param enumerations: generate the enumerations as 'models', or only as the 'choices' of the fields typed
+                             by them (SmallIntegerFields or CharFields), without their models and the joins
+
+        """
+        if enumerations not in ENUMERATION_MODES:
+            raise ValueError("Unknown enumerations mode '{}', expected one of {}".format(
+                enumerations, ENUMERATION_MODES))
+        self.cache = cache
+        self.fetcher = fetcher or Fetcher()
+        self.records = records
+        self.lazy = lazy
+        self.enumerations = enumerations
         self.elements = DotDict({})
         self.packages = DotDict({})
         self.literals = DotDict({})
-        self.accessors = []
+        self.ids = {}
+        self.documents = set()
+        self.locations = {}
+        self.accessors = AccessorRegistry()
+        self._order = None
+        self._closure = None
         self.field_mappings = deepcopy(FIELD_MAPPINGS)
 
-    def parse(self, loc):
+    def _open(self, loc):
         """
-        Parse an XMI file.
+        Open an XMI file for reading.
 
-        :param loc: location of the xmi file to be parsed
+        Compressed files (gzip, xz and bz2) are decompressed as they are read, and members of zip archives
+        (e.g., MagicDraw's .mdzip projects) can be read directly using locations like 'project.mdzip!UML.xmi'.
+
+        :param loc: location of the xmi file, either a URL or a path
+        :return: a binary file object with the content of the xmi file
 
         """
+        return self._unpack(self._open_source(split_member(loc)[0]), loc)
+
+    def _unpack(self, file, loc):
+        """Decompress the source of an XMI file, or open its member if it is an archive, see `_open`."""
+        archive, member = split_member(loc)
+        if member is None and archive.lower().endswith(ARCHIVE_SUFFIXES):
+            file = ensure_seekable(file)
+            members = list_members(file)
+            if len(members) != 1:
+                file.close()
+                raise ValueError('Could not parse XMI from "{}", specify which of its members to parse, e.g., '
+                                 '"{}{}{}"'.format(loc, loc, ARCHIVE_SEPARATOR, members[0] if members else ''))
+            file.seek(0)
+            member = members[0]
+        if member is not None:
+            return open_member(file, member)
+        return decompress(file, archive)
+
+    def _open_source(self, loc):
         if url_re.match(loc):
-            with urllib.request.urlopen(loc) as response:
-                xmi = response.read()
+            return self.fetcher.open(loc)
         elif path.exists(loc):
-            with open(loc, 'r', encoding='utf-8') as file:
-                xmi = ''.join([line.decode() if hasattr(line, 'decode') else line for line in file.readlines()])
+            return open(loc, 'rb')
         else:
             raise ValueError('Could not parse XMI from "{}"'.format(loc))
 
-        if hasattr(xmi, 'decode'):
-            xmi = xmi.decode()
+    def parse(self, loc):
+        """
+        Parse an XMI file.
+
+        :param loc: location of the xmi file to be parsed
+        :return: the parsed XMI
+
+        """
+        return self._store(loc, self._load(loc))
+
+    def _load(self, loc):
+        """Read and convert an XMI file, from the cache if possible, without storing it in the parser."""
+        if self.cache is None:
+            with self._open(loc) as file:
+                return (LazyDotDict if self.lazy else DotDict)(xmltodict.parse(file))
+
+        # The key is computed from the source as it is stored (e.g., compressed), then the same source is read
+        # again to be parsed, so a remote file is only fetched once (it is copied to a temporary file)
+        source = ensure_seekable(self._open_source(split_member(loc)[0]))
+        try:
+            key = self._cache_key(source, loc)
+            xmi = self.cache.load(key)
+        except BaseException:
+            source.close()
+            raise
+        if xmi is not None:
+            source.close()
+            return xmi
+
+        source.seek(0)
+        with self._unpack(source, loc) as file:
+            xmi = (LazyDotDict if self.lazy else DotDict)(xmltodict.parse(file))
+        self.cache.store(key, xmi)
+        return xmi
 
-        xmi = DotDict(xmltodict.parse(xmi))
+    def _store(self, loc, xmi):
+        """Index a loaded XMI file and store it in the packages, under the name of its profile or package."""
+        self._index(xmi, loc)
 
         if 'XMI' in xmi:
             xmi = xmi.XMI
@@ -61,75 +151,458 @@ class XmiParser(object):
         name = xmi.get('Profile', xmi.get('Package', {})).get('name', None)
         if name is None:
             warn("Could not get a name for the XMI at '{}'".format(loc))
-            return xmi
         else:
             self.packages[name] = xmi
+        self.locations[normalize_uri(loc)] = xmi
+        return xmi
+
+    def parse_archive(self, loc, patterns=MEMBER_PATTERNS):
+        """
+        Parse all the XMI files in a zip archive.
+
+        :param loc: location of the archive
+        :param patterns: the glob patterns the names of the members to parse must match
+        :return: the parsed XMI of each member, by member name
+
+        """
+        with self._open_source(loc) as file:
+            members = list_members(file, patterns)
+        return {member: self.parse(loc + ARCHIVE_SEPARATOR + member) for member in members}
+
+    def parse_many(self, locations, workers=None):
+        """
+        Parse several XMI files in separate processes and merge them into this parser.
+
+        The results are merged in the order of `locations`, so if two files declare a package with the same
+        name, the one that comes last wins, exactly as if they had been parsed one after another.
+
+        :param locations: the locations of the xmi files to be parsed
+        :param workers: the number of processes to use, defaults to the number of CPUs
+
+        """
+        locations = list(locations)
+        workers = min(workers or cpu_count() or 1, len(locations))
+        if workers <= 1:
+            for loc in locations:
+                self.parse(loc)
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(_parse_in_worker, locations, [self.cache] * len(locations),
+                                   [self.fetcher] * len(locations), [self.lazy] * len(locations))
+            for packages, ids, documents, parsed in results:
+                for name, xmi in packages.items():
+                    if name in self.packages:
+                        warn("Overwriting package '{}'".format(name))
+                    self.packages[name] = xmi
+                self.ids.update(ids)
+                self.documents.update(documents)
+                # So resolving imported packages finds them, exactly as after parsing them one after another
+                self.locations.update(parsed)
+
+    def _cache_key(self, source, loc):
+        return self.cache.make_key(source, self.lazy, split_member(loc)[1])
+
+    def version(self, loc):
+        """
+        Identify the version of an XMI file without parsing it, e.g., to tell whether it has changed.
 
-    def import_package(self, xmi):
-        packages = {}
-        for package in xmi.Profile.packageImport:
-            if 'importedPackage' in package:
-                packages[package['id']] = self.parse(package['importedPackage']['href'])
+        :param loc: location of the xmi file
+        :return: a string that changes when the file changes, the hash of the content of local files and the
+                 validator of remote files (see `Fetcher.validator`), None if the version of a remote file
+                 cannot be known without downloading it
+
+        """
+        archive, member = split_member(loc)
+        if url_re.match(archive):
+            validator = self.fetcher.validator(archive)
+            return None if validator is None else '{} {}'.format(normalize_uri(loc), validator)
+        with self._open_source(archive) as source:
+            return ParseCache.make_key(source, member=member)
+
+    def invalidate(self, loc):
+        """
+        Remove the cached parse of an XMI file, so it is parsed again the next time.
+
+        :param loc: location of the xmi file
+        :return: whether there was a cached parse to remove
+
+        """
+        if self.cache is None:
+            return False
+        with self._open_source(split_member(loc)[0]) as source:
+            return self.cache.invalidate(self._cache_key(source, loc))
+
+    def _index(self, tree, loc):
+        """
+        Add every element of a tree that has an xmi:id to the id index.
+
+        Elements are indexed by their id, and by their id qualified with the name of their document (e.g.,
+        'UML.xmi#Comment'), so cross-file hrefs resolve through the same index.
+
+        :param tree: the parsed XMI tree (or part of it)
+        :param loc: location of the xmi file the tree was parsed from
+
+        """
+        # Hrefs name the decompressed file, e.g., 'UML.xmi#Comment' for the elements of 'UML.xmi.gz'
+        document = strip_suffix(re_split(r'[/\\{}]'.format(ARCHIVE_SEPARATOR), loc)[-1]) + '#'
+        self.documents.add(document)
+        ids = self.ids
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                # Read the values without going through the DotDict, so lazy trees are not converted
+                for key, value in dict.items(node):
+                    if isinstance(value, (dict, list)):
+                        stack.append(value)
+                    elif isinstance(value, str) and normalize_key(key) == 'id':
+                        ids[value] = ids[document + value] = node
+            else:
+                stack.extend(value for value in node if isinstance(value, (dict, list)))
+
+    def resolve(self, ref):
+        """
+        Find the element an xmi:idref or href points to.
+
+        :param ref: an xmi:id, or an href of the form '<document>#<xmi:id>'
+        :return: the element, or None if it has not been parsed
+
+        """
+        if '#' in ref:
+            document, _, xmi_id = ref.partition('#')
+            ref = document.rsplit('/', 1)[-1] + '#' + xmi_id
+        elem = self.ids.get(ref, None)
+        if self.lazy and type(elem) is dict:
+            # The element has not been read from the lazy tree yet
+            elem = self.ids[ref] = LazyDotDict(elem)
+        return elem
+
+    def _resolve_name(self, ref, default):
+        elem = self.resolve(ref)
+        if hasattr(elem, 'keys') and isinstance(elem.get('name', None), str):
+            return elem['name']
+        return default
+
+    def import_package(self, xmi, loc=None, workers=None):
+        """
+        Parse all the packages imported by an already parsed XMI, and the packages they import in turn.
+
+        :param xmi: the parsed XMI (e.g., as returned by `parse`)
+        :param loc: the location the XMI was parsed from, used to resolve relative imports, defaults to the
+                    location this parser parsed it from, or to the working directory
+        :param workers: the maximum number of imports to fetch concurrently
+        :return: the package of the XMI and the packages it imports by name, see `resolve_imports`
+
+        """
+        if loc is None:
+            loc = next((uri for uri, parsed in self.locations.items() if parsed is xmi), None)
+        # A base inside the working directory, so relative imports are resolved against the directory itself
+        return self._resolve_imports({normalize_uri(loc) if loc else path.join(getcwd(), ''): xmi}, workers)
+
+    def resolve_imports(self, loc, workers=None):
+        """
+        Parse an XMI file and, recursively, all the packages it imports.
+
+        The import graph is walked once: imports are identified by their normalized URI, so each package is
+        only fetched and parsed once no matter how many packages import it (packages this parser has already
+        parsed are not fetched again), and the imports discovered at each level of the graph are fetched
+        concurrently.  Import cycles are reported with a warning, as are
+        imports that cannot be fetched.
+
+        :param loc: location of the xmi file to be parsed
+        :param workers: the maximum number of imports to fetch concurrently
+        :return: the parsed packages by name, ordered so that every package comes after the packages it
+                 imports (i.e., in an order they can be given to `parse_profile`)
+
+        """
+        loc = normalize_uri(loc)
+        return self._resolve_imports({loc: self.parse(loc)}, workers)
+
+    def _resolve_imports(self, roots, workers):
+        resolved = dict(roots)
+        imports = {}
+        frontier = list(roots)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while frontier:
+                pending = []
+                for uri in frontier:
+                    imports[uri] = targets = []
+                    for href in _imported_hrefs(resolved[uri]):
+                        target = normalize_uri(href, uri)
+                        if target not in targets:
+                            targets.append(target)
+                        if target not in resolved and target not in pending:
+                            pending.append(target)
+
+                futures = [(uri, executor.submit(self._load, uri)) for uri in pending if uri not in self.locations]
+                frontier = [uri for uri in pending if uri in self.locations]
+                for uri in frontier:
+                    resolved[uri] = self.locations[uri]
+                for uri, future in futures:
+                    try:
+                        resolved[uri] = self._store(uri, future.result())
+                    except (OSError, ValueError) as error:
+                        warn("Could not import the package at '{}': {}".format(uri, error))
+                        resolved[uri] = None
+                        imports[uri] = []
+                    else:
+                        frontier.append(uri)
+
+        for cycle in find_cycles(imports):
+            warn("Found an import cycle between: {}".format(' -> '.join(cycle + cycle[:1])))
+
+        # Order the packages so the imported packages come first
+        ordered = []
+        visited = set()
+        for root in roots:
+            stack = [(root, iter(imports[root]))]
+            visited.add(root)
+            while stack:
+                uri, targets = stack[-1]
+                for target in targets:
+                    if target not in visited:
+                        visited.add(target)
+                        stack.append((target, iter(imports[target])))
+                        break
+                else:
+                    stack.pop()
+                    ordered.append(uri)
+
+        packages = DotDict()
+        for uri in ordered:
+            xmi = resolved[uri]
+            if xmi is None:
+                continue
+            name = xmi.get('Profile', xmi.get('Package', {})).get('name', None) or uri
+            packages[name] = xmi
         return packages
 
     def parse_profile(self, source, key='Profile'):
         profile = source.get(key, {})
         for pkg in profile.get('packagedElement', {}).values():
-            # Ignore deprecated packages
-            if 'deprecated' in pkg.name.lower():
-                warn("Ignoring '{}' Package because it appears to be deprecated".format(pkg.name))
+            self._parse_package(pkg, profile)
+
+    def stream_profile(self, loc):
+        """
+        Parse the elements of an XMI file one package at a time.
+
+        Unlike `parse` followed by `parse_profile`, the document is never held in memory as a whole, the
+        packages are read incrementally and handed over to the profile parsing as soon as they are complete.
+
+        :param loc: location of the xmi file to be parsed
+        :return: the attributes of the profile (or package) at the root of the xmi file
+
+        """
+        profile = None
+        with self._open(loc) as file:
+            for profile, pkg in iter_packages(file):
+                self._index(pkg, loc)
+                self._parse_package(pkg, profile)
+        if profile is None:
+            warn("Could not find any packages in the XMI at '{}'".format(loc))
+        return profile
+
+    def _parse_package(self, pkg, profile):
+        # Ignore deprecated packages
+        if 'deprecated' in pkg.name.lower():
+            warn("Ignoring '{}' Package because it appears to be deprecated".format(pkg.name))
+            return
+        for elem in pkg.get('packagedElement', {}).values():
+            if not isinstance(elem, dict) or "name" not in elem:
                 continue
-            for elem in pkg.get('packagedElement', {}).values():
-                if not isinstance(elem, dict) or "name" not in elem:
-                    continue
 
-                # Rename owned_____ keys, e.g., ownedAttributes
-                for key in elem.keys():
-                    if key.startswith('owned'):
-                        value = elem[key]
-                        # Fix in case the owned item is not a proper dictionary
-                        if all(v in value for v in ('id', 'name', 'type')):
-                            value = DotDict({value.name: value})
-                        new_key = key.replace('owned', '').lower() + 's'
-                        elem[new_key] = value
-                        del elem[key]
-
-                elem.update({'__profile__': profile.name,
-                             '__package__': profile.name + '.' + pkg.name,
-                             '__ignore__': bool(ignore_re.match(elem.name)),
-                             '__modelclass__': self.get_generalization(elem) or 'models.Model',
-                             '__docstring__': self._get_comment(elem),
-                             '__is_abstract__': elem.get('isAbstract', False)})
-
-                # We do not store the ignored elements, but we still process them
-                if not elem.__ignore__:
-                    key = camel_to_snake(elem.name)
-                    if key in self.elements:
-                        warn("Overwriting element '{}'".format(key))
-                    self.elements[key] = elem
+            # Rename owned_____ keys, e.g., ownedAttributes
+            for key in list(elem.keys()):
+                if key.startswith('owned'):
+                    value = elem[key]
+                    # Fix in case the owned item is not a proper dictionary
+                    if all(v in value for v in ('id', 'name', 'type')):
+                        value = DotDict({value.name: value})
+                    new_key = key.replace('owned', '').lower() + 's'
+                    elem[new_key] = value
+                    del elem[key]
+
+            elem.update({'__profile__': profile.name,
+                         '__package__': profile.name + '.' + pkg.name,
+                         '__ignore__': bool(ignore_re.match(elem.name)),
+                         '__modelclass__': self.get_generalization(elem) or 'models.Model',
+                         '__docstring__': self._get_comment(elem),
+                         '__is_abstract__': elem.get('isAbstract', False)})
+
+            # We do not store the ignored elements, but we still process them
+            if not elem.__ignore__:
+                if self.records:
+                    elem = self._to_record(elem)
+                key = camel_to_snake(elem.name)
+                if key in self.elements:
+                    warn("Overwriting element '{}'".format(key))
+                self.elements[key] = elem
+
+    def _to_record(self, elem):
+        """Convert a parsed element into an Element record, and point the id index to the new records."""
+        converted = []
+        record = Element.from_dict(elem, converted)
+        ids = self.ids
+        for old, new in converted:
+            xmi_id = new.get('id', None)
+            if not isinstance(xmi_id, str):
+                continue
+            for key in [xmi_id] + [document + xmi_id for document in self.documents]:
+                if ids.get(key, None) is old:
+                    ids[key] = new
+        return record
 
-    def ordered_elements(self, base_type='element'):
+    def _generalizations(self, base_type):
         """
-        Sort the elements based on their generalization dependencies to each other.
+        Get the superclasses of the elements.
 
         :param base_type: the name of the element to use as the basic entity (snake_case)
-        :type base_type: str
+        :return: the signature of the generalizations, and a mapping of the name of each element to the
+                 names of its superclasses (snake_case)
         """
-        dep_graph = DiGraph()
-        for name, elem in self.elements.items():
-            sup_cls = elem.__modelclass__
+        if base_type in self.elements:
+            self.elements[base_type].__modelclass__ = 'models.Model'
 
+        signature = (base_type, tuple((name, elem.__modelclass__) for name, elem in self.elements.items()))
+        parents = {}
+        for name, elem in self.elements.items():
             if name == base_type:
-                elem.__modelclass__ = 'models.Model'
-            elif ',' in sup_cls:
-                for dep in sup_cls.split(','):
-                    dep_graph.add_edge(name, camel_to_snake(dep.strip()))
+                parents[name] = []
+                continue
+            sup_cls = elem.__modelclass__
+            if ',' in sup_cls:
+                parents[name] = [camel_to_snake(dep.strip()) for dep in sup_cls.split(',')]
             else:
-                dep_graph.add_edge(name, camel_to_snake(sup_cls))
+                parents[name] = [camel_to_snake(sup_cls)]
+        return signature, parents
 
-        sorted_elements = list(topological_sort(dep_graph))
+    def ordered_elements(self, base_type='element'):
+        """
+        Sort the elements based on their generalization dependencies to each other.
+
+        The order is cached until the elements or their generalizations change.
+
+        :param base_type: the name of the element to use as the basic entity (snake_case)
+        :type base_type: str
+        :raises CycleError: if the generalizations have cycles, with the names of the elements in each one
+        """
+        signature, parents = self._generalizations(base_type)
+        if self._order is not None and self._order[0] == signature:
+            return list(self._order[1])
+
+        sorted_elements = topological_order((name, dep) for name, deps in parents.items() for dep in deps)
         sorted_elements.reverse()
-        return sorted_elements
+        self._order = (signature, sorted_elements)
+        return list(sorted_elements)
+
+    def process_generalizations(self, base_type='element'):
+        """
+        Compute the transitive closure of the generalizations between the elements, so the ancestors and
+        descendants of the elements can be queried without walking the generalizations again.
+
+        Call it again after the elements or their generalizations change, it is only recomputed if they did.
+
+        .. usage::
+            parser.process_generalizations()
+            parser.ancestors('activity')  # ['element', 'named_element', ..., 'behavior']
+            parser.is_a('activity', 'behavior')  # True
+
+        :param base_type: the name of the element to use as the basic entity (snake_case)
+        :return: the closure
+        :rtype: Closure
+        :raises CycleError: if the generalizations have cycles, with the names of the elements in each one
+        """
+        signature, parents = self._generalizations(base_type)
+        if self._closure is None or self._closure[0] != signature:
+            self._closure = (signature, Closure(parents))
+        return self._closure[1]
+
+    @property
+    def closure(self):
+        """The closure of the generalizations, computed by `process_generalizations` if it has not been yet."""
+        if self._closure is None:
+            return self.process_generalizations()
+        return self._closure[1]
+
+    def ancestors(self, name):
+        """
+        :param name: the name of an element (snake_case)
+        :return: the names of all the elements it specializes, directly or not, superclasses first
+        """
+        return self.closure.ancestors(name)
+
+    def descendants(self, name):
+        """
+        :param name: the name of an element (snake_case)
+        :return: the names of all the elements that specialize it, directly or not, superclasses first
+        """
+        return self.closure.descendants(name)
+
+    def is_a(self, name, other):
+        """
+        :param name: the name of an element (snake_case)
+        :param other: the name of another element (snake_case)
+        :return: whether the element is the other element or specializes it, directly or not
+        """
+        return self.closure.is_a(name, other)
+
+    def references(self, element):
+        """
+        Get the elements an element refers to, through its generalizations and the types of its attributes.
+
+        :param element: a processed element
+        :return: the names of the elements it refers to (snake_case)
+        """
+        names = [name.strip() for name in element.__modelclass__.split(',')]
+        names += [attr.get('__other__', None) for attr in element.get('attributes', {}).values()]
+        references = []
+        for name in names:
+            if name and name not in ('self', 'models.Model'):
+                name = camel_to_snake(name)
+                if name in self.elements and name not in references:
+                    references.append(name)
+        return references
+
+    def prune(self, roots):
+        """
+        Only keep the elements that are needed by some root elements or packages, i.e., the roots and all the
+        elements they refer to (see `references`), directly or not.  Call it after `process_attributes`.
+
+        .. usage::
+            parser.process_attributes()
+            parser.prune(['SysML.Requirements', 'Block'])
+
+        :param roots: the names of elements (e.g., 'Block' or 'block') or packages (e.g., 'SysML.Requirements',
+                      or 'SysML' for a whole profile)
+        :return: the names of the elements that were removed
+        """
+        pending = []
+        for root in roots:
+            name = root if root in self.elements else camel_to_snake(root)
+            if name in self.elements:
+                pending.append(name)
+                continue
+            names = [name for name, elem in self.elements.items()
+                     if elem.get('__profile__', None) == root or
+                     (isinstance(elem.get('__package__', None), str) and
+                      (elem.__package__ == root or elem.__package__.startswith(root + '.')))]
+            if not names:
+                warn("Could not find an element or a package named '{}' to keep".format(root))
+            pending.extend(names)
+
+        needed = set()
+        while pending:
+            name = pending.pop()
+            if name not in needed:
+                needed.add(name)
+                pending.extend(self.references(self.elements[name]))
+
+        removed = [name for name in self.elements if name not in needed]
+        for name in removed:
+            self.elements.pop(name)
+        return removed
 
     def process_literals(self):
         """Process all the literals declared in the package"""
@@ -142,8 +615,10 @@ class XmiParser(object):
                 iterator = literals.items() if use_desc else enumerate(literals)
 
                 choices = []
+                codes = {}
                 for short, long in iterator:
                     code = "'{}'" if use_desc else "{}"
+                    codes[short if use_desc else long] = code.format(short)
                     long = long.ownedComment.body if use_desc else long
                     choice = ("(" + code + ", '{}')").format(short, long)
                     if len(choice) > 112:
@@ -158,20 +633,30 @@ class XmiParser(object):
 
                 choices = '    {} = ({})'.format(choices_var_name, choices)
 
-                field = 'CharField' if use_desc else 'IntegerField'
-                args = ['max_length=255'] if use_desc else []
+                if self.enumerations == 'choices':
+                    field = 'CharField' if use_desc else 'SmallIntegerField'
+                    args = ['max_length={}'.format(max(len(short) for short in literals))] if use_desc else []
+                else:
+                    field = 'CharField' if use_desc else 'IntegerField'
+                    args = ['max_length=255'] if use_desc else []
                 args += ['choices=' + choices_var_name]
                 if element.name in self.literals:
                     warn("Overwriting literal for '{}'".format(element.name))
                 self.literals[element.name] = DotDict({'field': field,
                                                        'args': args,
-                                                       'choices': choices})
+                                                       'choices': choices,
+                                                       'codes': codes})
 
     def process_attributes(self):
         """
         Prepares the Django fields from the ownedAttributes.
 
+        Attributes whose reverse accessor would clash with an existing accessor are ignored, and reported in
+        a single warning (see `self.accessors.clashes`).  With the 'choices' mode of the enumerations, the
+        enumerations that are only used as choices are removed from the elements afterwards.
+
         """
+        clashes = len(self.accessors.clashes)
         for element in self.elements.values():
             for attr_name, attr in element.get('attributes', {}).items():
                 attr_name = make_name_safe(attr_name)
@@ -181,10 +666,10 @@ class XmiParser(object):
                 accessor = element.name + '.' + attr_name
                 reverse_accessor = snake_to_camel(attr_name) + '.' + camel_to_snake(element.name)
                 if reverse_accessor in self.accessors:
-                    warn("Ignoring: {}".format(accessor))
+                    self.accessors.clash(accessor, element.name, attr_name, reverse_accessor)
                     continue
                 else:
-                    self.accessors.append(accessor)
+                    self.accessors.register(accessor, element.name, attr_name)
 
                 args = []
                 attr.__print__ = DotDict({})
@@ -194,13 +679,15 @@ class XmiParser(object):
                 # Identify Field Type
                 if isinstance(attr.type, str):
                     attr.__field__ = 'ForeignKey'
-                    attr.__other__ = attr.type
+                    attr.__other__ = self._resolve_name(attr.type, attr.type)
                 elif isinstance(attr.type, dict):
                     if 'idref' in attr.type:
+                        idref = attr.type['idref']
                         attr.__field__ = 'ForeignKey'
-                        attr.__other__ = attr.type['idref'].split('_')[-1]
+                        attr.__other__ = self._resolve_name(idref, idref.split('_')[-1])
                     elif 'href' in attr.type:
-                        href = attr.type['href'].split('#')[-1]
+                        href = attr.type['href']
+                        href = self._resolve_name(href, href.split('#')[-1])
                         attr.__field__ = 'ForeignKey'
                         attr.__other__ = href
                         href = camel_to_snake(href)
@@ -243,9 +730,12 @@ class XmiParser(object):
                     # TODO: must ensure the parsing of the default value coincides with the literals
                     if hasattr(default, 'keys'):
                         default = list(default.values())[0]
-                    # TODO: find better way to reference these type of things (maybe a weakproxy dict of {id: proxyref}?
                     split_by = '-' if '-' in default else '_'
-                    args += ["default='{}'".format(default.split(split_by)[-1])]
+                    default = self._resolve_name(default, default.split(split_by)[-1])
+                    if literal and self.enumerations == 'choices' and default in literal.codes:
+                        args += ['default=' + literal.codes[default]]
+                    else:
+                        args += ["default='{}'".format(default)]
 
                 attr.__print__ = DotDict({'field': '    {name} = models.{__field__}'.format(**attr)})
                 if attr.__other__:
@@ -265,6 +755,25 @@ class XmiParser(object):
                         attr.__print__.help_text = prepend + joint.join(wrap(help_str, 112 - field_len))
                 attr.__print__.args = args
 
+        clashes = self.accessors.clashes[clashes:]
+        if clashes:
+            warn('Found {} accessor clashes:\n\t{}'.format(len(clashes), '\n\t'.join(self.accessors.report(clashes))))
+
+        if self.enumerations == 'choices':
+            self._remove_enumerations()
+
+    def _remove_enumerations(self):
+        """Remove the elements of the enumerations that no attribute or element refers to anymore."""
+        referenced = set()
+        for element in self.elements.values():
+            referenced.update(superclass.strip() for superclass in element.__modelclass__.split(','))
+            referenced.update(attr.get('__other__', None) for attr in element.get('attributes', {}).values())
+        for name in self.literals:
+            if name not in referenced:
+                self.elements.pop(camel_to_snake(name), None)
+        self._order = None
+        self._closure = None
+
     @staticmethod
     def _get_comment(elem):
         return ascii_fix_re.sub("'", elem.get('comments', elem.get('ownedComment', {})).get('body', ''))
@@ -274,7 +783,12 @@ class XmiParser(object):
         fn_name = camel_to_snake(func.name)
         lines = []
 
-        if fn_name in elem.get('attributes', {}):
+        # The attributes are keyed by their names in the XMI, the fields by their safe names, and the models also
+        # have a one-to-one field to each of their superclasses (see `render_parts`)
+        fields = {make_name_safe(name) for name in elem.get('attributes', {})}
+        fields.update(make_name_safe(other.strip()) for other in elem.__modelclass__.split(',')
+                      if 'models.Model' not in other)
+        if make_name_safe(fn_name) in fields:
             fn_name = prepend + fn_name
 
         fn_name = make_name_safe(fn_name)
@@ -323,7 +837,7 @@ class XmiParser(object):
 
     def get_generalization(self, element):
         if isinstance(element, str):
-            return element.split('_')[-1]
+            return self._resolve_name(element, element.split('_')[-1])
 
         if hasattr(element, 'keys'):
             if 'generalization' in element:
@@ -331,7 +845,6 @@ class XmiParser(object):
             if 'general' in element:
                 return self.get_generalization(element['general'])
             if 'idref' in element:
-                # TODO: add feature to find the class name of this ref
                 return self.get_generalization(element['idref'])
             if 'href' in element:
                 return self.get_generalization(element['href'])
@@ -346,3 +859,62 @@ class XmiParser(object):
             return element['type'].split(':')[-1]
 
         return element
+
+
+def _parse_in_worker(loc, cache, fetcher, lazy):
+    """Parse an XMI file in a worker process of `XmiParser.parse_many`."""
+    parser = XmiParser(cache=cache, fetcher=fetcher, lazy=lazy)
+    parser.parse(loc)
+    # Pickled together, so the index and the locations keep pointing at the elements of the packages
+    return parser.packages, parser.ids, parser.documents, parser.locations
+
+
+def normalize_uri(href, base=None):
+    """
+    Normalize the location of an XMI file, so the same document is always identified by the same string.
+
+    :param href: the location (e.g., the href of an imported package), the fragment is ignored, members of
+                 archives are supported (see `XmiParser._open`)
+    :param base: the location of the document the href appears in, used to resolve relative hrefs
+    :return: a URL with a lowercase scheme and host and a normalized path, or an absolute path
+
+    """
+    href = urldefrag(href)[0]
+    if base and not url_re.match(href) and not path.isabs(href):
+        archive, member = split_member(base)
+        if member is not None:
+            href = archive + ARCHIVE_SEPARATOR + posixpath.join(posixpath.dirname(member), href)
+        elif url_re.match(base):
+            href = urljoin(base, href)
+        else:
+            href = path.join(path.dirname(base), href)
+
+    archive, member = split_member(href)
+    if member is not None:
+        return normalize_uri(archive) + ARCHIVE_SEPARATOR + posixpath.normpath(member)
+
+    if url_re.match(href):
+        parts = urlsplit(href)
+        scheme, netloc = parts.scheme.lower(), parts.netloc.lower()
+        if (scheme, parts.port) in (('http', 80), ('https', 443)):
+            netloc = netloc.rsplit(':', 1)[0]
+        return urlunsplit((scheme, netloc, posixpath.normpath(parts.path or '/'), parts.query, ''))
+    return path.normcase(path.abspath(href))
+
+
+def _imported_hrefs(xmi):
+    """Find the hrefs of the packages imported by the profile (or package) of a parsed XMI and its packages."""
+    root = xmi.get('Profile', xmi.get('Package', None))
+    stack = [root] if hasattr(root, 'keys') else []
+    while stack:
+        pkg = stack.pop()
+        package_imports = pkg.get('packageImport', [])
+        if hasattr(package_imports, 'keys'):
+            package_imports = [package_imports] if 'importedPackage' in package_imports else package_imports.values()
+        for package_import in package_imports:
+            imported = package_import.get('importedPackage', None) if hasattr(package_import, 'keys') else None
+            if hasattr(imported, 'keys') and 'href' in imported:
+                yield imported['href']
+        for child in pkg.get('packagedElement', {}).values():
+            if hasattr(child, 'keys') and child.get('type', None) == 'uml:Package':
+                stack.append(child)
@@ -0,0 +1,295 @@
+import hashlib
+import shutil
+import tracemalloc
+from collections import namedtuple
+from os import path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from warnings import warn
+from .cache import ParseCache
+from .fetch import Fetcher
+from .parser import XmiParser
+from .render import ModelRenderer
+from .writer import ModelWriter
+
+
+# Increment whenever the stages or what they store change, so stale snapshots are not reused
+PIPELINE_VERSION = 1
+
+# The parser profiles to generate the models of, and the key of their root in the parsed XMI
+DEFAULT_PROFILES = (('SysML', 'Profile'), ('UML', 'Package'))
+
+# How one stage went: its name, whether it was loaded from the cache, how long it took (in seconds), how much
+# the memory that was allocated grew and peaked while it ran (in bytes, None if memory was not traced)
+StageReport = namedtuple('StageReport', ['name', 'cached', 'seconds', 'memory', 'peak_memory'])
+
+
+class Stage(object):
+    """
+    A step of the pipeline: a function of the XmiParser that reads some of its attributes (the inputs) and sets
+    others (the outputs).  The outputs of a stage can be cached, as long as it has no side effects.
+    """
+
+    def __init__(self, name, function, inputs=(), outputs=(), params=None, cacheable=True):
+        """
+        :param name: the name of the stage
+        :param function: the function to run, called with the XmiParser
+        :param inputs: the names of the attributes of the parser the stage reads
+        :param outputs: the names of the attributes of the parser the stage sets or changes
+        :param params: anything else the outputs depend on, it must have a stable `repr`
+        :param cacheable: whether the outputs can be cached, False if the stage has side effects
+        """
+        self.name = name
+        self.function = function
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.params = params
+        self.cacheable = cacheable
+
+    def __repr__(self):
+        return '<Stage {}: {} -> {}>'.format(self.name, ', '.join(self.inputs), ', '.join(self.outputs))
+
+
+class PipelineReport(list):
+    """The StageReports of a run of the pipeline, printed as a table."""
+
+    def __str__(self):
+        lines = ['{:<12} {:>6} {:>10} {:>12} {:>12}'.format('stage', 'cached', 'seconds', 'memory', 'peak')]
+        for stage in self:
+            lines.append('{:<12} {:>6} {:>10.3f} {:>12} {:>12}'.format(
+                stage.name, 'yes' if stage.cached else 'no', stage.seconds,
+                _format_size(stage.memory), _format_size(stage.peak_memory)))
+        lines.append('{:<12} {:>6} {:>10.3f}'.format('total', '', sum(stage.seconds for stage in self)))
+        return '\n'.join(lines)
+
+
+class XmiPipeline(object):
+    """
+    Generate the Django models of XMI files in one call, from parsing the files to writing the modules.
+
+    The steps are named stages that declare the attributes of the parser they read and set.  With a cache
+    (e.g., a ParseCache), the outputs of the stages are stored under a key made from the versions of the XMI
+    files (the hash of local files, the ETag or Last-Modified header of remote ones, see `XmiParser.version`)
+    and the parameters of all the stages up to it, so a run only repeats the stages after the last one whose
+    inputs did not change.  Every run reports how long each stage took and how much memory it used.
+
+    .. usage::
+        pipeline = XmiPipeline(['UML.xmi', 'SysML.xmi'], 'django_xmi/models', cache=ParseCache())
+        report = pipeline.run()
+        print(report)
+
+    """
+
+    def __init__(self, locations, directory, profiles=DEFAULT_PROFILES, roots=None, inherit=False, workers=None,
+                 layout='profile', incremental=True, cache=None, trace_memory=True, parser=None,
+                 strategy='multi-table'):
+        """
+        :param locations: the locations of the XMI files
+        :param directory: the directory to write the models in
+        :param profiles: the (name, key) of the packages to generate the models of, see `XmiParser.parse_profile`
+        :param roots: only generate the models needed by these elements or packages, see `XmiParser.prune`
+        :param inherit: copy the fields of the superclasses into the models, see `ModelRenderer`
+        :param workers: the number of processes to render the models with, see `ModelRenderer`
+        :param layout: write one module per 'profile' or per 'package', see `ModelWriter`
+        :param incremental: only rewrite the modules that changed, see `ModelWriter`
+        :param cache: a ParseCache to store the outputs of the stages in
+        :param trace_memory: measure the memory used by each stage, this slows the stages down
+        :param parser: the XmiParser to use, e.g., with a Fetcher, defaults to a new one
+        :param strategy: store the generalizations as 'multi-table' or 'single-table' models, see `ModelRenderer`
+        """
+        self.locations = list(locations)
+        self.directory = directory
+        self.profiles = tuple(tuple(profile) for profile in profiles)
+        self.roots = None if roots is None else tuple(roots)
+        self.inherit = inherit
+        self.workers = workers
+        self.layout = layout
+        self.incremental = incremental
+        self.cache = cache
+        self.trace_memory = trace_memory
+        self.parser = parser or XmiParser()
+        self.strategy = strategy
+        self.writer_report = None
+
+    @property
+    def stages(self):
+        """The stages of the pipeline, in the order they run."""
+        stages = [
+            Stage('parse', self._parse, (), ('packages', 'ids', 'documents', 'locations'),
+                  params=(self.locations, self.parser.records, self.parser.lazy)),
+            Stage('profiles', self._parse_profiles, ('packages',), ('elements', 'ids'), params=self.profiles),
+            Stage('literals', XmiParser.process_literals, ('elements',), ('elements', 'literals'),
+                  params=self.parser.enumerations),
+            Stage('attributes', XmiParser.process_attributes, ('elements', 'literals', 'ids'),
+                  ('elements', 'accessors')),
+            Stage('operations', XmiParser.process_operations_and_rules, ('elements',), ('elements',)),
+            Stage('clean', self._remove_bad_elements, ('elements',), ('elements',)),
+        ]
+        if self.roots is not None:
+            stages.append(Stage('prune', lambda parser: parser.prune(self.roots), ('elements',), ('elements',),
+                                params=self.roots))
+        stages += [
+            Stage('render', self._render, ('elements',), ('elements', '_order'),
+                  params=(self.inherit, self.strategy)),
+            Stage('write', self._write, ('elements',), (), params=(self.directory, self.layout), cacheable=False),
+        ]
+        return stages
+
+    def _parse(self, parser):
+        for loc in self.locations:
+            parser.parse(loc)
+
+    def _parse_profiles(self, parser):
+        for name, key in self.profiles:
+            parser.parse_profile(parser.packages[name], key)
+
+    @staticmethod
+    def _remove_bad_elements(parser):
+        for name in [key for key in parser.elements if not key.isidentifier()]:
+            parser.elements.pop(name)
+
+    def _render(self, parser):
+        ModelRenderer(parser, inherit=self.inherit, workers=self.workers, strategy=self.strategy).render()
+
+    def _write(self, parser):
+        writer = ModelWriter(parser, self.directory, incremental=self.incremental, layout=self.layout)
+        self.writer_report = writer.write()
+
+    def keys(self, stages, versions):
+        """
+        Compute the cache key of the outputs of each stage.
+
+        :param stages: the stages of the pipeline
+        :param versions: the versions of the XMI files, see `XmiParser.version`
+        :return: the keys, the key of a stage covers the versions of the XMI files and the parameters of all
+                 the stages up to it
+        """
+        digest = hashlib.sha256(str(PIPELINE_VERSION).encode())
+        for version in versions:
+            digest.update(version.encode())
+        keys = []
+        for stage in stages:
+            digest.update(repr((stage.name, stage.inputs, stage.outputs, stage.params)).encode())
+            keys.append('stage-{}-{}'.format(stage.name, digest.hexdigest()))
+        return keys
+
+    def _snapshot(self, stages):
+        outputs = {name for stage in stages for name in stage.outputs}
+        return {name: getattr(self.parser, name) for name in sorted(outputs)}
+
+    def _restore(self, snapshot):
+        for name, value in snapshot.items():
+            setattr(self.parser, name, value)
+
+    def run(self):
+        """
+        Run the stages, starting after the last stage whose outputs are in the cache.
+
+        :return: how each stage went
+        :rtype: PipelineReport
+        """
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        try:
+            return self._run(self.stages)
+        finally:
+            if tracing:
+                tracemalloc.stop()
+
+    def _run(self, stages):
+        if self.cache is None:
+            return self._run_stages(stages, [None] * len(stages))
+
+        # The files are identified without downloading them when their fetcher can tell their version, the
+        # others are downloaded once, to compute their version, and parsed from the downloaded copy
+        fetcher = self.parser.fetcher
+        with TemporaryDirectory() as directory:
+            self.parser.fetcher = _DownloadingFetcher(fetcher, directory)
+            try:
+                versions = [self.parser.version(loc) for loc in self.locations]
+                return self._run_stages(stages, self.keys(stages, versions))
+            finally:
+                self.parser.fetcher = fetcher
+
+    def _run_stages(self, stages, keys):
+        start = 0
+        report = PipelineReport()
+        if self.cache is not None:
+            for i in reversed(range(len(stages))):
+                if stages[i].cacheable:
+                    snapshot, seconds, memory, peak_memory = self._measure(self.cache.load, keys[i])
+                    if snapshot is not None:
+                        self._restore(snapshot)
+                        report.extend(StageReport(stage.name, True, 0.0, None, None) for stage in stages[:i])
+                        report.append(StageReport(stages[i].name, True, seconds, memory, peak_memory))
+                        start = i + 1
+                        break
+
+        for i in range(start, len(stages)):
+            stage = stages[i]
+            _, seconds, memory, peak_memory = self._measure(stage.function, self.parser)
+            report.append(StageReport(stage.name, False, seconds, memory, peak_memory))
+            if self.cache is not None and stage.cacheable:
+                try:
+                    self.cache.store(keys[i], self._snapshot(stages[:i + 1]))
+                except Exception as error:
+                    # The cache only saves time, failing to store an entry (e.g., a full disk, or outputs that
+                    # cannot be pickled) must not stop the pipeline
+                    warn("Could not cache the outputs of stage '{}': {}".format(stage.name, error))
+        return report
+
+    def _measure(self, function, *args):
+        """Call a function, returns its result, how long it took, and how the traced memory grew and peaked."""
+        before = None
+        if self.trace_memory:
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = perf_counter()
+        result = function(*args)
+        seconds = perf_counter() - start
+        memory = peak_memory = None
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            memory, peak_memory = current - before, peak - before
+        return result, seconds, memory, peak_memory
+
+
+class _DownloadingFetcher(Fetcher):
+    """
+    A Fetcher for a run of the pipeline: it downloads the remote files whose version the wrapped Fetcher cannot
+    tell, so their version is the hash of their content, and serves the downloaded copy when they are parsed.
+    """
+
+    def __init__(self, fetcher, directory):
+        self.fetcher = fetcher
+        self.directory = directory
+        self.downloads = {}
+
+    def validator(self, url):
+        validator = self.fetcher.validator(url)
+        if validator is not None:
+            return validator
+        if url not in self.downloads:
+            filename = path.join(self.directory, str(len(self.downloads)))
+            with self.fetcher.open(url) as response, open(filename, 'wb') as file:
+                shutil.copyfileobj(response, file)
+            self.downloads[url] = filename
+        with open(self.downloads[url], 'rb') as file:
+            return ParseCache.make_key(file)
+
+    def open(self, url):
+        if url in self.downloads:
+            return open(self.downloads[url], 'rb')
+        return self.fetcher.open(url)
+
+
+def _format_size(size):
+    if size is None:
+        return '-'
+    for unit in ('B', 'KB', 'MB'):
+        if abs(size) < 1024:
+            return '{:.1f} {}'.format(size, unit)
+        size /= 1024
+    return '{:.1f} GB'.format(size)
@@ -0,0 +1,104 @@
+from xml.etree.ElementTree import iterparse
+from .util import DotDict
+
+
+# Local names of the elements that can hold the top-level packages of an XMI document
+ROOT_TAGS = ('Profile', 'Package', 'Model')
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+class _QualifiedNames(dict):
+    """Map ElementTree's '{uri}name' tags back to the 'prefix:name' form used by xmltodict."""
+
+    def __init__(self):
+        super().__init__()
+        self.prefixes = {}
+
+    def __missing__(self, tag):
+        if tag[0] == '{':
+            uri, name = tag[1:].split('}', 1)
+            prefix = self.prefixes.get(uri, '')
+            qname = prefix + ':' + name if prefix else name
+        else:
+            qname = tag
+        self[tag] = qname
+        return qname
+
+
+def _to_dict(elem, qnames):
+    """
+    Convert an ElementTree element into the same structure `xmltodict.parse` produces for it.
+
+    :param elem: the element to convert
+    :param qnames: the mapping of ElementTree tags to qualified names
+    :return: a dict, a string if the element only holds text, or None if it is empty
+
+    """
+    result = {}
+    for key, value in elem.attrib.items():
+        result['@' + qnames[key]] = value
+
+    text = [elem.text] if elem.text else []
+    for child in elem:
+        key = qnames[child.tag]
+        value = _to_dict(child, qnames)
+        if key in result:
+            existing = result[key]
+            if isinstance(existing, list):
+                existing.append(value)
+            else:
+                result[key] = [existing, value]
+        else:
+            result[key] = value
+        if child.tail:
+            text.append(child.tail)
+
+    text = ''.join(text).strip()
+    if text:
+        if not result:
+            return text
+        result['#text'] = text
+    return result or None
+
+
+def iter_packages(source, tag='packagedElement'):
+    """
+    Incrementally read the top-level packages of an XMI document.
+
+    Only the package currently being read is held in memory: once a package has been yielded its subtree is
+    discarded, so memory stays proportional to the largest package rather than the whole document.
+
+    :param source: a filename or a binary file object with the XMI content
+    :param tag: the tag of the elements to yield from the profile (or package) at the root of the document
+    :return: an iterator of (profile, package) tuples, where profile is a DotDict with the attributes of the
+             root Profile/Package and package is a DotDict of one of its packaged elements
+
+    """
+    qnames = _QualifiedNames()
+    stack = []
+    root = profile = None
+
+    for event, item in iterparse(source, events=('start-ns', 'start', 'end')):
+        if event == 'start-ns':
+            prefix, uri = item
+            qnames.prefixes.setdefault(uri, prefix)
+        elif event == 'start':
+            if root is None and _local_name(item.tag) in ROOT_TAGS:
+                # The profile is either the root of the document or a direct child of the xmi:XMI element
+                root = item
+                profile = DotDict({'@' + qnames[key]: value for key, value in item.attrib.items()})
+            stack.append(item)
+        else:
+            stack.pop()
+            if not stack:
+                break
+            parent = stack[-1]
+            if parent is root and _local_name(item.tag) == tag:
+                yield profile, DotDict(_to_dict(item, qnames))
+            if parent is root or len(stack) == 1:
+                # Discard the subtrees we are done with, earlier siblings are already gone so this is cheap
+                item.clear()
+                parent.remove(item)
@@ -0,0 +1,156 @@
+from collections.abc import Mapping, MutableMapping
+from .util import DotDict
+
+
+class Record(MutableMapping):
+    """
+    A compact element record with a fixed set of slots.
+
+    Records behave like the DotDicts the parser produces by default: keys can be read and written with
+    either dot notation or dictionary access notation, and keys that do not have a slot are kept in a
+    small overflow dictionary.  Unset slots behave like missing keys.
+
+    """
+
+    __slots__ = ('_extra',)
+
+    # Keys that hold name-keyed collections of nested records, and the record class for their values
+    children = {}
+
+    def __init__(self, input_=None):
+        object.__setattr__(self, '_extra', {})
+        if input_:
+            self.update(input_)
+
+    @classmethod
+    def from_dict(cls, input_, converted=None):
+        """
+        Convert a parsed element (e.g., a DotDict) into a record, including its nested records.
+
+        :param input_: the parsed element
+        :param converted: an optional list to which the (original, record) pairs are appended
+        :return: the record
+
+        """
+        record = cls()
+        for key, value in input_.items():
+            child_cls = cls.children.get(key, None)
+            if child_cls is not None and hasattr(value, 'keys'):
+                children = DotDict()
+                for name, child in value.items():
+                    if isinstance(child, Mapping) and not isinstance(child, Record):
+                        child = child_cls.from_dict(child, converted)
+                    children[name] = child
+                value = children
+            record[key] = value
+        if converted is not None:
+            converted.append((input_, record))
+        return record
+
+    def __getitem__(self, key):
+        if key in self._slot_set:
+            try:
+                return object.__getattribute__(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        if key in self._slot_set:
+            object.__setattr__(self, key, value)
+        else:
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self._slot_set:
+            try:
+                object.__delattr__(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        else:
+            del self._extra[key]
+
+    def __getattr__(self, name):
+        # Only called when there is no (set) slot with this name
+        if name == '_extra':
+            raise AttributeError(name)
+        try:
+            return self._extra[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    __setattr__ = __setitem__
+
+    def __delattr__(self, name):
+        try:
+            del self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __contains__(self, key):
+        if key in self._slot_set:
+            return hasattr(self, key)
+        return key in self._extra
+
+    def __iter__(self):
+        for key in self._slot_names:
+            if hasattr(self, key):
+                yield key
+        yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, dict(self))
+
+    def __getstate__(self):
+        return dict(self)
+
+    def __setstate__(self, state):
+        object.__setattr__(self, '_extra', {})
+        self.update(state)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        slots = []
+        for klass in reversed(cls.__mro__):
+            slots += [slot for slot in klass.__dict__.get('__slots__', ()) if slot != '_extra']
+        cls._slot_names = tuple(slots)
+        cls._slot_set = frozenset(slots)
+
+
+Record._slot_names = ()
+Record._slot_set = frozenset()
+
+
+class Literal(Record):
+    """An enumeration literal."""
+
+    __slots__ = ('id', 'name', 'type', 'ownedComment')
+
+
+class Operation(Record):
+    """An operation or a rule (i.e., constraint) of an element."""
+
+    __slots__ = ('id', 'name', 'type', 'comments', 'ownedComment', 'ownedRule', 'specification', '__print__')
+
+
+class Attribute(Record):
+    """An attribute (i.e., property) of an element, and the Django field it becomes."""
+
+    __slots__ = ('id', 'name', 'type', 'ownedComment', 'lowerValue', 'upperValue', 'defaultValue', 'help_text',
+                 '__print__', '__field__', '__other__', '__choices__')
+
+
+class Element(Record):
+    """A packaged element (e.g., a class, a stereotype or an enumeration), and the Django model it becomes."""
+
+    __slots__ = ('id', 'name', 'type', 'isAbstract', 'generalization', 'comments', 'attributes', 'operations',
+                 'rules', 'literals', '__profile__', '__package__', '__ignore__', '__modelclass__', '__docstring__',
+                 '__is_abstract__')
+
+    children = {'attributes': Attribute,
+                'operations': Operation,
+                'rules': Operation,
+                'literals': Literal}
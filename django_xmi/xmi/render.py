@@ -0,0 +1,452 @@
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count
+from textwrap import wrap
+from warnings import catch_warnings, simplefilter, warn
+from .util import camel_to_snake, make_name_safe
+
+
+INDENT = " " * 4
+
+# How the generalizations are stored: one table per model, linked to the tables of its superclasses with
+# one-to-one fields, or one table per element without superclasses, with proxy models (see `SingleTablePlan`)
+STRATEGIES = ('multi-table', 'single-table')
+
+# The fields that are columns of the table of the root in the single-table strategy, the others are stored in JSON
+RELATIONS = ('ForeignKey', 'ManyToManyField', 'OneToOneField')
+
+# The names the single-table models already use
+SINGLE_TABLE_RESERVED = frozenset(('id', 'pk', 'kind', 'attributes', 'objects'))
+
+SINGLE_TABLE_IMPORT = 'from django_xmi.single_table import JSONAttribute, SingleTableModel\n'
+
+PROXY_META = '\n' + INDENT + 'class Meta:\n' + INDENT * 2 + 'proxy = True'
+
+# The hand-written abstract models (in django_xmi/models/base.py) the multi-table models of some elements inherit
+# from, by profile and element name, and the fields and methods they implement, which are not generated
+EXTENSIONS = {
+    'UML.Element': ('ElementBase', ('all_owned_elements', 'not_own_self')),
+    'UML.NamedElement': ('NamedElementBase', ('qualified_name', 'get_qualified_name', 'has_no_qualified_name',
+                                              'has_qualified_name', 'separator')),
+}
+
+BASE_IMPORT = 'from {}base import {}\n'
+
+
+class ModelRenderer(object):
+    """
+    Render the source of the Django model of each element into its `__django_model__` lines.
+
+    The rendering of each element only depends on the element itself, so the elements are rendered in a pool
+    of processes and the results are put back in the order of `XmiParser.ordered_elements`.  The output is
+    the same as rendering them one after another.  When the fields, methods and literals are inherited from
+    the superclasses (`inherit=True`), the superclasses are merged in afterwards, in order.
+
+    With the 'single-table' strategy, loading a model does not join the tables of all its superclasses: the
+    elements without superclasses are stored in one table each, and the other elements are proxy models of
+    them (see `SingleTablePlan`).
+
+    The multi-table models of the elements in `EXTENSIONS` inherit from a hand-written abstract model instead
+    of `models.Model` (unless `inherit=True`), which implements some of their fields and methods.
+
+    .. usage::
+        ModelRenderer(parser, workers=4).render()
+        ModelWriter(parser, 'django_xmi/models').write()
+
+    """
+
+    def __init__(self, parser, inherit=False, workers=None, chunksize=64, strategy='multi-table'):
+        """
+        :param parser: the XmiParser with the processed elements
+        :param inherit: copy the fields, methods and literals of the superclasses into each model, instead of
+                        linking the models to their superclasses with one-to-one fields
+        :param workers: the number of processes to use, defaults to the number of CPUs, 1 renders the
+                        elements in this process
+        :param chunksize: the number of elements sent to a process at a time
+        :param strategy: store the generalizations as 'multi-table' or 'single-table' models
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError("Unknown strategy '{}', expected one of {}".format(strategy, STRATEGIES))
+        if inherit and strategy == 'single-table':
+            raise ValueError("The proxy models of the 'single-table' strategy already inherit from their "
+                             "superclasses, inherit must be False")
+        self.parser = parser
+        self.inherit = inherit
+        self.workers = workers
+        self.chunksize = chunksize
+        self.strategy = strategy
+
+    def render(self):
+        """
+        Render all the elements.
+
+        :return: the names of the rendered elements, in order
+        """
+        names = []
+        for element_name in self.parser.ordered_elements():
+            element = self.parser.elements.get(element_name, None)
+            if not element or not element_name.isidentifier():
+                warn("Could not find '{}' in order to write it to a file".format(element_name))
+                continue
+            names.append(element_name)
+
+        elements = [self.parser.elements[name] for name in names]
+        plan = None
+        if self.strategy == 'single-table':
+            plan = SingleTablePlan(self.parser, names)
+            inputs = [plan.render_input(name) for name in names]
+        else:
+            inputs = [render_input(element, self.inherit, self._related_names(element), self._extension(element))
+                      for element in elements]
+
+        workers = min(self.workers or cpu_count() or 1, len(inputs))
+        if workers <= 1:
+            self._apply(elements, map(render_parts, inputs), plan)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                self._apply(elements, executor.map(render_parts, inputs, chunksize=self.chunksize), plan)
+        return names
+
+    def _related_names(self, element):
+        """
+        Name the reverse accessors of the one-to-one fields of an element to its superclasses that would clash
+        with a field of the superclass, e.g., `Namespace.named_element` with `NamedElement.namespace`.
+
+        :param element: a processed element
+        :return: the related names of these one-to-one fields, by the name of the superclass
+        """
+        related_names = {}
+        for other in element.__modelclass__.split(','):
+            other = other.strip()
+            superclass = self.parser.elements.get(camel_to_snake(other), None)
+            if superclass is None:
+                continue
+            fields = {attr.name for attr in superclass.get('attributes', {}).values() if attr.get('__print__', None)}
+            fields.update(make_name_safe(link.strip()) for link in superclass.__modelclass__.split(',')
+                          if 'models.Model' not in link)
+            # The default reverse accessor of a one-to-one field is the lowercase name of its model
+            if element.name.lower() in fields:
+                related_names[other] = '%(app_label)s_%(class)s_' + make_name_safe(other)
+        return related_names
+
+    def _extension(self, element):
+        """
+        :param element: a processed element
+        :return: the abstract model the model of the element inherits from and the names of the fields and
+                 methods it implements (see `EXTENSIONS`), None if there is none
+        """
+        if self.inherit or self.strategy != 'multi-table':
+            return None
+        return EXTENSIONS.get('{}.{}'.format(element.__profile__, element.name), None)
+
+    def _apply(self, elements, results, plan=None):
+        """Store the rendered parts in the elements, in order, so the superclasses are done first."""
+        for element, (parts, warnings) in zip(elements, results):
+            for message in warnings:
+                warn(message)
+            element.__classdec__, docstring, package, fields, methods, literals = parts
+            extension = self._extension(element)
+            element.__base__ = extension[0] if extension else None
+            if self.inherit:
+                fields, methods, literals = self._inherit(element, fields, methods, literals)
+            element.__fields__, element.__methods__, element.__literals__ = fields, methods, literals
+            element.__strategy__ = self.strategy
+            if plan is not None:
+                element.__classdec__ = plan.class_declaration(element)
+            if element.name != "":
+                element.__django_model__ = assemble(element.__classdec__, docstring, package,
+                                                    fields, methods, literals)
+                if plan is not None and plan.is_proxy(element):
+                    element.__django_model__.append(PROXY_META)
+
+    def _inherit(self, element, fields, methods, literals):
+        """Merge the fields, methods and literals of the (already rendered) superclasses of an element."""
+        elem_attrs = element.get('attributes', {}).keys()
+        inherited_fields, inherited_methods, inherited_literals = {}, {}, {}
+        for superclass in element.__modelclass__.split(','):
+            superclass = self.parser.elements.get(camel_to_snake(superclass.strip()), None)
+            if superclass is not None:
+                inherited_fields.update({k: v for k, v in superclass.get('__fields__', {}).items()
+                                         if k not in elem_attrs})
+                inherited_methods.update({k: v for k, v in superclass.get('__methods__', {}).items()
+                                          if k not in elem_attrs})
+                inherited_literals.update({k: v for k, v in superclass.get('__literals__', {}).items()
+                                           if k not in elem_attrs})
+
+        merged = []
+        for kind, inherited, own in (('field', inherited_fields, fields), ('method', inherited_methods, methods),
+                                     ('literal', inherited_literals, literals)):
+            for name in own:
+                if name in inherited:
+                    warn("\n\tOverwriting {} '{}.{}'\n".format(kind, element.name, name))
+            inherited.update(own)
+            merged.append(inherited)
+        return merged
+
+
+class SingleTablePlan(object):
+    """
+    Lay out the models of the single-table strategy.
+
+    Each element without a superclass (a root) becomes a concrete `SingleTableModel`, whose table has a `kind`
+    column and an `attributes` JSON column, and every other element becomes a proxy model of its root that
+    inherits from its superclasses.  The relations of all the elements are columns of the table of their root,
+    shared by the elements whose relations have the same name and kind (the relations to an element point to the
+    table of its root), and the other attributes of the proxy models are `JSONAttribute`s.  The attributes whose
+    names clash are prefixed with the name of their element.
+    """
+
+    def __init__(self, parser, names):
+        """
+        :param parser: the XmiParser with the processed elements
+        :param names: the names of the elements to render (snake_case), superclasses first
+        """
+        self.parser = parser
+        self.names = list(names)
+        self.keys = {parser.elements[name].name: name for name in self.names}
+        self.roots = {}
+        self.bases = {}
+        self.attributes = {name: [] for name in self.names}
+        self._columns = {}
+        self._renamed = []
+        self._layout_classes()
+        self._layout_attributes()
+        if self._renamed:
+            warn('Renamed {} attributes of single-table models:\n\t{}'.format(
+                len(self._renamed), '\n\t'.join(self._renamed)))
+
+    def _layout_classes(self):
+        classes = {}
+        for name in self.names:
+            element = self.parser.elements[name]
+            superclasses = [camel_to_snake(other.strip()) for other in element.__modelclass__.split(',')
+                            if 'models.Model' not in other]
+            superclasses = [other for other in superclasses if other in self.roots]
+            if not superclasses:
+                self.roots[name] = name
+                self.bases[name] = []
+                classes[name] = type(element.name, (object,), {})
+                continue
+
+            root = self.roots[superclasses[0]]
+            bases = [other for other in superclasses if self.roots[other] == root]
+            if len(bases) < len(superclasses):
+                warn("'{}' specializes elements stored in different tables, only the superclasses stored with "
+                     "'{}' are kept".format(element.name, self.parser.elements[root].name))
+            try:
+                classes[name] = type(element.name, tuple(classes[other] for other in bases), {})
+            except TypeError:
+                warn("The superclasses of '{}' cannot be ordered, only '{}' is kept".format(
+                    element.name, self.parser.elements[bases[0]].name))
+                bases = bases[:1]
+                classes[name] = type(element.name, (classes[bases[0]],), {})
+            self.roots[name] = root
+            self.bases[name] = bases
+
+    def _layout_attributes(self):
+        json_attributes = []
+        for name in self.names:
+            element = self.parser.elements[name]
+            root = self.roots[name]
+            columns = self._columns.setdefault(root, {})
+            for attr in element.get('attributes', {}).values():
+                printer = attr.get('__print__', None)
+                if printer is None:
+                    self.attributes[name].append((attr.name, None, None))
+                elif attr.__field__ in RELATIONS and attr.get('__other__', None):
+                    self._add_relation(name, attr, columns)
+                elif name == root:
+                    columns[attr.name] = None
+                    self.attributes[name].append((attr.name, (printer.field, list(printer.args),
+                                                              printer.get('help_text', '')),
+                                                  attr.get('__choices__', None)))
+                else:
+                    json_attributes.append((name, attr))
+
+        for name, attr in json_attributes:
+            field_name = self._field_name(name, attr.name, self._columns[self.roots[name]])
+            args = [arg for arg in attr.__print__.args if arg.startswith(('default=', 'choices='))]
+            field = INDENT + '{} = JSONAttribute'.format(field_name)
+            self.attributes[name].append((field_name, (field, args, wrap_help_text(field, args, attr.help_text)),
+                                          attr.get('__choices__', None)))
+
+    def _add_relation(self, name, attr, columns):
+        """Add a relation of an element to the table of its root, unless a relation like it is already there."""
+        other = attr.__other__
+        if camel_to_snake(other) in self.roots:
+            other = self.parser.elements[self.roots[camel_to_snake(other)]].name
+        elif other == 'self':
+            other = self.parser.elements[self.roots[name]].name
+        signature = (attr.__field__, other)
+        if columns.get(attr.name, None) == signature:
+            return
+        field_name = self._field_name(name, attr.name, columns)
+        columns[field_name] = signature
+
+        args = ["'{}'".format(other)]
+        for arg in attr.__print__.args[1:]:
+            if arg.startswith('related_name='):
+                arg = "related_name='%(app_label)s_%(class)s_{}'".format(field_name)
+            args.append(arg)
+        field = INDENT + '{} = models.{}'.format(field_name, attr.__field__)
+        self.attributes[self.roots[name]].append((field_name, (field, args, wrap_help_text(field, args,
+                                                                                           attr.help_text)), None))
+
+    def _field_name(self, name, attr_name, columns):
+        """The name of the field of an attribute, prefixed with the name of its element if it is taken."""
+        if attr_name not in columns and attr_name not in SINGLE_TABLE_RESERVED:
+            return attr_name
+        field_name = make_name_safe(self.parser.elements[name].name) + '_' + attr_name
+        self._renamed.append('{}.{} -> {}'.format(self.parser.elements[name].name, attr_name, field_name))
+        return field_name
+
+    def is_proxy(self, element):
+        """Whether the model of an element is a proxy model, i.e., the element has a superclass."""
+        key = self.keys[element.name]
+        return self.roots[key] != key
+
+    def class_declaration(self, element):
+        """The first line of the model of an element, with its superclasses."""
+        bases = [self.parser.elements[other].name for other in self.bases[self.keys[element.name]]]
+        return ['class {}({}):'.format(element.name, ', '.join(bases or ['SingleTableModel']))]
+
+    def render_input(self, name):
+        """The input of `render_parts` for an element, see `render_input`."""
+        element = self.parser.elements[name]
+        methods = [(method_name, method.get('__print__', None))
+                   for method_name, method in {**element.get('operations', {}), **element.get('rules', {})}.items()]
+        return (element.name, element.get('__docstring__', ''), element.__package__, element.__modelclass__,
+                self.attributes[name], methods, True, {}, None)
+
+
+def wrap_help_text(field, args, help_text):
+    """
+    Format the help text argument of a field, wrapped like `XmiParser.process_attributes` does.
+
+    :param field: the start of the declaration of the field, e.g., '    name = models.CharField'
+    :param args: the other arguments of the field
+    :param help_text: the help text
+    :return: the help text argument, an empty string if there is no help text
+    """
+    if not help_text:
+        return ''
+    help_str = "help_text='{}'".format(help_text.replace("'", '"'))
+    if len(field) + len(', '.join(args)) + len(help_str) <= 112:
+        return help_str
+    help_ind = ' ' * (len(field) + 1)
+    joint = " ' +\n" + help_ind + "'"
+    prepend = ('\n' + help_ind) if args else ''
+    return prepend + joint.join(wrap(help_str, 112 - len(field)))
+
+
+def render_input(element, inherit=False, related_names=None, extension=None):
+    """
+    Extract what is needed to render an element, so only that is sent to the worker processes.
+
+    :param element: a processed element
+    :param inherit: whether the superclasses will be inherited from (see `ModelRenderer`)
+    :param related_names: the related names of the one-to-one fields to some superclasses, by superclass name
+    :param extension: the abstract model to inherit from and the fields and methods it implements, which are
+                      left out (see `EXTENSIONS`)
+    :return: a tuple of plain values
+    """
+    base, implemented = extension or (None, ())
+    attributes = []
+    for attr in element.get('attributes', {}).values():
+        if attr.name in implemented:
+            continue
+        printer = attr.get('__print__', None)
+        if printer is not None:
+            printer = (printer.field, list(printer.args), printer.get('help_text', ''))
+        attributes.append((attr.name, printer, attr.get('__choices__', None)))
+
+    methods = []
+    for method_name, method in {**element.get('operations', {}), **element.get('rules', {})}.items():
+        if method.get('name', None) in implemented:
+            continue
+        methods.append((method_name, method.get('__print__', None)))
+
+    return (element.name, element.get('__docstring__', ''), element.__package__, element.__modelclass__,
+            attributes, methods, inherit, dict(related_names or {}), base)
+
+
+def render_parts(input_):
+    """
+    Render the parts of the model of an element.
+
+    :param input_: the tuple returned by `render_input`
+    :return: the class declaration, docstring, package, fields, methods and literals of the model, and the
+             warnings raised while rendering them
+    """
+    name, docstring, package, modelclass, attributes, methods, inherit, related_names, base = input_
+    with catch_warnings(record=True) as caught:
+        simplefilter('always')
+
+        classdec = ['class {}({}):'.format(name, base or 'models.Model')]
+        if isinstance(docstring, str):
+            docstring = ([INDENT + '"""'] +
+                         [(INDENT + s) for s in wrap('{}'.format(docstring), 108)] +
+                         [INDENT + '"""\n'])
+        if isinstance(package, str):
+            package = [INDENT + "__package__ = '{}'\n".format(package)]
+
+        fields = {}
+        method_sources = {}
+        literals = {}
+        if not inherit:
+            for i, other in enumerate(modelclass.split(',')):
+                other = other.strip()
+                if 'models.Model' in other:
+                    continue
+                args = ["'{}'".format(other)]
+                if i == 0:
+                    args += ['on_delete=models.CASCADE', 'primary_key=True']
+                if other in related_names:
+                    args += ["related_name='{}'".format(related_names[other])]
+                var_name = make_name_safe(other)
+                if var_name in fields:
+                    warn("\n\tOverwriting field '{}.{}'\n".format(name, var_name))
+                fields.update({var_name: '    {} = models.OneToOneField({})'.format(var_name, ', '.join(args))})
+
+        for attr_name, printer, choices in attributes:
+            if attr_name in fields:
+                warn("\n\tOverwriting field '{}.{}'\n".format(name, attr_name))
+            if printer is None:
+                warn("Could not find __print__ method in '{}.{}'".format(name, attr_name))
+                continue
+
+            field, args, help_text = printer
+            fields.update({attr_name: "{}({})".format(field, ', '.join(args + [help_text]))})
+
+            if choices is not None:
+                if attr_name in literals:
+                    warn("\n\tOverwriting literal '{}.{}'\n".format(name, attr_name))
+                literals.update({attr_name: choices})
+
+        for method_name, printer in methods:
+            if method_name in method_sources:
+                warn("\n\tOverwriting method '{}.{}'\n".format(name, method_name))
+            if printer is None:
+                warn("Could not find __print__ method in '{}.{}'".format(name, method_name))
+                continue
+            method_sources.update({method_name: '\n'.join(printer)})
+
+    warnings = [str(warning.message) for warning in caught]
+    return (classdec, docstring, package, fields, method_sources, literals), warnings
+
+
+def assemble(classdec, docstring, package, fields, methods, literals):
+    """
+    Assemble the lines of the source of a model from its parts.
+
+    :return: the lines of the model
+    """
+    literal_lines = []
+    if literals:
+        literal_lines = ['\n'.join(('\n' + i[-1] + '\n') for i in sorted(literals.items()))]
+    return ([''] +
+            classdec +
+            docstring +
+            package +
+            literal_lines +
+            [i[1] for i in sorted(fields.items())] +
+            ['\n' + i[1] for i in sorted(methods.items())])
@@ -1,5 +1,6 @@
 import requests
 import shutil
+from functools import lru_cache
 from re import compile as re_compile
 
 
@@ -15,17 +16,81 @@ RESERVED_TERMS = set(['False', 'class', 'finally', 'is', 'return', 'None', 'cont
                       'True', 'def', 'from', 'nonlocal', 'while', 'and', 'del', 'global', 'not', 'with', 'as',
                       'elif', 'if', 'or', 'yield', 'assert', 'else', 'import', 'pass', 'break', 'except', 'in',
                       'raise'] + __builtins__.__dir__())
-RESERVED_TERMS = tuple(term for term in RESERVED_TERMS if '_' != term[0])
+RESERVED_TERMS = frozenset(term for term in RESERVED_TERMS if '_' != term[0])
 
 # Declare regular expressions
 first_cap_re = re_compile(r'(.)([A-Z][a-z]+)')
 all_cap_re = re_compile(r'([a-z0-9])([A-Z])')
 first_digits_re = re_compile(r'\d+_')
 
+# The naming functions are called with the same names over and over in every stage, so their results are memoized
+NAMING_CACHE_SIZE = 2 ** 16
 
-def download_file(url, filepath=None):
+
+# Memoized translations of raw XML keys into DotDict keys, XMI documents only use a small vocabulary of keys
+_KEY_TABLE = {}
+KEY_TABLE_SIZE = 2 ** 16
+
+
+def normalize_key(key):
+    """
+    Normalize an XML key (e.g., '@xmi:id') into a DotDict key (e.g., 'id').
+
+    :param key: the raw key
+    :return: the key with the namespace prefixes and special characters removed
+
+    """
+    try:
+        return _KEY_TABLE[key]
+    except KeyError:
+        pass
+
+    new_key = key
+    for new_char, bad_chars in STRING_REPLACEMENTS.items():
+        for bad_char in bad_chars:
+            new_key = new_key.replace(bad_char, new_char)
+    for ns in KEY_PREFIXES_TO_REMOVE:
+        new_key = new_key.replace('{}__'.format(ns), '')
+
+    if len(_KEY_TABLE) >= KEY_TABLE_SIZE:
+        _KEY_TABLE.clear()
+    _KEY_TABLE[key] = new_key
+    return new_key
+
+
+def _has_key(item, key):
+    """Check whether the raw item will have `key` once its keys are normalized."""
+    if hasattr(item, 'keys'):
+        return any(normalize_key(k) == key for k in item)
+    return key in item
+
+
+def _get_key(item, key):
+    """Get the value of the raw item's key that normalizes to `key`, the last one wins like in a dict."""
+    value = None
+    for k, v in item.items():
+        if normalize_key(k) == key:
+            value = v
+    return value
+
+
+def download_file(url, filepath=None, fetcher=None):
+    """
+    Download a file.
+
+    :param url: the URL of the file
+    :param filepath: where to save the file, defaults to the name of the file in the current directory
+    :param fetcher: an optional Fetcher to get the file with (e.g., a MirrorFetcher), instead of requests
+    :return: the path of the downloaded file
+
+    """
     local_filename = filepath or url.split('/')[-1]
 
+    if fetcher is not None:
+        with fetcher.open(url) as src, open(local_filename, 'wb') as fp:
+            shutil.copyfileobj(src, fp)
+        return local_filename
+
     with requests.get(url, stream=True) as req:
         with open(local_filename, 'wb') as fp:
             shutil.copyfileobj(req.raw, fp)
@@ -33,6 +98,7 @@ def download_file(url, filepath=None):
     return local_filename
 
 
+@lru_cache(maxsize=NAMING_CACHE_SIZE)
 def camel_to_snake(camel_str):
     """
     Convert CamelCase to snake_case.
@@ -50,6 +116,7 @@ def camel_to_snake(camel_str):
     return all_cap_re.sub(r'\1_\2', s1).lower()
 
 
+@lru_cache(maxsize=NAMING_CACHE_SIZE)
 def snake_to_camel(snake_str, upper=True):
     """
     Convert snake_case to UpperCamelCase or lowerCamelCase.
@@ -66,6 +133,7 @@ def snake_to_camel(snake_str, upper=True):
         return components[0] + "".join(x.title() for x in components[1:])
 
 
+@lru_cache(maxsize=NAMING_CACHE_SIZE)
 def make_name_safe(name):
     name = first_digits_re.sub("", name)
     for replacement, bad_strings in STRING_REPLACEMENTS.items():
@@ -90,49 +158,182 @@ class DotDict(dict):
 
     """
 
-    __getattr__ = dict.__getitem__
     __setattr__ = dict.__setitem__
-    __delattr__ = dict.__delitem__
+
+    def __getattr__(self, name):
+        # Missing keys must raise an AttributeError, so getattr() with a default, pickle and copy still work
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __delattr__(self, name):
+        try:
+            del self[name]
+        except KeyError:
+            raise AttributeError(name) from None
 
     def __init__(self, input_=None, list_to_dict_key='name'):
-        clean_input = {} if input_ is None else self._clean(input_)
+        super().__init__()
+        if input_ is None:
+            return
 
-        if hasattr(clean_input, 'keys'):
-            for key, value in clean_input.items():
+        if hasattr(input_, 'keys'):
+            # Normalize the keys and wrap the children in a single traversal
+            for key, value in input_.items():
                 if hasattr(value, 'keys'):
                     value = DotDict(value)
-                elif isinstance(value, (list, tuple)) and all(list_to_dict_key in item for item in value):
-                    value = DotDict({item[list_to_dict_key]: item for item in value})
-
-                self[key] = value
-        elif isinstance(clean_input, (list, tuple)) and all(list_to_dict_key in item for item in clean_input):
-            for item in clean_input:
-                if list_to_dict_key in item:
-                    self[item[list_to_dict_key]] = DotDict(item)
-        super().__init__()
+                elif isinstance(value, (list, tuple)):
+                    if all(_has_key(item, 'name') for item in value):
+                        named = DotDict()
+                        for item in value:
+                            named[normalize_key(_get_key(item, 'name'))] = DotDict(item)
+                        value = named
+                    else:
+                        value = self._clean(value)
+                self[normalize_key(key)] = value
+        elif isinstance(input_, (list, tuple)) and all(_has_key(item, list_to_dict_key) for item in input_):
+            for item in input_:
+                self[_get_key(item, list_to_dict_key)] = DotDict(item)
 
-    def _clean(self, input_):
+    @classmethod
+    def _clean(cls, input_):
         if hasattr(input_, 'keys'):
-            new = {}
-            for key, value in input_.items():
-                new_key = key
-                new_value = self._clean(value)
+            return {normalize_key(key): cls._clean(value) for key, value in input_.items()}
+        elif isinstance(input_, (list, tuple)):
+            return [cls._clean(item) for item in input_]
+        return input_
 
-                for new_char, bad_chars in STRING_REPLACEMENTS.items():
-                    for bad_char in bad_chars:
-                        new_key = new_key.replace(bad_char, new_char)
+    def __dir__(self):
+        return list(self.keys())
 
-                for ns in KEY_PREFIXES_TO_REMOVE:
-                    new_key = new_key.replace('{}__'.format(ns), '')
 
-                new[new_key] = new_value
-        elif isinstance(input_, (list, tuple)):
-            new = [None] * len(input_)
-            for i, item in enumerate(input_):
-                new[i] = self._clean(item)
-        else:
-            return input_
+class LazyDotDict(DotDict):
+    """
+    A DotDict that normalizes and wraps its children only when they are first read.
+
+    The keys are normalized eagerly, but the values are kept as they were given until they are read (e.g.,
+    with `d[key]`, `d.key`, `d.get(key)` or `d.values()`), at which point they are converted and cached.
+    Subtrees that are never read are never converted.
+
+    """
+
+    def __init__(self, input_=None, list_to_dict_key='name'):
+        dict.__init__(self)
+        object.__setattr__(self, '_pending', set())
+        if input_ is None:
+            return
+
+        if hasattr(input_, 'keys'):
+            for key, value in input_.items():
+                self._set_raw(normalize_key(key), value)
+        elif isinstance(input_, (list, tuple)) and all(_has_key(item, list_to_dict_key) for item in input_):
+            for item in input_:
+                self._set_raw(_get_key(item, list_to_dict_key), item)
+
+    @classmethod
+    def _from_raw(cls, items):
+        new = cls()
+        for key, value in items:
+            new._set_raw(key, value)
         return new
 
-    def __dir__(self):
-        return list(self.keys())
+    def _set_raw(self, key, value):
+        dict.__setitem__(self, key, value)
+        if isinstance(value, (dict, list, tuple)):
+            self._pending.add(key)
+        else:
+            self._pending.discard(key)
+
+    def _convert(self, key):
+        self._pending.discard(key)
+        value = dict.__getitem__(self, key)
+        if hasattr(value, 'keys'):
+            value = LazyDotDict(value)
+        elif isinstance(value, (list, tuple)):
+            if all(_has_key(item, 'name') for item in value):
+                value = LazyDotDict._from_raw((normalize_key(_get_key(item, 'name')), item) for item in value)
+            else:
+                value = self._clean(value)
+        dict.__setitem__(self, key, value)
+        return value
+
+    def _convert_all(self):
+        for key in list(self._pending):
+            self._convert(key)
+
+    def __getitem__(self, key):
+        if key in self._pending:
+            return self._convert(key)
+        return dict.__getitem__(self, key)
+
+    def __setitem__(self, key, value):
+        self._pending.discard(key)
+        dict.__setitem__(self, key, value)
+
+    __setattr__ = __setitem__
+
+    def __delitem__(self, key):
+        self._pending.discard(key)
+        dict.__delitem__(self, key)
+
+    def __iter__(self):
+        # Overriding __iter__ makes {**d} and f(**d) go through keys() and __getitem__
+        return dict.__iter__(self)
+
+    def __eq__(self, other):
+        self._convert_all()
+        if isinstance(other, LazyDotDict):
+            other._convert_all()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # The values are pickled as they are, so pickling (e.g., into a ParseCache) does not convert them
+        return type(self), (), (dict(dict.items(self)), self._pending)
+
+    def __setstate__(self, state):
+        items, pending = state
+        dict.update(self, items)
+        object.__setattr__(self, '_pending', set(pending))
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def values(self):
+        self._convert_all()
+        return dict.values(self)
+
+    def items(self):
+        self._convert_all()
+        return dict.items(self)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        key = next(reversed(dict.keys(self)))
+        return key, self.pop(key)
+
+    def copy(self):
+        new = LazyDotDict()
+        dict.update(new, self)
+        new._pending.update(self._pending)
+        return new
@@ -0,0 +1,376 @@
+import hashlib
+import json
+import os
+from collections import namedtuple
+from os import path
+from tempfile import NamedTemporaryFile
+from warnings import warn
+from .render import BASE_IMPORT, SINGLE_TABLE_IMPORT
+from .util import camel_to_snake
+
+
+# The models that were added, changed or removed by a ModelWriter, by (package, name), and the modules it
+# (re)wrote
+GenerationReport = namedtuple('GenerationReport', ['written', 'unchanged', 'added', 'changed', 'removed'])
+
+# One module per profile (e.g., 'uml.py'), or one module per package (e.g., 'uml/actions.py')
+LAYOUTS = ('profile', 'package')
+
+PACKAGES_INIT = """from importlib import import_module
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# The module of each package of models.  Only the packages in the DJANGO_XMI_PACKAGES setting (all of them by
+# default) are imported, along with the packages they depend on.
+PACKAGES = {{
+{}
+}}
+
+for package in getattr(settings, 'DJANGO_XMI_PACKAGES', None) or PACKAGES:
+    if package not in PACKAGES:
+        raise ImproperlyConfigured("Unknown package '{{}}' in DJANGO_XMI_PACKAGES".format(package))
+    import_module('.' + PACKAGES[package], __name__)
+"""
+
+
+class ModelWriter(object):
+    """
+    Write the Django models of the elements into one module per profile (e.g., 'uml.py' and 'sysml.py').
+
+    Each module is assembled in memory, in the order of `XmiParser.ordered_elements`, and then written with
+    a single write to a temporary file that is renamed over the module.  A failure never leaves a module
+    half-written.  Every module imports the modules that were started before it.
+
+    The fingerprints of the modules and of the source of each model are kept in a manifest next to the
+    modules, so the models that were added, changed or removed since the last run can be reported (e.g., to
+    only run `makemigrations` when needed).  In incremental mode, the modules whose content did not change
+    are not rewritten, so editors, Django's autoreloader, etc. do not see them change.
+
+    With the 'package' layout, the models of each package are written in their own module (e.g., the models
+    of 'UML.Actions' in 'uml/actions.py'), which imports the modules of the packages it depends on.  The
+    generated '__init__.py' only imports the packages enabled by the DJANGO_XMI_PACKAGES setting, so a project
+    that only needs a few packages does not have to load all the models.  A hand-written '__init__.py' is
+    never lost: the lines that do not import the modules of the 'profile' layout (e.g., the import of the
+    closure table) are kept in the generated one, and the hand-written one is put back when switching back to
+    the 'profile' layout.  The proxy models of the single-table strategy inherit from the classes of their
+    superclasses, so they can only be written with the 'profile' layout, where the modules that are started
+    first are imported whole.
+
+    .. usage::
+        writer = ModelWriter(parser, 'django_xmi/models', incremental=True)
+        report = writer.write()
+        report.changed  # e.g., [('UML.Activities', 'Activity')]
+
+    """
+
+    header = 'from django.db import models\n'
+    import_template = 'from .{} import *\n'
+    manifest_name = '.django_xmi_manifest.json'
+    manifest_version = 2
+
+    def __init__(self, parser, directory, incremental=False, layout='profile'):
+        """
+        :param parser: the XmiParser with the elements, their `__django_model__` lines must be rendered
+        :param directory: the directory to write the modules in
+        :param incremental: only rewrite the modules whose content changed since the last run
+        :param layout: write one module per 'profile' or one module per 'package'
+        """
+        if layout not in LAYOUTS:
+            raise ValueError("Unknown layout '{}', expected one of {}".format(layout, LAYOUTS))
+        self.parser = parser
+        self.directory = directory
+        self.incremental = incremental
+        self.layout = layout
+
+    def filename(self, profile):
+        """
+        :param profile: the name of a profile
+        :return: the path of the module for the elements of the profile
+        """
+        return path.join(self.directory, profile.lower() + '.py')
+
+    @staticmethod
+    def package(element):
+        """
+        :param element: an element
+        :return: the name of the package of the element (e.g., 'UML.Actions'), its profile if it has none
+        """
+        package = element.get('__package__', None)
+        return package if isinstance(package, str) and package else element.__profile__
+
+    @staticmethod
+    def package_module(package):
+        """
+        :param package: the name of a package (e.g., 'UML.CommonStructure')
+        :return: the name of its module, relative to the models package (e.g., 'uml.common_structure')
+        """
+        segments = package.split('.')
+        top = segments[0].lower()
+        return top + '.' + ('_'.join(camel_to_snake(segment) for segment in segments[1:]) or top)
+
+    def _module_filename(self, module):
+        return path.join(self.directory, *module.split('.')) + '.py'
+
+    @property
+    def manifest_path(self):
+        return path.join(self.directory, self.manifest_name)
+
+    def _assemble(self):
+        """Get the header and the (model name, source) pairs of each module, in the order they are started."""
+        elements = self.parser.elements
+        modules = {}
+        packages = {}
+        dependencies = {}
+        single_table = set()
+        bases = {}
+        for elem_name in self.parser.ordered_elements():
+            if elem_name == "":
+                continue
+            # TODO: this hack indicates that snake_case is getting applied where it shouldn't...
+            if elem_name not in elements and "." in elem_name:
+                elem_name = elem_name.split(".")[-1]
+            element = elements.get(elem_name, None)
+            if element is None:
+                warn("Could not find '{}' in order to write it to a file".format(elem_name))
+                continue
+
+            if element.get('__strategy__', None) == 'single-table' and self.layout != 'profile':
+                raise ValueError("The models of the 'single-table' strategy can only be written with the 'profile' "
+                                 "layout")
+
+            if self.layout == 'profile':
+                filename = self.filename(element.__profile__)
+                if filename not in modules:
+                    modules[filename] = ([self.header] + [self.import_template.format(module)
+                                                          for module in self._module_names(modules)], [])
+            else:
+                module = self.package_module(self.package(element))
+                filename = self._module_filename(module)
+                if filename not in modules:
+                    modules[filename] = ([self.header], [])
+                    packages[self.package(element)] = module
+                    dependencies[filename] = (module, set())
+                dependencies[filename][1].update(self.package_module(self.package(elements[other]))
+                                                 for other in self.parser.references(element))
+            modules[filename][1].append(((self.package(element), element.name),
+                                         '\n' + '\n'.join(element.__django_model__)))
+            if element.get('__strategy__', None) == 'single-table':
+                single_table.add(filename)
+            if element.get('__base__', None):
+                bases.setdefault(filename, set()).add(element.__base__)
+
+        for filename in single_table:
+            modules[filename][0].insert(1, SINGLE_TABLE_IMPORT)
+        for filename, names in bases.items():
+            # The hand-written abstract models are in the models package, next to the modules of the profiles
+            modules[filename][0].insert(1, BASE_IMPORT.format('.' if self.layout == 'profile' else '..',
+                                                              ', '.join(sorted(names))))
+
+        if self.layout == 'package':
+            for filename, (module, others) in dependencies.items():
+                modules[filename][0].extend(self._import(module, other) for other in sorted(others - {module}))
+            for top in sorted(set(module.split('.')[0] for module in packages.values())):
+                modules[path.join(self.directory, top, '__init__.py')] = ([], [])
+            modules[path.join(self.directory, '__init__.py')] = ([PACKAGES_INIT.format('\n'.join(
+                "    '{}': '{}',".format(package, module) for package, module in sorted(packages.items())))], [])
+        return modules
+
+    @staticmethod
+    def _import(module, other):
+        """Get the import of a module from another module, e.g., 'from ..sysml import blocks'."""
+        top, name = module.split('.')
+        other_top, other_name = other.split('.')
+        return 'from {} import {}\n'.format('.' if top == other_top else '..' + other_top, other_name)
+
+    def modules(self):
+        """
+        Assemble the content of the modules.
+
+        :return: a dict of the path of each module to its content, in the order the modules were started
+        """
+        old_manifest = self.read_manifest()
+        return {filename: self._merge(filename, ''.join(header + [source for _, source in models]), old_manifest)[0]
+                for filename, (header, models) in self._assemble().items()}
+
+    def _merge(self, filename, content, old_manifest):
+        """
+        Keep what a hand-written '__init__.py' adds to the generated one.
+
+        :param filename: the path of a module
+        :param content: the generated content of the module
+        :param old_manifest: the manifest of the last run
+        :return: the content to write, and the hand-written content it replaces (None if there is none)
+        """
+        name = self._manifest_name(filename)
+        if path.basename(filename) != '__init__.py':
+            return content, None
+        if name in old_manifest:
+            original = old_manifest[name].get('original', None)
+        elif path.exists(filename):
+            # Not written by a previous run, so it was written by hand
+            with open(filename, 'r', encoding='utf-8') as file:
+                original = file.read()
+        else:
+            return content, None
+        if original is None:
+            return content, None
+
+        generated = {'from .{} import *'.format(module) for module in self._profile_modules()}
+        generated.update(line.strip() for line in content.splitlines())
+        kept = [line.rstrip() for line in original.splitlines() if line.strip() not in generated]
+        while kept and not kept[0]:
+            kept.pop(0)
+        if kept:
+            content += '\n# Kept from the hand-written __init__.py\n' + '\n'.join(kept).rstrip() + '\n'
+        return content, original
+
+    def _profile_modules(self):
+        """Get the names of the modules of the profiles in the 'profile' layout, e.g., 'uml'."""
+        return self._module_names(set(self.filename(e.__profile__) for e in self.parser.elements.values()))
+
+    @staticmethod
+    def _module_names(modules):
+        return [path.splitext(path.basename(filename))[0] for filename in modules]
+
+    def read_manifest(self):
+        """
+        :return: the manifest of the last run, an empty one if there is none (or it cannot be read)
+        """
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        # The manifests of version 1 only lack the packages of the models
+        return manifest.get('modules', {}) if manifest.get('version', None) in (1, self.manifest_version) else {}
+
+    def write(self):
+        """
+        Write the modules, and remove the modules of the profiles that no longer have models to write.
+
+        :return: the modules that were written or left unchanged, and the (package, name) of the models that were
+                 added, changed or removed since the last run
+        :rtype: GenerationReport
+        """
+        old_manifest = self.read_manifest()
+        manifest = {}
+        report = GenerationReport([], [], [], [], [])
+
+        modules = self._assemble()
+        for filename, (header, models) in modules.items():
+            content, original = self._merge(filename, ''.join(header + [source for _, source in models]),
+                                            old_manifest)
+            sources = {}
+            for (package, model), source in models:
+                sources.setdefault(package, {}).setdefault(model, []).append(source)
+            name = self._manifest_name(filename)
+            manifest[name] = {'fingerprint': fingerprint(content),
+                              'models': {package: {model: fingerprint(''.join(chunks)) for model, chunks in
+                                                   package_sources.items()}
+                                         for package, package_sources in sources.items()}}
+            if original is not None:
+                manifest[name]['original'] = original
+
+            if self.incremental and old_manifest.get(name, {}).get('fingerprint', None) == \
+                    manifest[name]['fingerprint'] == self._fingerprint_file(filename):
+                report.unchanged.append(filename)
+                continue
+            write_atomic(filename, content)
+            report.written.append(filename)
+
+        stale = set(self.filename(e.__profile__) for e in self.parser.elements.values())
+        stale.update(path.join(self.directory, *name.split('/')) for name in old_manifest
+                     if name.endswith('.py') and not path.isabs(name) and '..' not in name.split('/'))
+        for filename in stale - set(modules):
+            if not path.exists(filename):
+                continue
+            entry = old_manifest.get(self._manifest_name(filename), {})
+            if path.basename(filename) != '__init__.py':
+                os.remove(filename)
+            elif self._fingerprint_file(filename) != entry.get('fingerprint', None):
+                warn("Not removing '{}', it was changed since it was generated".format(filename))
+            elif 'original' in entry:
+                write_atomic(filename, entry['original'])
+            elif filename == path.join(self.directory, '__init__.py'):
+                warn("Not removing '{}', the models package needs one: it should import the modules of the "
+                     "profiles".format(filename))
+            else:
+                os.remove(filename)
+
+        old_models = self._models(old_manifest)
+        new_models = self._models(manifest)
+        if any(package is None for package, _ in old_models):
+            # The models of a manifest of version 1 can only be matched by name
+            packages = {model: package for package, model in new_models}
+            old_models = {(packages.get(model, None), model): model_fingerprint
+                          for (_, model), model_fingerprint in old_models.items()}
+        for model, model_fingerprint in new_models.items():
+            if model not in old_models:
+                report.added.append(model)
+            elif old_models[model] != model_fingerprint:
+                report.changed.append(model)
+        report.removed.extend(model for model in old_models if model not in new_models)
+
+        write_atomic(self.manifest_path, json.dumps({'version': self.manifest_version, 'modules': manifest},
+                                                    indent=2, sort_keys=True))
+        return report
+
+    def _manifest_name(self, filename):
+        return path.relpath(filename, self.directory).replace(os.sep, '/')
+
+    @staticmethod
+    def _models(manifest):
+        """Get the fingerprint of each model by (package, name), regardless of the module it is in."""
+        models = {}
+        for entry in manifest.values():
+            for package, package_models in entry.get('models', {}).items():
+                if isinstance(package_models, dict):
+                    models.update(((package, model), model_fingerprint)
+                                  for model, model_fingerprint in package_models.items())
+                else:
+                    # A manifest of version 1, keyed by the name of the model only
+                    models[(None, package)] = package_models
+        return models
+
+    @staticmethod
+    def _fingerprint_file(filename):
+        try:
+            with open(filename, 'r', encoding='utf-8') as file:
+                return fingerprint(file.read())
+        except (OSError, ValueError):
+            return None
+
+
+def fingerprint(content):
+    """
+    :param content: some text
+    :return: the SHA-256 digest of the text
+    """
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def write_atomic(filename, content, encoding='utf-8'):
+    """
+    Write a text file so readers only ever see its previous or its new content.
+
+    :param filename: the path of the file
+    :param content: the new content of the file
+    :param encoding: the encoding of the file
+    """
+    directory = path.dirname(path.abspath(filename))
+    os.makedirs(directory, exist_ok=True)
+    mode = os.stat(filename).st_mode & 0o777 if path.exists(filename) else 0o644
+    with NamedTemporaryFile('w', encoding=encoding, dir=directory, suffix='.tmp', delete=False) as file:
+        try:
+            file.write(content)
+        except BaseException:
+            file.close()
+            os.remove(file.name)
+            raise
+    try:
+        os.chmod(file.name, mode)
+        os.replace(file.name, filename)
+    except BaseException:
+        os.remove(file.name)
+        raise
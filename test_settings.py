@@ -27,7 +27,10 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'tests.urls'
+ROOT_URLCONF = 'django_xmi.urls'
+
+# The models are generated, so the app has no migrations: create the tables of the test database from the models
+MIGRATION_MODULES = {'django_xmi': None}
 
 TEMPLATES = [
     {